@@ -717,19 +717,19 @@ class Page(ttk.Frame):
         self.forward_history.append(self.back_history[-1])
         url = self.back_history[-2]
         self.back_history = self.back_history[:-1]
-        self.load_url(url)
+        self.load_url(url, from_history=True)
         if len(self.back_history) <= 1:
             self.backbutton.config(state="disabled", cursor="arrow")
 
     def on_downloading(self, event):
         self.reloadbutton.config(text="Stop", command=self.frame.stop)
 
-    def load_url(self, url, decode=None, force=False):
+    def load_url(self, url, decode=None, force=False, from_history=False):
         if url == "about:html":
             if self.html_playground is None: self.html_playground = HTMLPlayground(self.frame)
             self.frame.load_html(HTML_TEST_PAGE.format(self.html_playground), url)
         else:
-            self.frame.load_url(url, decode, force)
+            self.frame.load_url(url, decode, force, from_history)
 
     def forward(self):
         if len(self.forward_history) == 0:
@@ -740,7 +740,7 @@ class Page(ttk.Frame):
             self.forwardbutton.config(state="disabled", cursor="arrow")
         self.backbutton.config(state="normal", cursor="hand2")
         self.back_history.append(url)
-        self.load_url(url)
+        self.load_url(url, from_history=True)
 
     def cut_text(self, text, limit):
         if (len(text) > limit):
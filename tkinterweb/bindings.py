@@ -4,12 +4,12 @@ The core Python bindings to Tkhtml3
 Copyright (c) 2021-2026 Andrew Clarke
 """
 
-from re import IGNORECASE, split, sub
+from re import IGNORECASE, compile
 
 from urllib.parse import urljoin
+from collections import deque
 
-from queue import Queue, Empty
-
+import threading
 import tkinter as tk
 from . import extensions, utilities, handlers
 
@@ -79,7 +79,7 @@ class TkinterWeb(tk.Widget):
             del kwargs["height"]
 
         # Provide OS information for troubleshooting
-        self.post_message(f"Starting TkinterWeb for {utilities.PLATFORM.processor} {utilities.PLATFORM.system} with Python {'.'.join(utilities.PYTHON_VERSION)}")
+        self.log(utilities.INFO, "Starting TkinterWeb for {} {} with Python {}", utilities.PLATFORM.processor, utilities.PLATFORM.system, '.'.join(utilities.PYTHON_VERSION))
 
         # Check tkinterweb_tkhtml_extras
         if not self.using_tkhtml30 and tkinterweb_tkhtml.TKHTML_EXTRAS_VERSION is not None:
@@ -114,7 +114,7 @@ class TkinterWeb(tk.Widget):
         self._setup_bindings()
         self._setup_handlers()
         
-        self.post_message(f"""Welcome to TkinterWeb!
+        self.log(utilities.INFO, """Welcome to TkinterWeb!
                                 
 The API changed in version 4. See https://tkinterweb.readthedocs.io/ for details.
 
@@ -126,7 +126,7 @@ If you benefited from using this package, please consider supporting its develop
         
         # Check tkinterweb_tkhtml_extras
         if not tkinterweb_tkhtml.TKHTML_EXTRAS_ROOT_DIR:
-            self.post_message("The tkinterweb-tkhtml-extras package is either not installed or does not support your system. Some functionality may be missing.")
+            self.log(utilities.INFO, "The tkinterweb-tkhtml-extras package is either not installed or does not support your system. Some functionality may be missing.")
 
     # --- Widget setup --------------------------------------------------------
 
@@ -136,6 +136,8 @@ If you benefited from using this package, please consider supporting its develop
         They are set when needed. If the settings are set through the options attribute, they will be added here."""
         settings = {
             "messages_enabled": True,
+            "message_level": utilities.DEBUG,
+            "message_log_size": 0,
             "stylesheets_enabled": True,
             "events_enabled": True,
             "images_enabled": True,
@@ -161,10 +163,14 @@ If you benefited from using this package, please consider supporting its develop
             "visited_links": [],
 
             "maximum_thread_count": 20,
+            "preloading_enabled": True,
+            "link_prefetch": False,
+            "link_prefetch_delay": 80,
+            "link_prefetch_limit": 2,
+            "preload_thread_count": 4,
 
             "queue": None,
-            "queue_delay": 50,
-            "queue_after": None,
+            "dispatcher": None,
 
             "embed_obj": None,
             "manage_vsb_func": None,
@@ -177,22 +183,22 @@ If you benefited from using this package, please consider supporting its develop
             "on_resource_setup": None,
 
             "request_func": None,
+            "request_loop": None,
             "insecure_https": False,
             "ssl_cafile": None,
             "request_timeout": 15,
+            "load_deadline": None,
+            "load_deadline_abandon": False,
+            "hedge_percentile": None,
             "headers": {},
+            "cache_partition": None,
             
             "dark_theme_limit": 280,
-            "style_dark_theme_regex": r"([^:;\s{]+)\s?:\s?([^;{!]+)(?=!|;|})",
-            "general_dark_theme_regexes": [
-                r'(<[^>]+bgcolor=")([^"]*)',
-                r'(<[^>]+text=")([^"]*)',
-                r'(<[^>]+link=")([^"]*)'
-            ],
-            "inline_dark_theme_regexes": [
-                r'(<[^>]+style=")([^"]*)',
-                r'([a-zA-Z-]+:)([^;]*)'
-            ],
+            "image_processing_threshold": None,
+            "parse_chunk_size": None,
+            "style_dark_theme_regex": utilities.DEFAULT_STYLE_DARK_THEME_REGEX,
+            "general_dark_theme_regexes": list(utilities.DEFAULT_GENERAL_DARK_THEME_REGEXES),
+            "inline_dark_theme_regexes": list(utilities.DEFAULT_INLINE_DARK_THEME_REGEXES),
 
             "node_tag": f"tkinterweb.{id(self)}.nodes",
             "tkinterweb_tag": f"tkinterweb.{id(self)}.tkinterweb",
@@ -212,9 +218,25 @@ If you benefited from using this package, please consider supporting its develop
         self.icon = ""
 
         self.fragment = ""
+        self.message_log = None
+        self.performance = utilities.Performance()
         self.parsing = False
+        # The number of characters parsed into the current document, used to estimate its size
+        self._parsed_size = 0
+        # Set by the frame that shows this widget to finish off the page once the whole document has been parsed
+        self._finish_loading_func = None
+        self._parse_chunks = deque()
+        self._parse_length = 0
+        self._parse_position = 0
+        self._parse_after = None
         self.active_threads = []
         self.pending_threads = []
+        self._threads_lock = threading.RLock()
+        self._preload_threads = set()
+        self._request_func_async = None
+        self._latencies = utilities.LatencyTracker()
+        self._load_deadline_after = None
+        self._load_expired = False
         self.current_active_node = None
         self.clicked_node = None
         self.current_hovered_node = None
@@ -222,6 +244,8 @@ If you benefited from using this package, please consider supporting its develop
 
         self._style_count = 0
         self._current_cursor = ""
+        self._preprocessors = {}
+        self.color_inverter = utilities.ColorInverter(self.winfo_rgb)
 
         # This set is used when resetting the widget and contains a reference to all loaded managers
         # Managers automatically add themselves to this set as they are created
@@ -331,26 +355,26 @@ If you benefited from using this package, please consider supporting its develop
 
         try:
             loaded_version = tkinterweb_tkhtml.get_loaded_tkhtml_version(self.master)
-            self.post_message(f"Using Tkhtml {loaded_version} because it is already loaded")
+            self.log(utilities.INFO, "Using Tkhtml {} because it is already loaded", loaded_version)
         except tk.TclError:
             if self.use_prebuilt_tkhtml:
                 try:
                     file, loaded_version, self.experimental = tkinterweb_tkhtml.get_tkhtml_file(self.tkhtml_version, experimental=self.experimental)
                     tkinterweb_tkhtml.load_tkhtml_file(self.master, file)
-                    self.post_message(f"Tkhtml {loaded_version} successfully loaded from {tkinterweb_tkhtml.TKHTML_ROOT_DIR}")
+                    self.log(utilities.INFO, "Tkhtml {} successfully loaded from {}", loaded_version, tkinterweb_tkhtml.TKHTML_ROOT_DIR)
                 except tk.TclError as error: # If something goes wrong, try again with version 3.0 in case it is a Cairo issue
-                    self.post_message(f"WARNING: An error occured while loading Tkhtml {loaded_version}: {error}\n\n\
-It is likely that not all dependencies are installed. Make sure Cairo is installed on your system. Some features may be missing.")
+                    self.log(utilities.WARNING, "WARNING: An error occured while loading Tkhtml {}: {}\n\n\
+It is likely that not all dependencies are installed. Make sure Cairo is installed on your system. Some features may be missing.", loaded_version, error)
                     file, loaded_version, self.experimental = tkinterweb_tkhtml.get_tkhtml_file(index=0, experimental=self.experimental)
                     try:
                         tkinterweb_tkhtml.load_tkhtml_file(self.master, file)
-                        self.post_message(f"Tkhtml {loaded_version} successfully loaded from {tkinterweb_tkhtml.TKHTML_ROOT_DIR}")
+                        self.log(utilities.INFO, "Tkhtml {} successfully loaded from {}", loaded_version, tkinterweb_tkhtml.TKHTML_ROOT_DIR)
                     except tk.TclError as error: # If it still won't load it never will. It is most likely that the system is not supported. The user needs to compile and install Tkhtml.
                         raise tk.TclError(f"{error} It is likely that your system is not supported out of the box. {tkinterweb_tkhtml.HELP_MESSAGE}") from error
             else:
                 tkinterweb_tkhtml.load_tkhtml(self.master)
                 loaded_version = tkinterweb_tkhtml.get_loaded_tkhtml_version(self.master)
-                self.post_message(f"Tkhtml {loaded_version} successfully loaded")
+                self.log(utilities.INFO, "Tkhtml {} successfully loaded", loaded_version)
 
         self.tkhtml_version = float(loaded_version)
         self.using_tkhtml30 = float(loaded_version) == 3
@@ -469,7 +493,30 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         "Disable the Tkhtml image cache when disabling caches."
         if prev_enabled != enabled: 
             self.imagecache = enabled
-            if not enabled: utilities.lru_cache.clear()
+            # The shared cache is left alone so that other widgets are not affected
+            if not enabled and self.cache_partition is not None: self.cache_partition.clear()
+
+    @property
+    def parse_progress(self):
+        """The fraction of the document that has been parsed, from 0 to 1. This is only less than 1 while a document is being parsed in chunks. See :attr:`parse_chunk_size`.
+        
+        :rtype: float
+        
+        New in version 4.26."""
+        if not self._parse_length:
+            return 1.0
+        return self._parse_position / self._parse_length
+
+    @property
+    def cache(self):
+        """The cache used by this widget. This is the value of :attr:`cache_partition` if set, otherwise the shared cache.
+        
+        :rtype: :class:`~tkinterweb.utilities.LRUCache`
+        
+        New in version 4.26."""
+        if self.cache_partition is None:
+            return utilities.lru_cache
+        return self.cache_partition
 
     @property
     def imagecache(self):
@@ -484,21 +531,21 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         "Warn the user when enabling JavaScript."
         if prev_enabled != enabled:
             if enabled:
-                self.post_message("WARNING: JavaScript support is enabled. This feature is a work in progress. Only enable JavaScript support on documents you know and trust.")
+                self.log(utilities.WARNING, "WARNING: JavaScript support is enabled. This feature is a work in progress. Only enable JavaScript support on documents you know and trust.")
 
     @utilities.special_setting(True)
     def crash_prevention_enabled(self, prev_enabled, enabled):
         "Warn the user when disabling crash prevention."
         if prev_enabled != enabled:
             if not enabled:
-                self.post_message("WARNING: crash prevention is disabled. You may encounter segmentation faults on some pages.")
+                self.log(utilities.WARNING, "WARNING: crash prevention is disabled. You may encounter segmentation faults on some pages.")
     
     @utilities.special_setting(False)
     def dark_theme_enabled(self, prev_enabled, enabled):
         "Warn the user when enabling dark mode."
         if prev_enabled != enabled:
             if enabled:
-                self.post_message("WARNING: dark theme is enabled. This feature may cause hangs or crashes on some pages.")
+                self.log(utilities.WARNING, "WARNING: dark theme is enabled. This feature may cause hangs or crashes on some pages.")
             if enabled and self.dark_style:
                 self.config(defaultstyle=self.default_style + self.dark_style)
             elif self.default_style:
@@ -510,7 +557,7 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         if prev_enabled != enabled:
             prev_enabled = enabled
             if enabled:
-                self.post_message("WARNING: image inversion is enabled. This feature may cause hangs or crashes on some pages.")
+                self.log(utilities.WARNING, "WARNING: image inversion is enabled. This feature may cause hangs or crashes on some pages.")
 
     @utilities.special_setting(True)
     def threading_enabled(self, prev_enabled, enabled):
@@ -520,17 +567,35 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
                 # Initialize the queue
                 # The queue evaluates Tcl/Tk commands running in a thread
                 # The queue will start or stop when self.maximum_thread_count is set
+                # All widgets in the same Tcl interpreter share one dispatcher
                 if not self.queue:
-                    self.queue = Queue()
-                self._check_queue()
+                    self.queue = utilities.TaskQueue()
+                self.dispatcher = utilities.Dispatcher.get(self)
+                self.dispatcher.register(self, self.queue)
             else:
-                self.post_message("WARNING: threading is disabled. Your app may hang while loading webpages.")
+                self.log(utilities.WARNING, "WARNING: threading is disabled. Your app may hang while loading webpages.")
                 self._end_queue()
         else:
             self._threading_enabled = False
-            self.post_message("WARNING: threading is disabled because your Tcl/Tk library does not support threading. Your app may hang while loading webpages.")
+            self.log(utilities.WARNING, "WARNING: threading is disabled because your Tcl/Tk library does not support threading. Your app may hang while loading webpages.")
             self._end_queue()
 
+    @utilities.special_setting(None)
+    def request_func(self, prev_func, func):
+        "Forget whether the previous request function was asynchronous."
+        if prev_func is not func:
+            self._request_func_async = None
+
+    @utilities.special_setting(0)
+    def message_log_size(self, prev_size, size):
+        "Keep the most recent messages in the message log."
+        if not size:
+            self.message_log = None
+        elif self.message_log is None:
+            self.message_log = utilities.MessageLog(size)
+        else:
+            self.message_log.resize(size)
+
     @utilities.special_setting(False)
     def caret_browsing_enabled(self, prev_enabled, enabled):
         "Enable or disable caret browsing."
@@ -567,29 +632,25 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
 
     # --- Queuing, messaging, and events --------------------------------------
 
-    def _check_queue(self):
-        try:
-            while True:
-                msg = self.queue.get_nowait()
-                msg()
-        except Empty:
-            pass
-        self.queue_after = self.after(self.queue_delay, self._check_queue)
-
     def _end_queue(self):
-        if self.queue_after:
-            self.after_cancel(self.queue_after)
-            self.queue_after = None
+        if self.dispatcher is not None:
+            self.dispatcher.unregister(self)
         self.queue = None
 
-    def post_to_queue(self, callback, thread_safe=True):
+    def post_to_queue(self, callback, thread_safe=True, priority=utilities.PRIORITY_NORMAL):
         """Use this method to send a callback to TkinterWeb's thread-safety queue. The callback will be evaluated on the main thread.
         Use this when running Tkinter commands from within a thread. 
         If the queue is not running (i.e. threading is disabled), the callback will be evaluated immediately.
+
+        Callbacks with a higher priority are evaluated first. See :class:`~tkinterweb.utilities.Dispatcher` for details on when callbacks are evaluated.
+        
+        New in version 4.9.
         
-        New in version 4.9."""
+        Changed in version 4.26: added the ``priority`` parameter."""
         if thread_safe and self.queue:
-            self.queue.put(callback)
+            # Results from resource loaders are tagged so that they can be discarded if the page changes before they are evaluated
+            self.queue.put(callback, priority, generation=getattr(utilities.get_current_thread(), "generation", None))
+            self.dispatcher.wake()
         else:
             callback()
 
@@ -608,31 +669,71 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
     def _post_event(self, event):
         "Generate a virtual event."
         try:
-            self.event_generate(event)
+            if utilities.tracer.enabled:
+                with utilities.tracer.span(event, "event", navigation=self.performance.navigationId):
+                    self.event_generate(event)
+            else:
+                self.event_generate(event)
         except tk.TclError:
             # The widget doesn't exist anymore
             pass
 
-    def post_message(self, message, thread_safe=False):
-        "Post a message."
+    def log(self, level, message, *args, thread_safe=False):
+        """Post a debugging message. 
+        
+        The message is only formatted, using :meth:`str.format` with the given arguments, if it is going to be shown or kept in :attr:`message_log`. 
+        This makes messages that are disabled or below :attr:`message_level` almost free, so avoid formatting the message before calling this method. 
+        The ``!u`` conversion shortens long urls.
+        
+        :param level: The message level, such as :data:`.utilities.DEBUG` or :data:`.utilities.ERROR`.
+        :type level: int
+        :param message: The message, with ``{}`` placeholders for the arguments.
+        :type message: str
+        :param thread_safe: If True, the message will be shown from the main thread.
+        :type thread_safe: bool, optional
+        
+        New in version 4.26."""
         # NOTE: when thread_safe=True, this method is thread-safe
         # Amazing stuff, eh?
-        if self.message_func is None and not self.messages_enabled:
+        if level < self.message_level:
+            return
+        
+        message_log = self.message_log
+        shown = self.message_func is not None or self.messages_enabled
+        if not shown and message_log is None:
             return
         
+        record = utilities.MessageRecord(level, message, args, bool(self.overflow_scroll_frame))
+        if message_log is not None:
+            # Kept records must not keep exceptions, nodes or widgets alive
+            record._detach()
+            message_log.append(record)
+
+        if not shown:
+            return
         if thread_safe and self.queue:
-            self.post_to_queue(lambda message=message: self._post_message(message))
+            self.post_to_queue(lambda record=record: self._post_message(record), priority=utilities.PRIORITY_IDLE)
+        else:
+            self._post_message(record)
+
+    def post_message(self, message, thread_safe=False):
+        """Post a message. 
+        Messages beginning with "ERROR" or "WARNING" are given the matching level. Other messages are posted at the :data:`.utilities.INFO` level. See :meth:`log`."""
+        # NOTE: when thread_safe=True, this method is thread-safe
+        if message.startswith("ERROR"):
+            level = utilities.ERROR
+        elif message.startswith("WARNING"):
+            level = utilities.WARNING
         else:
-            self._post_message(message)
+            level = utilities.INFO
+        self.log(level, "{}", message, thread_safe=thread_safe)
 
-    def _post_message(self, message):
-        "Post a message."
-        if self.overflow_scroll_frame:
-            message = "[EMBEDDED DOCUMENT] " + message
+    def _post_message(self, record):
+        "Show a message."
         if self.message_func is not None:
-            self.message_func(message)
+            self.message_func(record.message)
         elif self.messages_enabled:
-            utilities.notifier(message)
+            utilities.notifier(record.message)
 
     # --- HTML/CSS parsing ----------------------------------------------------
 
@@ -640,8 +741,7 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         "Parse HTML code. Call :meth:`TkinterWeb.reset` before calling this method for the first time."
         # NOTE: when thread_safe=True, this method is thread-safe
 
-        html = self._crash_prevention(html)
-        html = self._dark_mode(html)
+        html = self._preprocess(html)
 
         # By default Tkhtml won't display plain text
         if "<" not in html and ">" not in html:
@@ -653,22 +753,79 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         # Send the HTML code to the queue if needed
         # Otherwise, evaluate directly so that the document can be manipulated as soon as parse() returns
         if thread_safe:
-            self.post_to_queue(lambda html=html: self._parse(html))
+            self.post_to_queue(lambda html=html: self._parse(html), priority=utilities.PRIORITY_HIGH)
         else:
             self._parse(html)
     
     def _parse(self, html):
         "Parse HTML code."
         # NOTE: this must run in the main thread
+        self._parsed_size += len(html)
+        if self._parse_length:
+            # A document is already being parsed in chunks, so this is added to the end of it to keep everything in order
+            self._parse_chunks.extend(utilities.split_html(html, self.parse_chunk_size or len(html)))
+            self._parse_length += len(html)
+            return
+        
+        if self.parse_chunk_size and len(html) > self.parse_chunk_size:
+            self.parsing = True
+            self._parse_chunks.extend(utilities.split_html(html, self.parse_chunk_size))
+            self._parse_length = len(html)
+            self._parse_position = 0
+            self._parse_next_chunk()
+            return
+
         self.parsing = True
-        self.tk.call(self._w, "parse", html)
+        with self.performance._stage("parse", length=len(html)):
+            self.tk.call(self._w, "parse", html)
+        self.parsing = False
+
+        self._finish_parse()
+
+    def _parse_next_chunk(self):
+        "Parse the next chunk of a document and give the event loop a chance to run before parsing the one after it."
+        # NOTE: this must run in the main thread
+        self._parse_after = None
+        if not self.winfo_exists():
+            return
+        chunk = self._parse_chunks.popleft()
+        with self.performance._stage("parse", length=len(chunk), position=self._parse_position):
+            self.tk.call(self._w, "parse", chunk)
+        self._parse_position += len(chunk)
+        self.post_event(utilities.PARSE_PROGRESS_EVENT)
+
+        if self._parse_chunks:
+            self._parse_after = self.after_idle(self._parse_next_chunk)
+        else:
+            self.parsing = False
+            self._parse_length = 0
+            self._finish_parse()
+
+    def _insert_parse_chunk(self, html):
+        "Insert HTML code at the point where parsing will resume when a document is being parsed in chunks."
+        self._parse_chunks.appendleft(html)
+        self._parse_length += len(html)
+
+    def _cancel_parse(self):
+        "Stop parsing a document that is being parsed in chunks."
+        if self._parse_after is not None:
+            self.after_cancel(self._parse_after)
+            self._parse_after = None
+        self._parse_chunks.clear()
+        self._parse_length = 0
         self.parsing = False
 
+    def _finish_parse(self):
+        "Handle the end of the document."
+        # NOTE: this must run in the main thread
+        self.performance._milestone("domContentLoaded")
         self.post_event(utilities.DOM_CONTENT_LOADED_EVENT)
 
         # If any threads are active, they'll send the done loading signal when they finish
         if not self.active_threads:
             self._handle_load_finish()
+        elif self._load_expired:
+            self._finish_at_deadline()
         else:
             # Scroll to the fragment if given but do not issue a done loading event
             self._handle_load_finish(False)
@@ -679,7 +836,15 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         #if self.using_tkhtml30: # Handle unsupported tags
         self.node_manager._handle_load_finish()
 
+        # Let the frame finish off the page now that every chunk has been parsed
+        if self._finish_loading_func is not None:
+            self._finish_loading_func()
+
     def _handle_load_finish(self, post_event=True):
+        if post_event and self._load_deadline_after:
+            self.after_cancel(self._load_deadline_after)
+            self._load_deadline_after = None
+
         if self.fragment:
             try:
                 if isinstance(self.fragment, tuple):
@@ -695,13 +860,16 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
                 pass
         
         if post_event:
+            self.performance._milestone("doneLoading")
             self.post_event(utilities.DONE_LOADING_EVENT)
 
     def parse_css(self, sheetid=None, data="", url=None, fallback_priority="author"):
         "Parse CSS code."
+        self._parse_css(sheetid, self._preprocess(data, css=True), url, fallback_priority)
+
+    def _parse_css(self, sheetid=None, data="", url=None, fallback_priority="author"):
+        "Parse CSS code that has already been preprocessed."
         if not url: url = self.base_url
-        data = self._crash_prevention(data)
-        data = self._css_dark_mode(data)
         
         try:
             importcmd = self.register(
@@ -717,12 +885,13 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
                 self._style_count += 1
                 sheetid = f"{fallback_priority}{self._style_count:04d}"
                 
-            self.tk.call(
-                self._w, "style",
-                "-id", sheetid,
-                "-importcmd", importcmd,
-                "-urlcmd", urlcmd, data
-            )
+            with self.performance._stage("css-parse", url=url):
+                self.tk.call(
+                    self._w, "style",
+                    "-id", sheetid,
+                    "-importcmd", importcmd,
+                    "-urlcmd", urlcmd, data
+                )
         except tk.TclError:
             # The widget doesn't exist anymore
             pass
@@ -731,14 +900,20 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         "Reset the widget."
         # NOTE: when thread_safe=True, this method is thread-safe. Imagine that!
 
+        # Anything still queued by the previous page's loaders is discarded
+        if self.queue:
+            self.queue.advance_generation()
         self.stop()
 
         self.title = ""
         self.icon = ""
         self.fragment = ""
 
-        if thread_safe:
-            self.post_to_queue(self._reset)
+        if thread_safe and self.queue:
+            # The previous page's loader callbacks are dropped because of the new generation
+            # Callbacks queued before this without a generation, such as submitted tasks, are still evaluated before the reset
+            self.queue.put(self._reset, barrier=True)
+            self.dispatcher.wake()
         else:
             self._reset()
 
@@ -758,16 +933,49 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         self.current_hovered_node = None
 
         self._set_cursor("default")
+        self._cancel_parse()
         self.tk.call(self._w, "reset")
+        self._parsed_size = 0
+
+        if self._load_deadline_after:
+            self.after_cancel(self._load_deadline_after)
+            self._load_deadline_after = None
+        self._load_expired = False
+        if self.load_deadline is not None:
+            self._load_deadline_after = self.after(self.load_deadline, self._expire_load_deadline)
 
         for manager in self._managers:
             manager.reset()
 
+    def _expire_load_deadline(self):
+        # NOTE: this must run in the main thread
+        self._load_deadline_after = None
+        self._load_expired = True
+        # If the document is still being parsed, _finish_parse will finish loading instead
+        if self.parsing:
+            return
+        if self.active_threads or self.pending_threads:
+            self._finish_at_deadline()
+
+    def _finish_at_deadline(self):
+        "Send the done loading signal without waiting for the remaining resources."
+        # NOTE: this must run in the main thread
+        count = len(self.active_threads) + len(self.pending_threads)
+        if self.load_deadline_abandon:
+            self.stop()
+            self.log(utilities.INFO, "Load deadline passed; abandoning {} outstanding resources", count)
+        else:
+            self.log(utilities.INFO, "Load deadline passed; {} outstanding resources will continue loading in the background", count)
+        self._handle_load_finish()
+
     def stop(self):
         "Stop loading resources."
-        for thread in self.active_threads:
+        with self._threads_lock:
+            for thread in self.active_threads:
+                thread.stop()
+            self.pending_threads.clear()
+        for thread in tuple(self._preload_threads):
             thread.stop()
-        self.pending_threads.clear()
     
     def resolve_url(self, url, base=None):
         "Generate a full url from the specified url."
@@ -777,58 +985,198 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
     # --- Resource loading ----------------------------------------------------
 
     def download_url(self, url, *args):
+        bundle = utilities.get_resource_bundle(url)
+        if bundle is not None:
+            return bundle.fetch(url, *args[2:3])
+
         if self.request_func:
-            return self.request_func(url, *args)
+            thread = utilities.get_current_thread()
+            if isinstance(thread, utilities.RequestTask) and thread.url == url and thread.request_args == args:
+                # The response was already requested by _request_async
+                return thread.future.result()
+            return utilities.resolve_response(self._request(url, *args))
         
         if url.startswith("file://") or (not self.caches_enabled):
-            return utilities.download(url, *args, insecure=self.insecure_https, cafile=self.ssl_cafile, headers=tuple(self.headers.items()), timeout=self.request_timeout)
+            return self._download(url, *args, insecure=self.insecure_https, cafile=self.ssl_cafile, headers=tuple(self.headers.items()), timeout=self.request_timeout)
         else:
-            return utilities.cache_download(url, *args, insecure=self.insecure_https, cafile=self.ssl_cafile, headers=tuple(self.headers.items()), timeout=self.request_timeout)
+            return utilities.cache_download(url, *args, insecure=self.insecure_https, cafile=self.ssl_cafile, headers=tuple(self.headers.items()), timeout=self.request_timeout, cache=self.cache, downloader=self._download)
+
+    def _download(self, url, *args, **kwargs):
+        "Download a file, re-issuing the request if it is slower than :attr:`hedge_percentile` percent of recent downloads."
+        # NOTE: this may run in a thread
+        if self.hedge_percentile is None or url.startswith("file://"):
+            return utilities.download(url, *args, **kwargs)
+        return utilities.hedged_download(self._latencies, self.hedge_percentile, url, *args, **kwargs)
     
+    def preload_resources(self, html, base_url=None):
+        """Start downloading the stylesheets, scripts, and images referenced by the given HTML code into the cache, so that they are ready by the time the parser requests them.
+        This has no effect if preloading, caching, or threading is disabled or if :attr:`request_func` is set.
+        
+        New in version 4.26."""
+        # NOTE: this may run in a thread
+        if not (self.preloading_enabled and self.caches_enabled and self.threading_enabled) or self.request_func is not None:
+            return
+        
+        if not base_url: base_url = self.base_url
+        enabled = {"stylesheet": self.stylesheets_enabled, "script": self.javascript_enabled, "image": self.images_enabled}
+        urls = {}
+
+        for kind, url in utilities.scan_subresources(html):
+            if kind == "base":
+                base_url = self.resolve_url(url, base_url)
+            elif enabled[kind]:
+                url = self.resolve_url(url, base_url)
+                if url.startswith(("http://", "https://")) and not utilities.get_resource_bundle(url):
+                    urls[url] = None
+
+        urls = utilities.deque(url for url in urls if not self._check_url_cache_state(url))
+        if urls:
+            self.log(utilities.DEBUG, "Preloading {} resources", len(urls), thread_safe=True)
+            for i in range(min(self.preload_thread_count, len(urls))):
+                thread = utilities.StoppableThread(target=self._preload, args=(urls,))
+                self._preload_threads.add(thread)
+                thread.start()
+
+    def _preload(self, urls):
+        # NOTE: this runs in a thread
+        thread = utilities.get_current_thread()
+        try:
+            while thread.isrunning():
+                url = urls.popleft()
+                try:
+                    if utilities.tracer.enabled:
+                        with utilities.tracer.span("download preload", "network", navigation=self.performance.navigationId, url=url):
+                            self.download_url(url)
+                    else:
+                        self.download_url(url)
+                except Exception:
+                    # Errors are reported if and when the parser requests the resource
+                    pass
+        except IndexError:
+            pass
+        self._preload_threads.discard(thread)
+
     def _check_url_cache_state(self, url, *args):
-        return utilities.check_download(url, *args, insecure=self.insecure_https, cafile=self.ssl_cafile, headers=tuple(self.headers.items()), timeout=self.request_timeout)
+        return utilities.check_download(url, *args, insecure=self.insecure_https, cafile=self.ssl_cafile, headers=tuple(self.headers.items()), timeout=self.request_timeout, cache=self.cache)
     
-    def _thread_check(self, callback, url, *args, **kwargs):
-        if not self.threading_enabled or url.startswith("file://") or self._check_url_cache_state(url):
+    def _request(self, url, *args):
+        """Call request_func and remember whether it is asynchronous. 
+        Return a :py:class:`concurrent.futures.Future` if it is, or the response otherwise."""
+        response = self.request_func(url, *args)
+        future = utilities.as_future(response, self.request_loop)
+        self._request_func_async = future is not None
+        return response if future is None else future
+    
+    def _request_async(self, callback, url, *args, request_args=(), **kwargs):
+        """Request a resource from an asynchronous request_func and run the callback when the response arrives.
+        The request_args are passed on to request_func, eg. the data, method, and decode arguments of :meth:`download_url`."""
+        try:
+            response = self._request(url, *request_args)
+        except Exception as error:
+            response = utilities.Future()
+            response.set_exception(error)
+
+        if not isinstance(response, utilities.Future):
+            # The request function returned synchronously this time
+            future = utilities.Future()
+            future.set_result(response)
+            response = future
+
+        task = utilities.RequestTask(url, response, request_args)
+        task.generation = self.queue.generation
+        with self._threads_lock:
+            self.active_threads.append(task)
+        if threading.current_thread() is threading.main_thread():
+            self.dispatcher.watch()
+
+        def done(future):
+            # NOTE: this runs in whichever thread completed the future, such as an asyncio event loop's thread
+            # The loader callback is handed to the main thread so that it never runs in a thread we do not own
+            queue = self.queue
+            if queue is not None and task.isrunning():
+                # The callback is not tagged with the task's generation so that a stale task is always removed from active_threads
+                queue.put(lambda: self._run_request_task(task, callback, url, *args, **kwargs))
+                self.dispatcher.wake()
+            else:
+                self._remove_request_task(task)
+
+        response.add_done_callback(done)
+
+    def _run_request_task(self, task, callback, url, *args, **kwargs):
+        # NOTE: this must run in the main thread
+        if not task.isrunning() or self.queue is None or task.generation != self.queue.generation:
+            self._remove_request_task(task)
+        elif self.threading_enabled:
+            # Loaders may rasterise or invert images once the response is in, so they run in a short-lived thread instead of stalling the app
+            # No thread was kept waiting for the response itself
+            thread = utilities.StoppableThread(target=task.run, args=(callback, url, *args), kwargs=kwargs)
+            thread.generation = task.generation
+            thread.start()
+        else:
+            task.run(callback, url, *args, **kwargs)
+
+    def _remove_request_task(self, task):
+        # NOTE: this method is thread-safe
+        with self._threads_lock:
+            if task in self.active_threads:
+                self.active_threads.remove(task)
+
+    def _thread_check(self, callback, url, *args, request_args=(), **kwargs):
+        if url.startswith("file://") or utilities.get_resource_bundle(url):
+            callback(url, *args, **kwargs)
+        elif self.request_func is not None and self._request_func_async and self.threading_enabled:
+            # Once we know that request_func returns futures, there is no need to park a thread while waiting for the response
+            self._request_async(callback, url, *args, request_args=request_args, **kwargs)
+        elif not self.threading_enabled or self._check_url_cache_state(url):
             callback(url, *args, **kwargs)
         else:
             thread = utilities.StoppableThread(target=callback, args=(url, *args,), kwargs=kwargs)
+            thread.generation = self.queue.generation
 
-            if len(self.active_threads) >= 100:
-                self.pending_threads.append(thread)
-            else:
-                thread.start()
+            with self._threads_lock:
+                if len(self.active_threads) >= 100:
+                    self.pending_threads.append(thread)
+                    return
+            thread.start()
 
     def _begin_download(self):
         # NOTE: this may run in a thread
 
         thread = utilities.get_current_thread()
-        self.active_threads.append(thread)
+        with self._threads_lock:
+            if thread not in self.active_threads:
+                self.active_threads.append(thread)
         self.post_event(utilities.DOWNLOADING_RESOURCE_EVENT, thread.is_subthread)
         return thread
 
     def _finish_download(self, thread):
         # NOTE: this may run in a thread
 
-        self.active_threads.remove(thread)
+        with self._threads_lock:
+            self.active_threads.remove(thread)
+            pending = self.pending_threads.pop(0) if thread.is_subthread and self.pending_threads else None
+            remaining = len(self.active_threads)
 
         if thread.isrunning():
-            if thread.is_subthread and self.pending_threads:
-                self.pending_threads.pop(0).start()
+            if pending is not None:
+                pending.start()
 
-            elif not self.parsing:
-                if len(self.active_threads) == 0:
-                    self.post_to_queue(self._handle_load_finish, thread.is_subthread)
+            elif not self.parsing and not self._load_expired:
+                # Once the load deadline has passed, the done loading signal has already been sent
+                if remaining == 0:
+                    self.post_to_queue(self._handle_load_finish, thread.is_subthread, utilities.PRIORITY_LOW)
                 else:
-                    self.post_to_queue(lambda: self._handle_load_finish(False), thread.is_subthread)
-
-    def _finish_resource_load(self, message, url, resource, success):
-        # NOTE: this must run in the main thread
+                    self.post_to_queue(lambda: self._handle_load_finish(False), thread.is_subthread, utilities.PRIORITY_LOW)
 
-        self.post_message(message)
+    def _finish_resource_load(self, url, resource, success, error=None, thread_safe=False):
+        # NOTE: when thread_safe=True, this method is thread-safe
+        if success:
+            self.log(utilities.DEBUG, "Successfully loaded {!u}", url, thread_safe=thread_safe)
+        else:
+            self.log(utilities.ERROR, "ERROR: could not load {} {}: {}", resource, url, error, thread_safe=thread_safe)
 
         if self.on_resource_setup is not None:
-            self.on_resource_setup(url, resource, success)
+            self.post_to_queue(lambda url=url, resource=resource, success=success: self.on_resource_setup(url, resource, success), thread_safe)
 
     # --- Bindings ------------------------------------------------------------
 
@@ -900,8 +1248,7 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         A document fragment isn't part of the active document but is comprised of nodes like the active document.
         Changes made to the fragment don't affect the document.
         Returns a root node."""
-        html = self._crash_prevention(html)
-        html = self._dark_mode(html)
+        html = self._preprocess(html)
         fragment = self.tk.call(self._w, "fragment", html)
         # If any threads are active, they'll send the done loading signal when they finish
         if not self.active_threads:
@@ -1136,39 +1483,84 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
        
     def _on_draw_cleanup_crash_cmd(self):
         if self.crash_prevention_enabled:
-            self.post_message("WARNING: HtmlDrawCleanup has encountered a critical error. This is being ignored because crash prevention is enabled.")
+            self.log(utilities.WARNING, "WARNING: HtmlDrawCleanup has encountered a critical error. This is being ignored because crash prevention is enabled.")
         else:
-            self.post_message("WARNING: HtmlDrawCleanup has encountered a critical error.")
+            self.log(utilities.WARNING, "WARNING: HtmlDrawCleanup has encountered a critical error.")
             self.destroy()
 
-    def _crash_prevention(self, data):
+    def _preprocess(self, data, css=False):
+        "Apply crash prevention and the dark theme to HTML or CSS code before it is parsed."
+        with self.performance._stage("preprocess", css=css, length=len(data)):
+            return self._run_preprocessors(data, css)
+
+    def _run_preprocessors(self, data, css):
         if self.crash_prevention_enabled:
             ### TODO: enable emojis & noto colo emoji font in Tcl/Tk 9
 
             # From Bug #11
-            data = "".join(c for c in data if c <= "\uFFFF")
+            data = utilities.strip_astral_characters(data)
 
-            # I moved these workarounds to Tkhtml in version 3.1
-            if self.using_tkhtml30:
-                data = sub(
-                    "font-family:[^;']*(;)?",
-                    self._remove_noto_emoji,
-                    data, flags=IGNORECASE,
-                )
-                data = sub(
-                    r"rgb\([^0-9](.*?)\)", 
-                    "inherit", 
-                    data, flags=IGNORECASE)
-
-                # From Bug #150
-                # Not really crash prevention
-                data = sub(
-                    r'style=(["\'])\s+', 
-                    r'style=\1', 
-                    data, flags=IGNORECASE)
+        # The substitutions are only rebuilt when the settings they depend on change
+        key = self._get_preprocessing_key(css)
+        preprocessors = self._preprocessors.get(key)
+        if preprocessors is None:
+            preprocessors = self._preprocessors[key] = self._build_preprocessors(css)
 
+        for preprocessor in preprocessors:
+            data = preprocessor(data)
         return data
 
+    def _get_preprocessing_key(self, css=False):
+        "Return the settings that affect how HTML or CSS code is preprocessed."
+        if css:
+            return (css, self.crash_prevention_enabled, self.tkhtml_version, self.dark_theme_enabled, 
+                    self.dark_theme_limit, self.style_dark_theme_regex)
+        return (css, self.crash_prevention_enabled, self.tkhtml_version, self.dark_theme_enabled, self.dark_theme_limit,
+                tuple(self.general_dark_theme_regexes), tuple(self.inline_dark_theme_regexes))
+
+    def _build_preprocessors(self, css):
+        "Return the substitutions to apply to HTML or CSS code. Each one makes a single pass over the code."
+        preprocessors = []
+
+        if self.crash_prevention_enabled and self.using_tkhtml30:
+            # I moved these workarounds to Tkhtml in version 3.1
+            # The font-family pattern can run past the end of a rule, so its matches can overlap the others'
+            # Each substitution therefore needs its own pass, like before
+            preprocessors.append(utilities.Preprocessor([("font-family:[^;']*(;)?", self._remove_noto_emoji, IGNORECASE)]))
+            preprocessors.append(utilities.Preprocessor([(r"rgb\([^0-9](.*?)\)", "inherit", IGNORECASE)]))
+            # From Bug #150
+            # Not really crash prevention
+            preprocessors.append(utilities.Preprocessor([(r'style=(["\'])\s+', r'style=\1', IGNORECASE)]))
+
+        if self.dark_theme_enabled:
+            if css:
+                preprocessors.append(utilities.Preprocessor([
+                    (self.style_dark_theme_regex, lambda match: self._generate_altered_colour(match, 0))
+                ]))
+            elif len(self.inline_dark_theme_regexes) < 2 or (
+                    tuple(self.inline_dark_theme_regexes) == utilities.DEFAULT_INLINE_DARK_THEME_REGEXES and
+                    tuple(self.general_dark_theme_regexes) == utilities.DEFAULT_GENERAL_DARK_THEME_REGEXES):
+                if len(self.inline_dark_theme_regexes) < 2:
+                    self.log(utilities.WARNING, "WARNING: inline_dark_theme_regexes needs a tag pattern and a declaration pattern but {} were given; the default dark theme is used for HTML code instead", len(self.inline_dark_theme_regexes))
+                # The default regexes can backtrack badly on large or malformed pages, so rewrite the same attributes with a tokenizer instead
+                preprocessors.append(lambda html: utilities.rewrite_attributes(html, utilities.DARK_THEME_ATTRIBUTES, self._generate_altered_attribute))
+            else:
+                # Like before, any patterns after the first two are ignored
+                inline_regex, declaration_regex = (compile(regex) for regex in self.inline_dark_theme_regexes[:2])
+                regexes = [(inline_regex, lambda match: match.group(1) + declaration_regex.sub(self._generate_altered_colour, match.group(2)))]
+                regexes.extend((compile(regex, IGNORECASE), self._generate_altered_colour) for regex in self.general_dark_theme_regexes)
+
+                def alter_tag(match):
+                    tag = match.group()
+                    for regex, replacement in regexes:
+                        tag = regex.sub(replacement, tag)
+                    return tag
+
+                # A tag can have several attributes with colours, so handle each tag as a whole
+                preprocessors.append(utilities.Preprocessor([(r"<[^>]+", alter_tag)]))
+
+        return preprocessors
+
     def _remove_noto_emoji(self, match):
         "Remove noto color emoji font, which causes Tkinter to crash."
         match = match.group().lower()
@@ -1177,75 +1569,34 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
 
     # --- Dark mode -----------------------------------------------------------
 
-    def _generate_altered_colour(self, match, matchtype=1):
-        "Invert document colours. Highly experimental."
-        colors = match.group(2).replace("\n", "")
-        colors = split(r"\s(?![^()]*\))", colors)
-        changed = False
+    def _generate_altered_attribute(self, name, value):
+        "Invert the colours in an HTML attribute. Return None if nothing changed."
+        if name != "style":
+            return self.color_inverter.invert_value(value, utilities.DARK_THEME_ATTRIBUTES[name], self.dark_theme_limit)
 
-        for count, color in enumerate(colors):
-            try:
-                if color.startswith("#"):
-                    color = color.lstrip("#")
-                    lv = len(color)
-                    if lv == 3:
-                        color = color + color
-                        lv = len(color)
-                    colors[count] = utilities.invert_color(
-                        list(
-                            int(color[i : i + lv // 3], 16)
-                            for i in range(0, lv, lv // 3)
-                        ),
-                        match.group(1), self.dark_theme_limit
-                    )
+        declarations = value.split(";")
+        changed = False
+        for count, declaration in enumerate(declarations):
+            property, colon, colors = declaration.partition(":")
+            if colon and property.strip():
+                colors = self.color_inverter.invert_value(colors, property.strip(), self.dark_theme_limit)
+                if colors is not None:
+                    declarations[count] = property + colon + colors
                     changed = True
-                elif color.startswith("rgb(") or color.startswith("rgba("):
-                    colors_list = (list(
-                            map(
-                                int,
-                                color.lstrip("rgba(")
-                                .lstrip("rgb(")
-                                .rstrip(")")
-                                .strip(" ")
-                                .split(","),
-                            )
-                        ),)
-                    if len(colors_list) == 3:
-                        colors[count] = utilities.invert_color(
-                            colors_list,
-                            match.group(1), self.dark_theme_limit
-                        )
-                        changed = True
-                else:
-                    try:
-                        color = list(self.winfo_rgb(color))
-                        colors[count] = utilities.invert_color(color, match.group(1), self.dark_theme_limit)
-                        changed = True
-                    except tk.TclError:
-                        pass
-            except ValueError as error:
-                pass
+        
+        return ";".join(declarations) if changed else None
 
-        if changed:
+    def _generate_altered_colour(self, match, matchtype=1):
+        "Invert document colours. Highly experimental."
+        colors = self.color_inverter.invert_value(match.group(2), match.group(1), self.dark_theme_limit)
+        if colors is not None:
             if matchtype:
-                return match.group(1) + " ".join(colors)
+                return match.group(1) + colors
             else:
-                return match.group(1) + ": " + " ".join(colors)
+                return match.group(1) + ": " + colors
         else:
             return match.group()
             
-    def _dark_mode(self, html):
-        if self.dark_theme_enabled:
-            html = sub(self.inline_dark_theme_regexes[0], lambda match: match.group(1) + sub(self.inline_dark_theme_regexes[1], self._generate_altered_colour, match.group(2)), html)
-            for regex in self.general_dark_theme_regexes:
-                html = sub(regex, self._generate_altered_colour, html, flags=IGNORECASE)
-        return html
-    
-    def _css_dark_mode(self, data):
-        if self.dark_theme_enabled:
-            return sub(self.style_dark_theme_regex, lambda match, matchtype=0: self._generate_altered_colour(match, matchtype), data)
-        return data
-    
     # --- Miscellaneous -------------------------------------------------------
 
     def safe_tk_eval(self, expr):
@@ -1258,6 +1609,31 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         New in version 4.4."""
         return utilities.safe_tk_eval(self, expr)
 
+    def submit(self, func, *args, **kwargs):
+        """Call a function on the main thread and return a :py:class:`concurrent.futures.Future` that resolves to its return value.
+        If called from the main thread, the function is called immediately.
+
+        Running a whole function on the main thread is much faster than making many separate calls from a thread, each of which has to wait for the main thread.
+
+        :param func: The function to call. Any other arguments are passed to it.
+        :type func: function
+        :rtype: :py:class:`concurrent.futures.Future`
+        
+        New in version 4.26."""
+        return utilities.submit(self, func, *args, **kwargs)
+
+    def submit_batch(self, tasks):
+        """Evaluate several functions or Tcl expressions on the main thread in one go. 
+        Functions are called without arguments and strings are evaluated as Tcl expressions.
+
+        :param tasks: The functions and Tcl expressions to evaluate, in order.
+        :type tasks: iterable of functions or str
+        :return: One :py:class:`concurrent.futures.Future` for each task.
+        :rtype: list
+        
+        New in version 4.26."""
+        return utilities.submit_batch(self, tasks)
+
     def serialize_node(self, ib=3):
         """Pretty-print a node's contents. Similar to innerHTML, but formatted.
 
@@ -1467,6 +1843,9 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
             for node_handle in self.hovered_nodes:
                 self.event_manager.post_element_event(node_handle, "onmousedown", event)
 
+        if self.link_prefetch:
+            self.node_manager._on_link_mousedown()
+
         if self.hovered_nodes:
             node, offset = self.node(
                 True, event.x, event.y
@@ -1495,6 +1874,9 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
         self.hovered_nodes = []
         self.current_hovered_node = None
 
+        if self.link_prefetch:
+            self.node_manager._on_link_hover(self.hovered_nodes)
+
     def _handle_recursive_hovering(self, event, node_handle, prev_hovered_nodes):
         "Set hover flags on the parents of the hovered element."
         if node_handle not in self.hovered_nodes:
@@ -1552,6 +1934,9 @@ It is likely that not all dependencies are installed. Make sure Cairo is install
             self.hovered_nodes = []
             self._handle_recursive_hovering(event, useful_node_handle, prev_hovered_nodes)
 
+            if self.link_prefetch:
+                self.node_manager._on_link_hover(self.hovered_nodes)
+
             cursor = self.get_node_property(useful_node_handle, "cursor")
             if self.text_mode and not (event.state & 0x4):
                 self._set_cursor("text")
@@ -109,7 +109,10 @@ class HTMLDocument:
         :type text: str
 
         New in version 4.20."""
-        if self.html.parsing:
+        if self.html.parsing and self.html._parse_after is not None:
+            # The document is being parsed in chunks and the parser is waiting for the next one
+            self.html._insert_parse_chunk(" ".join(text))
+        elif self.html.parsing:
             self.html.write("text", text)
         else:
             self.html.reset()
@@ -278,7 +278,7 @@ class SelectionManager(utilities.BaseManager):
         selected_text = self.get_selection()
         self.html.clipboard_clear()
         self.html.clipboard_append(selected_text)
-        self.html.post_message(f"The text '{selected_text}' has been copied to the clipboard")
+        self.html.log(utilities.INFO, "The text '{}' has been copied to the clipboard", selected_text)
 
 
 class CaretManager(utilities.BaseManager):
@@ -1153,7 +1153,7 @@ class SearchManager(utilities.BaseManager):
                 nmatches += 1
 
             if len(match_indexes) > 0:
-                self.html.post_message(f"{nmatches} results for the search key '{searchtext}' have been found")
+                self.html.log(utilities.INFO, "{} results for the search key '{}' have been found", nmatches, searchtext)
                 if highlight_all:
                     for num, match in enumerate(match_indexes):
                         match = self.html.text("index", match_indexes[num][0])
@@ -1166,8 +1166,8 @@ class SearchManager(utilities.BaseManager):
                 # Highlight matches
                 if not test: self.update_tags(selected, matches)
             else:
-                self.html.post_message(f"No results for the search key '{searchtext}' could be found")
+                self.html.log(utilities.INFO, "No results for the search key '{}' could be found", searchtext)
             return nmatches, selected, matches
         except Exception as error:
-            self.html.post_message(f"ERROR: an error was encountered while searching for {searchtext}: {error}")
+            self.html.log(utilities.ERROR, "ERROR: an error was encountered while searching for {}: {}", searchtext, error)
             return nmatches, selected, matches
\ No newline at end of file
@@ -5,8 +5,9 @@ Copyright (c) 2021-2025 Andrew Clarke
 """
 
 import tkinter as tk
+import threading
 
-from urllib.parse import urlencode, urlparse
+from urllib.parse import urlencode, urlparse, urldefrag
 
 from . import subwidgets, utilities, imageutils, dom
 
@@ -17,11 +18,20 @@ class NodeManager(utilities.BaseManager):
 
         self._node_texts = {}
 
+        self._prefetch_url = None
+        self._prefetch_after = None
+        self._prefetch_nodes = ()
+        # Prefetch threads remove themselves once they finish, so this is only used while holding the lock
+        self._prefetches = {}
+        self._prefetches_lock = threading.Lock()
+
     def __repr__(self):
         return f"{self.html._w}::{self.__class__.__name__.lower()}"
     
     def reset(self):
         self._node_texts.clear()
+        self._cancel_prefetch(False)
+        self._prefetch_nodes = ()
 
     # --- Handle title, base, and meta elements -------------------------------
 
@@ -45,7 +55,7 @@ class NodeManager(utilities.BaseManager):
             if len(content) == 2:
                 if content[1].startswith("url="):
                     url = self.html.resolve_url(content[1].lstrip("url="))
-                    self.html.post_message(f"Redirecting to '{utilities.shorten(url)}'")
+                    self.html.log(utilities.DEBUG, "Redirecting to '{!u}'", url)
                     if self.html.on_link_click is not None:
                         if url not in self.html.visited_links:
                             self.html.visited_links.append(url)
@@ -76,13 +86,96 @@ class NodeManager(utilities.BaseManager):
         "Handle link clicks."
         href = self.html.get_node_attribute(node_handle, "href")
         url = self.html.resolve_url(href)
-        self.html.post_message(f"A link to '{utilities.shorten(url)}' was clicked")
+        # Keep prefetching the link's target, as it is about to be loaded
+        self._cancel_prefetch(False)
+        self.html.log(utilities.INFO, "A link to '{!u}' was clicked", url)
         if self.html.on_link_click is not None:
             self.html.set_node_flags(node_handle, "visited")
             if url not in self.html.visited_links:
                 self.html.visited_links.append(url)
             self.html.on_link_click(url)
 
+    # --- Prefetch hyperlinks -------------------------------------------------
+
+    def _on_link_hover(self, nodes):
+        "Schedule a prefetch of the hovered link's target, and cancel the previous one if the pointer moved elsewhere."
+        nodes = tuple(nodes)
+        if nodes == self._prefetch_nodes:
+            return
+        self._prefetch_nodes = nodes
+
+        url = None
+        for node in nodes:
+            if self.html.get_node_tag(node) == "a":
+                href = self.html.get_node_attribute(node, "href")
+                if href:
+                    url = self.html.resolve_url(href)
+                break
+
+        if url == self._prefetch_url:
+            return
+        
+        self._cancel_prefetch()
+        self._prefetch_url = url
+        if url and self.html.link_prefetch == "hover":
+            self._prefetch_after = self.html.after(self.html.link_prefetch_delay, self._prefetch)
+
+    def _on_link_mousedown(self):
+        "Prefetch the hovered link's target immediately."
+        if self._prefetch_url:
+            if self._prefetch_after:
+                self.html.after_cancel(self._prefetch_after)
+            self._prefetch()
+
+    def _cancel_prefetch(self, stop=True):
+        if self._prefetch_after:
+            self.html.after_cancel(self._prefetch_after)
+            self._prefetch_after = None
+        if stop:
+            # The prefetch thread removes itself once it finishes, so it may already be gone
+            with self._prefetches_lock:
+                thread = self._prefetches.pop(self._prefetch_url, None)
+            if thread is not None:
+                thread.stop()
+        self._prefetch_url = None
+
+    def _prefetch(self):
+        self._prefetch_after = None
+        url = self._prefetch_url
+        
+        if (not url) or (not url.startswith(("http://", "https://"))):
+            return
+        if not (self.html.caches_enabled and self.html.threading_enabled) or self.html.request_func is not None:
+            return
+        if urldefrag(url)[0] == urldefrag(self.html.base_url)[0]:
+            return
+        
+        if self.html._check_url_cache_state(url):
+            return
+        
+        origin = urlparse(url).netloc
+        with self._prefetches_lock:
+            if url in self._prefetches:
+                return
+            if sum(urlparse(prefetching).netloc == origin for prefetching in self._prefetches) >= self.html.link_prefetch_limit:
+                return
+            thread = utilities.StoppableThread(target=self._fetch_link, args=(url,))
+            self._prefetches[url] = thread
+        
+        self.html.log(utilities.DEBUG, "Prefetching {!u}", url)
+        thread.start()
+
+    def _fetch_link(self, url):
+        # NOTE: this runs in a thread
+        try:
+            self.html.download_url(url)
+        except Exception:
+            # Errors are reported if and when the link is navigated to
+            pass
+        with self._prefetches_lock:
+            if self._prefetches.get(url) is threading.current_thread():
+                del self._prefetches[url]
+
     # --- Handle body elements ------------------------------------------------
 
     def _on_body(self, node, index):
@@ -325,7 +418,7 @@ class FormManager(utilities.BaseManager):
         else:
             data = data.encode()
 
-        self.html.post_message(f"A form was submitted to {utilities.shorten(url)}")
+        self.html.log(utilities.INFO, "A form was submitted to {!u}", url)
         if self.html.on_form_submit is not None:
             self.html.on_form_submit(url, data, method)
 
@@ -341,7 +434,7 @@ class FormManager(utilities.BaseManager):
             self.waiting_forms += 1
         else:
             self.loaded_forms[node] = inputs
-            self.html.post_message("Successfully setup form")
+            self.html.log(utilities.DEBUG, "Successfully setup form")
             #self.html.post_message(f"Successfully setup form element {node}")
 
     def _on_table(self, node):
@@ -366,7 +459,7 @@ class FormManager(utilities.BaseManager):
             for form in inputs:
                 self.loaded_forms[form] = inputs[form]
                 self.waiting_forms -= 1
-                self.html.post_message("Successfully setup table form")
+                self.html.log(utilities.DEBUG, "Successfully setup table form")
                 #self.html.post_message(f"Successfully setup table form element {node}")
 
     # --- Handle dropdowns ----------------------------------------------------
@@ -603,12 +696,14 @@ class ScriptManager(utilities.BaseManager):
         thread = self.html._begin_download()
 
         if url and thread.isrunning():
-            self.html.post_message(f"Fetching script from {utilities.shorten(url)}", thread.is_subthread)
+            self.html.log(utilities.DEBUG, "Fetching script from {!u}", url, thread_safe=thread.is_subthread)
             try:
-                data = self.html.download_url(url)[1]
+                with self.html.performance._resource(url, "script"):
+                    data = self.html.download_url(url)[1]
+            except utilities.DownloadCancelled:
+                pass
             except Exception as error:
-                self.html.post_to_queue(lambda message=f"ERROR: could not load script {url}: {error}",
-                            url=url: self.html._finish_resource_load(message, url, "script", False), thread.is_subthread)
+                self.html._finish_resource_load(url, "script", False, error, thread.is_subthread)
 
         if data and thread.isrunning():
             if "defer" in attributes:
@@ -617,15 +712,15 @@ class ScriptManager(utilities.BaseManager):
                 self.html.post_to_queue(lambda attributes=attributes, data=data: self.html.on_script(attributes, data), thread.is_subthread)
                 
             if url:
-                self.html.post_to_queue(lambda message=f"Successfully loaded {utilities.shorten(url)}", 
-                            url=url: self.html._finish_resource_load(message, url, "script", True), thread.is_subthread)
+                self.html._finish_resource_load(url, "script", True, thread_safe=thread.is_subthread)
 
         self.html._finish_download(thread)
 
     def _submit_deferred_scripts(self):
         if self.pending_scripts:
             for index, script in enumerate(self.pending_scripts):
-                self.on_script(*script)
+                with self.html.performance._stage("script", deferred=True):
+                    self.on_script(*script)
             self.pending_scripts = []
 
 
@@ -668,11 +763,11 @@ class StyleManager(utilities.BaseManager):
         "Load @import scripts."
         try:
             new_url = self.html.resolve_url(new_url, parent_url)
-            self.html.post_message(f"Loading stylesheet from {utilities.shorten(new_url)}")
+            self.html.log(utilities.DEBUG, "Loading stylesheet from {!u}", new_url)
             self.html._thread_check(self.fetch_styles, new_url, media=media)
 
         except Exception as error:
-            self.html.post_message(f"ERROR: could not load stylesheet {new_url}: {error}")
+            self.html.log(utilities.ERROR, "ERROR: could not load stylesheet {}: {}", new_url, error)
            
     def _fix_css_urls(self, match, url):
         "Make relative uris in CSS files absolute."
@@ -688,31 +783,50 @@ class StyleManager(utilities.BaseManager):
 
         thread = self.html._begin_download()
         if url and thread.isrunning():
-            self.html.post_message(f"Fetching stylesheet from {utilities.shorten(url)}", thread.is_subthread)
+            self.html.log(utilities.DEBUG, "Fetching stylesheet from {!u}", url, thread_safe=thread.is_subthread)
             try:
-                data = self.html.download_url(url)[1]
-                if media is not None and media != "all": data = f"@media {media} {{{data}}}"
+                with self.html.performance._resource(url, "stylesheet"):
+                    data = self.html.download_url(url)[1]
 
                 if data and thread.isrunning():
-                    self.html.post_to_queue(lambda node=node, url=url, data=data: self._finish_fetching_styles(node, url, data), thread.is_subthread)
+                    self.html.post_to_queue(lambda node=node, url=url, data=data, media=media: self._finish_fetching_styles(node, url, data, media), thread.is_subthread, utilities.PRIORITY_HIGH)
 
+            except utilities.DownloadCancelled:
+                pass
             except Exception as error:
-                self.html.post_to_queue(lambda message=f"ERROR: could not load stylesheet {url}: {error}",
-                    url=url: self.html._finish_resource_load(message, url, "stylesheet", False), thread.is_subthread)
+                self.html._finish_resource_load(url, "stylesheet", False, error, thread.is_subthread)
                         
         self.html._finish_download(thread)
 
-    def _finish_fetching_styles(self, node=None, url=None, data=None):
+    def _process_styles(self, data, media):
+        "Wrap a stylesheet in its media query and apply crash prevention and the dark theme to it."
+        if media is not None and media != "all": 
+            data = f"@media {media} {{{data}}}"
+        return self.html._preprocess(data, css=True)
+
+    def _finish_fetching_styles(self, node=None, url=None, data=None, media=None):
         # NOTE: this must run in the main thread
 
         self.html._style_count += 1
         sheetid = "user." + str(self.html._style_count).zfill(4)
 
-        self.html.parse_css(f"{sheetid}.9999", data, url)
+        if url and self.html.caches_enabled:
+            # A fingerprint of the raw stylesheet is kept with the result so that the result is only reused while the stylesheet is unchanged
+            # Strings cache their hash, so this is free when the stylesheet came from the cache
+            key = (url, media, self.html._get_preprocessing_key(css=True))
+            fingerprint = (len(data), hash(data))
+            cached_fingerprint, processed = self.html.cache.stylesheets.get(key, (None, None))
+            if cached_fingerprint != fingerprint:
+                processed = self._process_styles(data, media)
+                self.html.cache.stylesheets.set(key, (fingerprint, processed), len(processed))
+        else:
+            processed = self._process_styles(data, media)
+
+        self.html._parse_css(f"{sheetid}.9999", processed, url)
         if node:
             self.html.event_manager.post_element_event(node, "onload", None, utilities.ELEMENT_LOADED_EVENT)
         if url:
-            self.html.post_message(f"Successfully loaded {utilities.shorten(url)}")
+            self.html.log(utilities.DEBUG, "Successfully loaded {!u}", url)
             if self.html.on_resource_setup is not None:
                 self.html.on_resource_setup(url, "stylesheet", True)
 
@@ -725,7 +839,7 @@ class ImageManager(utilities.BaseManager):
         self.loaded_images = {}
         self.image_directory = {}
         self.bad_paths = set()
-        self.loaded_image_counter = 0
+        self.loaded_image_counter = utilities.AtomicCounter()
         self.image_name_prefix = f"_tkinterweb_img_{id(self.html)}_"
 
     def __repr__(self):
@@ -802,10 +916,10 @@ class ImageManager(utilities.BaseManager):
                     url.startswith("repeating-linear-gradient("),
                     url.startswith("repeating-radial-gradient("),
                 }):
-                self.html.post_message(f"Fetching image: {utilities.shorten(url)}")
+                self.html.log(utilities.DEBUG, "Fetching image: {!u}", url)
                 self.load_alt_text(url, name)
                 for image in url.split(","):
-                    self.html.post_message(f"ERROR: could not display the image {utilities.shorten(url)} because it is not supported yet")
+                    self.html.log(utilities.ERROR, "ERROR: could not display the image {!u} because it is not supported yet", url)
                 if self.html.on_resource_setup is not None:
                     self.html.on_resource_setup(url, "image", False)
             else:
@@ -821,22 +935,25 @@ class ImageManager(utilities.BaseManager):
 
         thread = self.html._begin_download()
         if thread.isrunning():
-            self.html.post_message(f"Fetching image from {utilities.shorten(url)}", thread.is_subthread)
+            self.html.log(utilities.DEBUG, "Fetching image from {!u}", url, thread_safe=thread.is_subthread)
 
             if url == self.html.base_url:
                 self.html.post_to_queue(lambda url=url, name=name, error="ERROR: image url not specified": 
-                                        self._on_image_error(url, name, error), thread.is_subthread)
+                                        self._on_image_error(url, name, error), thread.is_subthread, utilities.PRIORITY_LOW)
             else:
                 try:
-                    url, data, filetype, code = self.html.download_url(url)
+                    with self.html.performance._resource(url, "image"):
+                        url, data, filetype, code = self.html.download_url(url)
                     data, data_is_image = self.check_images(data, name, url, filetype, thread.is_subthread)                
                         
                     if thread.isrunning():
                         self.html.post_to_queue(lambda data=data, name=name, url=url, filetype=filetype, data_is_image=data_is_image: 
-                                                self.finish_fetching_images(data, name, url, filetype, data_is_image), thread.is_subthread)
+                                                self.finish_fetching_images(data, name, url, filetype, data_is_image), thread.is_subthread, utilities.PRIORITY_LOW)
+                except utilities.DownloadCancelled:
+                    pass
                 except Exception as error:
                     self.html.post_to_queue(lambda url=url, name=name, error=f"ERROR: could not load image {url}: {error}": 
-                                            self._on_image_error(url, name, error), thread.is_subthread)
+                                            self._on_image_error(url, name, error), thread.is_subthread, utilities.PRIORITY_LOW)
 
         self.html._finish_download(thread)
 
@@ -845,19 +962,27 @@ class ImageManager(utilities.BaseManager):
         # NOTE: this may run in a thread
 
         data_is_image = False
+        threshold = self.html.image_processing_threshold
+        log = lambda message, *args: self.html.log(utilities.WARNING, "WARNING: " + message, *args, thread_safe=thread_safe)
         if "svg" in filetype:
             try:
-                data = imageutils.svg_to_png(data)
+                if threshold is not None and len(data) >= threshold:
+                    data = imageutils.run_in_process(imageutils.svg_to_png, data, log=log)
+                else:
+                    data = imageutils.svg_to_png(data)
             except (ValueError, ImportError, ModuleNotFoundError,):
                 raise RuntimeError(f"could not display the image {url}: either PyGObject, CairoSVG, or both PyCairo and Rsvg must be installed to parse .svg files.")
             
         if self.html.image_inversion_enabled:
             try:
-                data = imageutils.invert_image(data, self.html.dark_theme_limit)
+                if threshold is not None and len(data) >= threshold:
+                    data = imageutils.invert_image_in_process(data, self.html.dark_theme_limit, log)
+                else:
+                    data = imageutils.invert_image(data, self.html.dark_theme_limit)
                 data_is_image = True
             except (ImportError, ModuleNotFoundError,):
                 error = f"ERROR: could not invert the image {url}: PIL and PIL.ImageTk must be installed."
-                self.html.post_to_queue(lambda url=url, name=name, error=error: self._on_image_error(url, name, error), thread_safe)
+                self.html.post_to_queue(lambda url=url, name=name, error=error: self._on_image_error(url, name, error), thread_safe, utilities.PRIORITY_LOW)
             
         return data, data_is_image
 
@@ -865,9 +990,10 @@ class ImageManager(utilities.BaseManager):
         # NOTE: this must run in the main thread
 
         try:
-            image = imageutils.data_to_image(data, name, filetype, data_is_image)
+            with self.html.performance._stage("image-decode", url=url):
+                image = imageutils.data_to_image(data, name, filetype, data_is_image)
             
-            self.html.post_message(f"Successfully loaded {utilities.shorten(url)}")
+            self.html.log(utilities.DEBUG, "Successfully loaded {!u}", url)
             if self.html.on_resource_setup is not None:
                 self.html.on_resource_setup(url, "image", True)
             if url in self.image_directory:
@@ -901,9 +1027,7 @@ class ImageManager(utilities.BaseManager):
 
     def allocate_image_name(self):
         "Get a unique image name."
-        name = self.image_name_prefix + str(self.loaded_image_counter)
-        self.loaded_image_counter += 1
-        return name
+        return self.image_name_prefix + str(next(self.loaded_image_counter))
     
 class ObjectManager(utilities.BaseManager):
     "Handle objects."
@@ -934,7 +1058,7 @@ class ObjectManager(utilities.BaseManager):
             self._create_iframe(node, None, srcdoc, scrolling)
         elif src and (src != self.html.base_url):
             src = self.html.resolve_url(src)
-            self.html.post_message(f"Creating iframe from {utilities.shorten(src)}")
+            self.html.log(utilities.DEBUG, "Creating iframe from {!u}", src)
             self._create_iframe(node, src, vertical_scrollbar=scrolling)
 
     def _on_iframe_value_change(self, node, attribute, value):
@@ -964,7 +1088,10 @@ class ObjectManager(utilities.BaseManager):
                 crash_prevention_enabled = self.html.crash_prevention_enabled,
                 dark_theme_enabled = self.html.dark_theme_enabled,
                 image_inversion_enabled = self.html.image_inversion_enabled,
+                image_processing_threshold = self.html.image_processing_threshold,
                 caches_enabled = self.html.caches_enabled,
+                preloading_enabled = self.html.preloading_enabled,
+                cache_partition = self.html.cache_partition,
                 threading_enabled = self.html.threading_enabled,
                 image_alternate_text_enabled = self.html.image_alternate_text_enabled,
                 selection_enabled = self.html.selection_enabled,
@@ -978,6 +1105,7 @@ class ObjectManager(utilities.BaseManager):
                 insecure_https = self.html.insecure_https,
                 ssl_cafile = self.html.ssl_cafile,
                 request_timeout = self.html.request_timeout,
+                hedge_percentile = self.html.hedge_percentile,
                 caret_browsing_enabled = self.html.caret_browsing_enabled
             )
 
@@ -992,7 +1120,7 @@ class ObjectManager(utilities.BaseManager):
                 node, widgetid, lambda widgetid=widgetid: self.html.widget_manager._handle_node_removal(widgetid), allowscrolling=False, check=False
             )
         else:
-            self.html.post_message(f"WARNING: the embedded page {url} could not be shown because no embed widget was provided.")
+            self.html.log(utilities.WARNING, "WARNING: the embedded page {} could not be shown because no embed widget was provided.", url)
 
     # --- Handle objects ------------------------------------------------------
 
@@ -1014,7 +1142,7 @@ class ObjectManager(utilities.BaseManager):
                     # Otherwise the page will load the same object indefinitely and freeze the GUI forever
                     return
 
-                self.html.post_message(f"Creating object from {utilities.shorten(data)}")
+                self.html.log(utilities.DEBUG, "Creating object from {!u}", data)
                 self.html._thread_check(self.fetch_objects, data, node)
 
     def _on_object_value_change(self, node, attribute, value):
@@ -1033,20 +1161,23 @@ class ObjectManager(utilities.BaseManager):
 
         if thread.isrunning():
             try:
-                url, data, filetype, code = self.html.download_url(url)
+                with self.html.performance._resource(url, "object"):
+                    url, data, filetype, code = self.html.download_url(url)
 
                 if data and thread.isrunning():
                     if filetype.startswith("image"):
                         name = self.html.image_manager.allocate_image_name()
                         data, data_is_image = self.html.image_manager.check_images(data, name, url, filetype, thread.is_subthread)
                         self.html.post_to_queue(lambda node=node, data=data, name=name, url=url, filetype=filetype, data_is_image=data_is_image: 
-                                                self._finish_fetching_image_objects(node, data, name, url, filetype, data_is_image), thread.is_subthread)
+                                                self._finish_fetching_image_objects(node, data, name, url, filetype, data_is_image), thread.is_subthread, utilities.PRIORITY_LOW)
                     elif filetype == "text/html":
                         self.html.post_to_queue(lambda node=node, data=data, url=url, filetype=filetype: 
                                                 self._finish_fetching_HTML_objects(node, data, url, filetype), thread.is_subthread)
 
+            except utilities.DownloadCancelled:
+                pass
             except Exception as error:
-                self.html.post_message(f"ERROR: could not load object element with data {url}: {error}", True)
+                self.html.log(utilities.ERROR, "ERROR: could not load object element with data {}: {}", url, error, thread_safe=True)
         
         self.html._finish_download(thread)
 
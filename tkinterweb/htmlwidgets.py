@@ -63,6 +63,10 @@ class HtmlFrame(Frame):
     :type messages_enabled: bool
     :param message_func: The function to be called when a debug message is issued. Prior to version 4.25 this only works if messages are enabled. The message will be passed as an argument. If unset and enabled, by default the message is printed.
     :type message_func: None or function
+    :param message_level: The lowest level of messages to show or keep, such as :data:`.utilities.DEBUG` (the default), :data:`.utilities.INFO`, :data:`.utilities.WARNING`, or :data:`.utilities.ERROR`. Messages below this level are discarded before they are formatted. New in version 4.26.
+    :type message_level: int
+    :param message_log_size: The number of recent messages to keep in :attr:`.TkinterWeb.message_log` for diagnostics, whether or not messages are enabled. Once full, the oldest messages are discarded. If 0 (the default), messages are not kept. New in version 4.26.
+    :type message_log_size: int
 
     Features:
 
@@ -78,8 +82,16 @@ class HtmlFrame(Frame):
     :type forms_enabled: bool
     :param objects_enabled: Enable/disable embedding of ``<object>`` and ``<iframe>`` elements. This is enabled by default.
     :type objects_enabled: bool
-    :param caches_enabled: Enable/disable caching. Disabling this option will conserve memory, but will also result in longer page and image reload times. This is enabled by default. Largely for debugging.
+    :param preloading_enabled: Enable/disable preloading. If enabled, the stylesheets, scripts, and images referenced by a page are downloaded into the cache as soon as the page is downloaded, before the page is parsed. Has no effect if caching or threading is disabled. This is enabled by default. New in version 4.26.
+    :type preloading_enabled: bool
+    :param caches_enabled: Enable/disable caching. Disabling this option will conserve memory, but will also result in longer page and image reload times. This is enabled by default. Largely for debugging. Since version 4.26, disabling caching only clears the cache if :attr:`cache_partition` is set.
     :type caches_enabled: bool
+    :param cache_partition: The cache to store downloaded files in. By default, all widgets share the same cache. Pass a :class:`~tkinterweb.utilities.LRUCache` instance to give this widget, or a group of widgets, a separate cache with its own size limits. Embedded documents use the same cache as their parent. New in version 4.26.
+    :type cache_partition: None or :class:`~tkinterweb.utilities.LRUCache`
+    :param bfcache_limit: The number of recently visited pages to keep alive in the back/forward cache. When a cached page is loaded again with ``HtmlFrame.load_url(url, from_history=True)``, eg. when the user presses the back or forward button, it is shown immediately with its scroll position, form values, and images intact instead of being downloaded and parsed again. Other navigation, such as following a link to a page visited earlier, always loads a fresh copy and discards the cached one. Only pages that have finished loading and were not loaded from a form submission are cached. Bindings made with :meth:`HtmlFrame.bind` apply to every cached page, but changes made directly to :attr:`HtmlFrame.html` only apply to the page that is currently shown. If 0 (the default), pages are not cached. New in version 4.26.
+    :type bfcache_limit: int
+    :param bfcache_memory_limit: The estimated number of bytes that cached pages may use, based on the size of their documents and images. The least recently visited pages are discarded first. The default is 64 MiB. New in version 4.26.
+    :type bfcache_memory_limit: int
     :param crash_prevention_enabled: Enable/disable crash prevention. In older Tkhtml versions, disabling this option may improve page load speed, but crashes will occur on some websites. This is enabled by default. Largely for debugging.
     :type crash_prevention_enabled: bool
     :param events_enabled: Enable/disable generation of Tk events. This is enabled by default. Largely for debugging.
@@ -96,8 +108,12 @@ class HtmlFrame(Frame):
     :type dark_theme_enabled: bool
     :param image_inversion_enabled: Enable/disable image inversion. If enabled, an algorithm will attempt to detect and invert images with a predominantly light-coloured background. Photographs and dark-coloured images should be left as is. This feature is a work-in-progress and may cause hangs or crashes on more complex websites.
     :type image_inversion_enabled: bool
+    :param image_processing_threshold: The size, in bytes, above which SVG images are converted and images are inverted in a separate process. This keeps large images from slowing down the user interface while they are processed, at the cost of starting a pool of worker processes. The worker processes are started by importing the app's main module, so it must be protected by ``if __name__ == "__main__":``. If None (the default), images are always processed in the thread that loaded them. New in version 4.26.
+    :type image_processing_threshold: None or int
     :param ignore_invalid_images: If enabled and alt text is disabled or the image has no alt text, a broken image icon will be displayed in place of the image.
     :type ignore_invalid_images: bool
+    :param parse_chunk_size: The number of characters above which documents are parsed in chunks of this size, letting the app handle input and redraw between them. ``<<ParseProgress>>`` is generated after each chunk and :attr:`.TkinterWeb.parse_progress` reports how much of the document has been parsed. ``<<DOMContentLoaded>>`` is still only generated once the whole document has been parsed. If None (the default), documents are parsed all at once. New in version 4.26.
+    :type parse_chunk_size: None or int
 
     Widget colours and styling:
 
@@ -120,12 +136,26 @@ class HtmlFrame(Frame):
     :type insecure_https: bool
     :param ssl_cafile: Path to a file containing CA certificates. This can be used to work around issues where :py:mod:`ssl` is unable to get a page's certificate on some older Mac systems. New in version 4.5.
     :type ssl_cafile: None or str
+    :param link_prefetch: If set to "hover", the target of a hyperlink is downloaded into the cache once the mouse pointer rests over the link. If set to "mousedown", the target is downloaded when the mouse button is pressed on the link. This can hide some of the latency of navigating to a new page. The download is cancelled if the pointer moves away without clicking. Has no effect if caching or threading is disabled or if :attr:`request_func` is set. This is disabled by default. New in version 4.26.
+    :type link_prefetch: False, "hover", or "mousedown"
+    :param link_prefetch_delay: The number of milliseconds the mouse pointer must rest on a hyperlink before its target is prefetched when :attr:`link_prefetch` is set to "hover". New in version 4.26.
+    :type link_prefetch_delay: int
+    :param link_prefetch_limit: The maximum number of pages that may be prefetched from the same website at once. New in version 4.26.
+    :type link_prefetch_limit: int
     :param headers: The headers used by urllib's :py:class:`~urllib.request.Request` when fetching a resource.
     :type headers: dict
     :param request_timeout: The number of seconds to wait when fetching a resource before timing out. New in version 4.6.
     :type request_timeout: int
-    :param request_func: The function to be called when a resource is requested. This overrides all other download settings. The callback must accept the following arguments: the resource's url, data, method ("GET" or "POST"), and encoding. The callback must return the following: url, data, file type, and HTTP code.
+    :param load_deadline: The number of milliseconds after a page starts loading to wait for its images, stylesheets, scripts, and objects before generating ``<<DoneLoading>>``. Resources that finish loading after the deadline no longer generate ``<<DoneLoading>>``. If None (the default), there is no deadline. New in version 4.26.
+    :type load_deadline: None or int
+    :param load_deadline_abandon: If True, resources that are still loading when :attr:`load_deadline` passes are abandoned. Otherwise, they continue to load in the background. This is disabled by default. New in version 4.26.
+    :type load_deadline_abandon: bool
+    :param hedge_percentile: If set, a download that takes longer than this percentage of recent downloads is requested a second time and whichever response arrives first is used. This can cut the time spent waiting on slow servers at the cost of some extra traffic. Only GET requests are repeated. If None (the default), requests are never repeated. New in version 4.26.
+    :type hedge_percentile: None or int
+    :param request_func: The function to be called when a resource is requested. This overrides all other download settings. The callback must accept the following arguments: the resource's url, data, method ("GET" or "POST"), and encoding. The callback must return the following: url, data, file type, and HTTP code. Since version 4.26 the callback may instead return a :py:class:`concurrent.futures.Future` or an awaitable that resolves to the same. Images, stylesheets, scripts, and objects are then loaded when the response arrives instead of blocking a thread while waiting for it.
     :type request_func: None or function
+    :param request_loop: The :py:mod:`asyncio` event loop used to run awaitables returned by :attr:`request_func`. The loop should be running in another thread. If None, awaitables are run to completion in the thread that requested the resource. New in version 4.26.
+    :type request_loop: None or :py:class:`asyncio.AbstractEventLoop`
 
     HTML rendering behaviour:
 
@@ -149,17 +179,21 @@ class HtmlFrame(Frame):
                     vertical_scrollbar = utilities.UNSET, horizontal_scrollbar = utilities.UNSET, \
                     on_navigate_fail = utilities.UNSET, on_link_click = utilities.UNSET, on_form_submit = utilities.UNSET, 
                     on_script = utilities.UNSET, on_element_script = utilities.UNSET, on_resource_setup = utilities.UNSET, \
-                    message_func = utilities.UNSET, request_func = utilities.UNSET, caret_browsing_enabled = utilities.UNSET, 
+                    message_func = utilities.UNSET, message_level = utilities.UNSET, message_log_size = utilities.UNSET, request_func = utilities.UNSET, request_loop = utilities.UNSET, caret_browsing_enabled = utilities.UNSET, 
                     selection_enabled = utilities.UNSET, stylesheets_enabled = utilities.UNSET, images_enabled = utilities.UNSET, \
-                    forms_enabled = utilities.UNSET, objects_enabled = utilities.UNSET, caches_enabled = utilities.UNSET, \
-                    dark_theme_enabled = utilities.UNSET, image_inversion_enabled = utilities.UNSET, \
+                    forms_enabled = utilities.UNSET, objects_enabled = utilities.UNSET, caches_enabled = utilities.UNSET, cache_partition = utilities.UNSET, \
+                    bfcache_limit = utilities.UNSET, bfcache_memory_limit = utilities.UNSET, \
+                    preloading_enabled = utilities.UNSET, \
+                    dark_theme_enabled = utilities.UNSET, image_inversion_enabled = utilities.UNSET, image_processing_threshold = utilities.UNSET, \
                     javascript_enabled = utilities.UNSET, javascript_backend = utilities.UNSET, events_enabled = utilities.UNSET, \
                     threading_enabled = utilities.UNSET, crash_prevention_enabled = utilities.UNSET, \
-                    image_alternate_text_enabled = utilities.UNSET, ignore_invalid_images = utilities.UNSET, \
+                    image_alternate_text_enabled = utilities.UNSET, ignore_invalid_images = utilities.UNSET, parse_chunk_size = utilities.UNSET, \
                     visited_links = utilities.UNSET, find_match_highlight_color = utilities.UNSET, find_match_text_color = utilities.UNSET, \
                     find_current_highlight_color = utilities.UNSET, find_current_text_color = utilities.UNSET, \
                     selected_text_highlight_color = utilities.UNSET, selected_text_color = utilities.UNSET, \
                     insecure_https = utilities.UNSET, ssl_cafile = utilities.UNSET, request_timeout = utilities.UNSET, \
+                    load_deadline = utilities.UNSET, load_deadline_abandon = utilities.UNSET, hedge_percentile = utilities.UNSET, \
+                    link_prefetch = utilities.UNSET, link_prefetch_delay = utilities.UNSET, link_prefetch_limit = utilities.UNSET, \
                     headers = utilities.UNSET, experimental = utilities.UNSET, use_prebuilt_tkhtml = utilities.UNSET, \
                     tkhtml_version = utilities.UNSET, parsemode = utilities.UNSET, shrink = utilities.UNSET, textwrap = utilities.UNSET, \
                     mode = utilities.UNSET, defaultstyle = utilities.UNSET, height = utilities.UNSET, width = utilities.UNSET, **kwargs):
@@ -177,6 +211,9 @@ class HtmlFrame(Frame):
         self._prev_configure = ()
         self._button = None
         self._style = None
+        self._bindings = []
+        self._bfcache = OrderedDict()
+        self._bfcache_spare = None
 
         ### TODO: Would be lovely to make it more Tk-ish: i.e.
         # zoom
@@ -242,6 +279,8 @@ class HtmlFrame(Frame):
             "vertical_scrollbar": {"default": "dynamic", "type": "scrollbar"},
             "horizontal_scrollbar": {"default": False, "type": "scrollbar"},
             "javascript_backend": {"default": "pythonmonkey", "type": str},
+            "bfcache_limit": {"default": 0, "type": int},
+            "bfcache_memory_limit": {"default": 67108864, "type": int},
             "unshrink": {"default": False},
             "about_page_background": {"default": "", "deprecated": "ttk.Style().configure('TFrame', background=)"},
             "about_page_foreground": {"default": "", "deprecated": "ttk.Style().configure('TFrame', foreground=)"},
@@ -255,6 +294,8 @@ class HtmlFrame(Frame):
             "on_resource_setup": {"default": None, "type": "callable"},
             "message_func": {"default": None, "type": "callable"},
             "messages_enabled": {"default": False, "type": bool},
+            "message_level": {"default": utilities.DEBUG, "type": int},
+            "message_log_size": {"default": 0, "type": int},
             "caret_browsing_enabled": {"default": False, "type": bool},
             "selection_enabled": {"default": True, "type": bool},
             "stylesheets_enabled": {"default": True, "type": bool},
@@ -262,8 +303,12 @@ class HtmlFrame(Frame):
             "forms_enabled": {"default": True, "type": bool},
             "objects_enabled": {"default": True, "type": bool},
             "caches_enabled": {"default": True, "type": bool},
+            "cache_partition": {"default": None},
+            "preloading_enabled": {"default": True, "type": bool},
             "dark_theme_enabled": {"default": False, "type": bool},
             "image_inversion_enabled": {"default": False, "type": bool},
+            "image_processing_threshold": {"default": None, "type": "noneint"},
+            "parse_chunk_size": {"default": None, "type": "noneint"},
             "crash_prevention_enabled": {"default": True, "type": bool},
             "events_enabled": {"default": True, "type": bool},
             "threading_enabled": {"default": True, "type": bool},
@@ -280,10 +325,17 @@ class HtmlFrame(Frame):
             "default_style": {"default": utilities.DEFAULT_STYLE, "deprecated": "utilities.DEFAULT_STYLE or defaultstyle"},
             "dark_style": {"default": utilities.DARK_STYLE, "deprecated": "utilities.DARK_STYLE or defaultstyle"},
             "request_func": {"default": None, "type": "callable"},
+            "request_loop": {"default": None},
             "insecure_https": {"default": utilities.INSECURE_HTTPS, "type": bool},
             "ssl_cafile": {"default": utilities.SSL_CAFILE, "type": "nonestr"},
             "request_timeout": {"default": utilities.REQUEST_TIMEOUT, "type": int},
+            "load_deadline": {"default": None, "type": "noneint"},
+            "load_deadline_abandon": {"default": False, "type": bool},
+            "hedge_percentile": {"default": None, "type": "noneint"},
             "headers": {"default": utilities.HEADERS, "type": dict},
+            "link_prefetch": {"default": False, "type": "prefetch"},
+            "link_prefetch_delay": {"default": 80, "type": int},
+            "link_prefetch_limit": {"default": 2, "type": int},
             "experimental": {"default": False, "type": "autobool", "changeable": False},
             "use_prebuilt_tkhtml": {"default": True, "type": bool, "changeable": False},
             "tkhtml_version": {"default": "auto", "type": "autofloat", "changeable": False},
@@ -316,15 +368,14 @@ class HtmlFrame(Frame):
         super().__init__(master, **kwargs)
 
         # Setup sub-widgets
-        self._html = html = bindings.TkinterWeb(self, _tkinterweb_options, **_tkhtml_options)
-        self._hsb = hsb = subwidgets.AutoScrollbar(self, orient="horizontal", command=html.xview)
-        self._vsb = vsb = subwidgets.AutoScrollbar(self, orient="vertical", command=html.yview)
-
-        html.configure(xscrollcommand=hsb.set, yscrollcommand=vsb.set)
+        self._hsb = hsb = subwidgets.AutoScrollbar(self, orient="horizontal")
+        self._vsb = vsb = subwidgets.AutoScrollbar(self, orient="vertical")
+        self._html_options = (_tkinterweb_options, _tkhtml_options)
+        self._html = html = self._create_html(_tkinterweb_options, _tkhtml_options)
+        self._attach_html(html)
 
         self.columnconfigure(0, weight=1)
         self.rowconfigure(0, weight=1)
-        html.grid(row=0, column=0, sticky="nsew")
         hsb.grid(row=1, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="nsew")
 
@@ -341,31 +392,22 @@ class HtmlFrame(Frame):
             self.bind_class("Html", "<Shift-Button-4>", html._xscroll_x11)
             self.bind_class("Html", "<Shift-Button-5>", html._xscroll_x11)
 
-        for i in (f"{html}.document", html.scrollable_node_tag):
-            self.bind_class(i, "<MouseWheel>", html._scroll)
-            self.bind_class(i, "<Shift-MouseWheel>", html._xscroll)
-
-        self.bind_class(html.scrollable_node_tag, "<Button-4>", lambda event, widget=html: html._scroll_x11(event, widget))
-        self.bind_class(html.scrollable_node_tag, "<Button-5>", lambda event, widget=html: html._scroll_x11(event, widget))
-        self.bind_class(html.scrollable_node_tag, "<Shift-Button-4>", lambda event, widget=html: html._xscroll_x11(event, widget))
-        self.bind_class(html.scrollable_node_tag, "<Shift-Button-5>", lambda event, widget=html: html._xscroll_x11(event, widget))
-
         # Overwrite the default bindings for scrollbars so that:
         # A) scrolling on the page while loading stops it from tracking the fragment
         # B) scrolling horizontally on a vertical scrollbar scrolls horizontally (the default is to scroll vertically)
         # C) scrolling vertically on a horizontal scrollbar scrolls vertically (the default is to block scrolling)
+        # The html widget is looked up each time because it changes when a page is restored from the back/forward cache
         for i in (vsb, hsb):
-            i.bind("<Button-4>", lambda event, widget=html: html._scroll_x11(event, widget))
-            i.bind("<Button-5>", lambda event, widget=html: html._scroll_x11(event, widget))
-            i.bind("<MouseWheel>", html._scroll)
-            i.bind("<Shift-Button-4>", lambda event, widget=html: html._xscroll_x11(event, widget))
-            i.bind("<Shift-Button-5>", lambda event, widget=html: html._xscroll_x11(event, widget))
-            i.bind("<Shift-MouseWheel>", html._xscroll)
-            i.bind("<Enter>", html._on_leave)
-
-        self.bind("<Leave>", html._on_leave)
-        self.bind("<Enter>", html._on_mouse_motion)
-        self.bind_class(html.tkinterweb_tag, "<Configure>", self._handle_html_resize)
+            i.bind("<Button-4>", lambda event: self._html._scroll_x11(event, self._html))
+            i.bind("<Button-5>", lambda event: self._html._scroll_x11(event, self._html))
+            i.bind("<MouseWheel>", lambda event: self._html._scroll(event))
+            i.bind("<Shift-Button-4>", lambda event: self._html._xscroll_x11(event, self._html))
+            i.bind("<Shift-Button-5>", lambda event: self._html._xscroll_x11(event, self._html))
+            i.bind("<Shift-MouseWheel>", lambda event: self._html._xscroll(event))
+            i.bind("<Enter>", lambda event: self._html._on_leave(event))
+
+        self.bind("<Leave>", lambda event: self._html._on_leave(event))
+        self.bind("<Enter>", lambda event: self._html._on_mouse_motion(event))
         
         if shrink: super().bind("<Configure>", self._handle_frame_resize)
 
@@ -425,6 +467,15 @@ class HtmlFrame(Frame):
         
         :rtype: :class:`~tkinterweb.TkinterWeb`"""
         return self._html
+
+    @property
+    def performance(self):
+        """The page load timeline. Use this to find out where the time taken to load the current page went. This is also available as ``performance`` from JavaScript.
+        
+        :rtype: :class:`~tkinterweb.utilities.Performance`
+        
+        New in version 4.26."""
+        return self._html.performance
     
     def grid_propagate(self, *args, **kwargs):
         ""
@@ -453,6 +504,7 @@ class HtmlFrame(Frame):
             base_url = f"file://{path}/"
 
         self._current_url = ""
+        self._html.performance._start_navigation(base_url)
 
         self._load_html(html_source, base_url, fragment)    
 
@@ -465,12 +517,11 @@ class HtmlFrame(Frame):
         self._html.reset(_thread_safe)
         self._html.base_url = base_url
         self._html.fragment = fragment
-        self._html.parse(html_source, _thread_safe)
-
         if _thread_safe:
-            self._html.post_to_queue(self._finish_loading_html)
-        else:
-            self._finish_loading_html()
+            # Warm the cache while the document is being processed and parsed
+            self._html.preload_resources(html_source, base_url)
+        # The widget calls _finish_loading_html once the whole document has been parsed
+        self._html.parse(html_source, _thread_safe)
     
     def _finish_loading_html(self):
         # NOTE: must be run from main thread
@@ -508,7 +559,7 @@ class HtmlFrame(Frame):
             website_url = "http://" + str(website_url)
         self.load_url(website_url, decode, force)
 
-    def load_url(self, url, decode=None, force=False):
+    def load_url(self, url, decode=None, force=False, from_history=False):
         """Loads and renders HTML from the given url. 
         
         A local file will be loaded if the url begins with "file://". 
@@ -521,7 +572,9 @@ class HtmlFrame(Frame):
         :param decode: The decoding to use when loading the url.
         :type decode: str or None, optional
         :param force: Force the page to reload all elements.
-        :type force: bool, optional"""
+        :type force: bool, optional
+        :param from_history: Set this to True when going back or forward through your app's history, so that the page can be restored from the back/forward cache. See :attr:`bfcache_limit`. New in version 4.26.
+        :type from_history: bool, optional"""
         ### TODO: Maybe consider merging load_url, load_file, and load_website into one
         ### One could use the checker from the sample web browser
         if not self._current_url == url:
@@ -531,6 +584,14 @@ class HtmlFrame(Frame):
             self._update_current_url(url, False)
             return self._load_html(self._get_about_page(url), url)
 
+        if self.bfcache_limit:
+            if from_history and not force and self._bfcache_restore(url):
+                return
+            # Only history navigation restores pages, so any other visit makes the cached copy stale
+            self._bfcache_discard(url)
+            self._bfcache_store(url)
+
+        self._html.performance._start_navigation(url)
         self._waiting_for_reset = True
 
         # Set the base url now in case it takes a while for the website to download
@@ -539,7 +600,7 @@ class HtmlFrame(Frame):
         if self._thread_in_progress:
             self._thread_in_progress.stop()
             
-        if not self._html.threading_enabled or url.startswith("file://"):
+        if not self._html.threading_enabled or url.startswith("file://") or utilities.get_resource_bundle(url):
             #or self._html._check_url_cache_state(url, "", "GET", decode):
             self._continue_loading(url, decode=decode, force=force)
         else:
@@ -564,6 +625,9 @@ class HtmlFrame(Frame):
         self._previous_url = self._current_url
         if self._thread_in_progress:
             self._thread_in_progress.stop()
+        if self.bfcache_limit:
+            self._bfcache_store(url)
+        self._html.performance._start_navigation(url)
         if self._html.threading_enabled:
             thread = utilities.StoppableThread(
                 target=self._continue_loading, args=(url, data, method, decode, force, True))
@@ -609,12 +673,12 @@ class HtmlFrame(Frame):
                 self._html.insert_node_before(body, node, child)
             if return_element:
                 node = dom.HTMLElement(self.document, node)
+            self._finish_css()
+            self._handle_html_resize(force=True)
         else:
+            # The widget calls _finish_loading_html once the HTML has been parsed
             self._html.parse(html_source)
 
-        self._finish_css()
-        self._handle_html_resize(force=True)
-
         return node
     
     def insert_html(self, html_source, index=0, return_element=False):
@@ -705,7 +769,7 @@ class HtmlFrame(Frame):
         :rtype: :py:class:`PIL.Image`
         :raise NotImplementedError: If experimental mode is not enabled, :attr:`full` is set to True, and TkinterWeb is running on Windows."""
         if self._html.experimental or utilities.PLATFORM.system != "Windows":
-            self._html.post_message(f"Taking a screenshot of {self._current_url}...")
+            self._html.log(utilities.INFO, "Taking a screenshot of {}...", self._current_url)
             data = self._html.image(full=full)
             height = len(data)
             width = len(data[0].split())
@@ -724,12 +788,12 @@ class HtmlFrame(Frame):
             
             image = ImageGrab.grab(bbox=(x, y, x+width, y+height))
         else:
-            self._html.post_message("ERROR: A screenshot could not be taken because screenshot_page(full=True) is an experimental feature on Windows")
+            self._html.log(utilities.ERROR, "ERROR: A screenshot could not be taken because screenshot_page(full=True) is an experimental feature on Windows")
             raise NotImplementedError("a screenshot could not be taken because screenshot_page(full=True) is an experimental feature on Windows")
         
         if filename:
             image.save(filename)
-            self._html.post_message(f"Screenshot taken: {width}px by {height}px!")
+            self._html.log(utilities.INFO, "Screenshot taken: {}px by {}px!", width, height)
         if show:
             image.show()
         return image
@@ -747,7 +811,7 @@ class HtmlFrame(Frame):
         :raise NotImplementedError: If experimental mode is not enabled."""
         if self._html.experimental:
             cnf |= kwargs
-            self._html.post_message(f"Printing {self._current_url}...")
+            self._html.log(utilities.INFO, "Printing {}...", self._current_url)
             if filename:
                 cnf["file"] = filename
             if "pagesize" in cnf:
@@ -757,7 +821,7 @@ class HtmlFrame(Frame):
                 }
                 try:
                     cnf["pagesize"] = pagesizes[cnf["pagesize"].upper()]
-                    self._html.post_message(f"Setting printer page size to {cnf['pagesize']} PostScript points.")
+                    self._html.log(utilities.INFO, "Setting printer page size to {} PostScript points.", cnf['pagesize'])
                 except KeyError:
                     raise KeyError("Parameter 'pagesize' must be A3, A4, A5, Legal, or Letter")
 
@@ -766,10 +830,10 @@ class HtmlFrame(Frame):
             
             # No need to save - Tkhtml handles that for us
             if filename:
-                self._html.post_message("Printed!")
+                self._html.log(utilities.INFO, "Printed!")
             if file: return file
         else:
-            self._html.post_message("ERROR: The page could not be printed because print_page is an experimental feature")
+            self._html.log(utilities.ERROR, "ERROR: The page could not be printed because print_page is an experimental feature")
             raise NotImplementedError("the page could not be printed because print_page is an experimental feature")
 
     def save_page(self, filename=None):
@@ -804,10 +868,10 @@ class HtmlFrame(Frame):
             html = self.snapshot_page(include_head=include_head)
 
         if filename:
-            self._html.post_message(f"Saving {self._current_url}...")
+            self._html.log(utilities.INFO, "Saving {}...", self._current_url)
             with open(filename, "w+") as handle:
                 handle.write(html)
-            self._html.post_message("Saved!")
+            self._html.log(utilities.INFO, "Saved!")
         return html
     
     def snapshot_page(self, filename=None, allow_agent=False, include_head=False):
@@ -825,7 +889,7 @@ class HtmlFrame(Frame):
         :rtype: str"""
         ### TODO: scripts are omitted
 
-        self._html.post_message(f"Snapshotting {self._current_url}...")
+        self._html.log(utilities.INFO, "Snapshotting {}...", self._current_url)
         title = ""
         icon = ""
         base = ""
@@ -850,7 +914,7 @@ class HtmlFrame(Frame):
         if filename:
             with open(filename, "w+") as handle:
                 handle.write(html)
-            self._html.post_message("Saved!")
+            self._html.log(utilities.INFO, "Saved!")
         return html
     
     def get_page_text(self):
@@ -1166,6 +1230,172 @@ class HtmlFrame(Frame):
         self._html.selection_manager.select_all()
 
     # --- Internals -----------------------------------------------------------
+
+    def _create_html(self, tkinterweb_options, tkhtml_options):
+        "Create a html widget and set up the bindings that belong to it."
+        html = bindings.TkinterWeb(self, tkinterweb_options, **tkhtml_options)
+        html._finish_loading_func = self._finish_loading_html
+
+        # These are registered through the html widget so that their commands are deleted along with it
+        for i in (f"{html}.document", html.scrollable_node_tag):
+            html.bind_class(i, "<MouseWheel>", html._scroll)
+            html.bind_class(i, "<Shift-MouseWheel>", html._xscroll)
+
+        html.bind_class(html.scrollable_node_tag, "<Button-4>", lambda event, widget=html: html._scroll_x11(event, widget))
+        html.bind_class(html.scrollable_node_tag, "<Button-5>", lambda event, widget=html: html._scroll_x11(event, widget))
+        html.bind_class(html.scrollable_node_tag, "<Shift-Button-4>", lambda event, widget=html: html._xscroll_x11(event, widget))
+        html.bind_class(html.scrollable_node_tag, "<Shift-Button-5>", lambda event, widget=html: html._xscroll_x11(event, widget))
+        html.bind_class(html.tkinterweb_tag, "<Configure>", self._handle_html_resize)
+
+        for sequence, args, kwargs, funcids in self._bindings:
+            funcids[html] = html.bind(sequence, *args, **kwargs)
+
+        self._setup_html(html)
+        return html
+
+    def _setup_html(self, html):
+        "Make any changes that this widget needs to a newly created html widget. Subclasses extend this so that their changes also apply to the pages that replace it."
+        pass
+
+    def _discard_html(self, html):
+        "Destroy a html widget that is no longer needed, along with the class bindings and images that would otherwise keep it alive."
+        for binding in self._bindings:
+            binding[3].pop(html, None)
+        if html.winfo_exists():
+            for tag in (f"{html}.document", html.scrollable_node_tag, html.node_tag, html.tkinterweb_tag):
+                for sequence in html.bind_class(tag):
+                    html.unbind_class(tag, sequence)
+        html.image_manager.loaded_images.clear()
+        html.destroy()
+
+    def _bfcache_widgets(self):
+        "Return the html widgets that are not currently shown."
+        widgets = [entry[0] for entry in self._bfcache.values()]
+        if self._bfcache_spare is not None:
+            widgets.append(self._bfcache_spare)
+        return widgets
+
+    def _attach_html(self, html):
+        "Show the given html widget and connect it to the scrollbars."
+        self._html = html
+        self._hsb.configure(command=html.xview)
+        self._vsb.configure(command=html.yview)
+        html.configure(xscrollcommand=self._hsb.set, yscrollcommand=self._vsb.set)
+        html.grid(row=0, column=0, sticky="nsew")
+
+    def _bfcache_store(self, url):
+        "Replace the current page with a blank one before navigating away from it, keeping it in the back/forward cache if it can be restored later."
+        if not self.bfcache_limit or not self._current_url or self._html.overflow_scroll_frame:
+            return
+        if urldefrag(url)[0] == urldefrag(self._current_url)[0]:
+            # Navigating within the page or reloading it is handled as usual
+            return
+        if not self._bfcache_cacheable():
+            # The page is simply reset and reused by the navigation
+            return
+        
+        html, self._bfcache_spare = self._bfcache_spare, None
+        if html is None:
+            html = self._create_html(*self._html_options)
+        else:
+            self._bfcache_update_options(html)
+        self._bfcache_swap(html)
+        self._handle_html_resize(force=True)
+
+    def _bfcache_restore(self, url):
+        "Show the page with the given url from the back/forward cache. Returns False if the page is not cached."
+        if url not in self._bfcache:
+            return False
+        
+        html, size, document, javascript = self._bfcache.pop(url)
+        self._bfcache_update_options(html)
+        self._bfcache_swap(html)
+        if document is not None: self._document = document
+        if javascript is not None: self._javascript = javascript
+        if self._thread_in_progress:
+            self._thread_in_progress.stop()
+            self._thread_in_progress = None
+
+        self._previous_url = self._current_url
+        self._current_url = url
+        self._waiting_for_reset = False
+        self._manage_vsb()
+        self._manage_hsb()
+        self._handle_html_resize(force=True)
+
+        html.log(utilities.DEBUG, "Restored {!u} from the back/forward cache", url)
+        html.post_event(utilities.URL_CHANGED_EVENT, False)
+        html.post_event(utilities.TITLE_CHANGED_EVENT, False)
+        if html.icon:
+            html.post_event(utilities.ICON_CHANGED_EVENT, False)
+        html.post_event(utilities.DONE_LOADING_EVENT, False)
+        return True
+
+    def _bfcache_update_options(self, html):
+        "Bring a page up to date with any settings that were changed while it was hidden."
+        tkinterweb_options, tkhtml_options = self._html_options
+        for option, value in tkinterweb_options.items():
+            if self._tkinterweb_options[option].get("changeable", True) and getattr(html, option) != value:
+                setattr(html, option, value)
+        for option, value in tkhtml_options.items():
+            if self._tkhtml_options[option].get("changeable", True) and html.cget(option) != value:
+                html[option] = value
+
+    def _bfcache_cacheable(self):
+        "Return True if the current page has finished loading and can be kept in the back/forward cache."
+        html = self._html
+        return bool(self._current_url and not self._current_data and not self._thread_in_progress and not html.parsing and not html.active_threads and not html.pending_threads)
+
+    def _bfcache_swap(self, replacement):
+        "Show the given html widget in place of the current one, which is kept in the back/forward cache if it has finished loading."
+        html = self._html
+        cacheable = self._bfcache_cacheable()
+        document = self.__dict__.pop("_document", None)
+        javascript = self.__dict__.pop("_javascript", None)
+
+        self._attach_html(replacement)
+        html.grid_remove()
+        self._current_data = ""
+        
+        if cacheable:
+            self._bfcache_discard(self._current_url)
+            self._bfcache[self._current_url] = (html, self._estimate_page_size(html), document, javascript)
+            self._bfcache_evict()
+        else:
+            self._bfcache_release(html)
+
+    def _bfcache_release(self, html):
+        "Keep a page that is no longer needed as the blank page used by the next navigation, or destroy it if there already is one."
+        if self._bfcache_spare is None and html.winfo_exists():
+            html.reset()
+            html.image_manager.loaded_images.clear()
+            self._bfcache_spare = html
+        else:
+            self._discard_html(html)
+
+    def _bfcache_discard(self, url):
+        "Remove the page with the given url from the back/forward cache, if it is there."
+        entry = self._bfcache.pop(url, None)
+        if entry is not None:
+            self._bfcache_release(entry[0])
+
+    def _bfcache_evict(self):
+        "Discard the least recently visited pages until the back/forward cache is within its limits."
+        while self._bfcache and (len(self._bfcache) > self.bfcache_limit or 
+                                 sum(entry[1] for entry in self._bfcache.values()) > self.bfcache_memory_limit):
+            html = self._bfcache.popitem(last=False)[1][0]
+            self._bfcache_release(html)
+
+    def _estimate_page_size(self, html):
+        "Estimate the memory used by a page from the size of its document and its decoded images."
+        size = html._parsed_size
+        for images in html.image_manager.loaded_images.values():
+            for image in images:
+                try:
+                    size += image.width() * image.height() * 4
+                except (tk.TclError, AttributeError):
+                    pass
+        return size
     
     def _handle_html_resize(self, event=None, force=False):
         """Make all elements with the 'tkinterweb-full-page' attribute the same height as the html widget.
@@ -1304,11 +1534,12 @@ class HtmlFrame(Frame):
                 thread = utilities.get_current_thread()
 
                 location = parsed.netloc if parsed.netloc else parsed.path
-                self._html.post_message(f"Connecting to {location}", True)
-                if self._html.insecure_https: self._html.post_message("WARNING: Using insecure HTTPS session", True)
+                self._html.log(utilities.DEBUG, "Connecting to {}", location, thread_safe=True)
+                if self._html.insecure_https: self._html.log(utilities.WARNING, "WARNING: Using insecure HTTPS session", thread_safe=True)
                 
-                newurl, data, filetype, code = self._html.download_url(url, data, method, decode)
-                self._html.post_message(f"Successfully connected to {location}", True)
+                with self._html.performance._resource(url, "navigation"):
+                    newurl, data, filetype, code = self._html.download_url(url, data, method, decode)
+                self._html.log(utilities.DEBUG, "Successfully connected to {}", location, thread_safe=True)
 
                 if view_source:
                     newurl = "view-source:"+newurl
@@ -1332,7 +1563,7 @@ class HtmlFrame(Frame):
                         name = self._html.image_manager.allocate_image_name()
                         if name:
                             data, data_is_image = self._html.image_manager.check_images(data, name, url, filetype, thread.is_subthread)
-                            self._html.post_to_queue(lambda data=data, name=name, url=url, filetype=filetype, data_is_image=data_is_image: self._finish_loading_image(data, name, url, filetype, data_is_image))
+                            self._html.post_to_queue(lambda data=data, name=name, url=url, filetype=filetype, data_is_image=data_is_image: self._finish_loading_image(data, name, url, filetype, data_is_image), priority=utilities.PRIORITY_LOW)
                         else:
                             self._load_html(self._get_about_page("about:image", name), newurl, _thread_safe=thread_safe)
                     else:
@@ -1341,6 +1572,8 @@ class HtmlFrame(Frame):
                 # If no requests need to be made, we can signal that the page is done loading, handle fragments, etc.
                 self._html.fragment = fragment
                 self._html.post_to_queue(self._finish_loading_nothing)
+        except utilities.DownloadCancelled:
+            pass
         except Exception as error:
             self._html.post_to_queue(lambda url=url, error=error, code=code: self._finish_loading_error(url, error, code))
 
@@ -1367,13 +1600,13 @@ class HtmlFrame(Frame):
     def _finish_loading_error(self, url, error, code):
         # NOTE: must be run in main thread
 
-        self._html.post_message(f"ERROR: could not load {url}: {error}")
+        self._html.log(utilities.ERROR, "ERROR: could not load {}: {}", url, error)
         if "CERTIFICATE_VERIFY_FAILED" in str(error):
-            self._html.post_message(f"Check that you are using the right url scheme. Some websites only support http.\n\
+            self._html.log(utilities.INFO, "Check that you are using the right url scheme. Some websites only support http.\n\
 This might also happen if your Python distribution does not come installed with website certificates.\n\
 This is a known Python bug on older MacOS systems. \
-Running something along the lines of \"/Applications/Python {'.'.join(utilities.PYTHON_VERSION[:2])}/Install Certificates.command\" (with the qoutes) to install the missing certificates may do the trick.\n\
-Otherwise, use 'HtmlFrame(master, insecure_https=True)' to ignore website certificates or 'HtmlFrame(master, ssl_cafile=[path_to_your_cafile])' to specify the path to your CA file if you know where it is.")
+Running something along the lines of \"/Applications/Python {}/Install Certificates.command\" (with the qoutes) to install the missing certificates may do the trick.\n\
+Otherwise, use 'HtmlFrame(master, insecure_https=True)' to ignore website certificates or 'HtmlFrame(master, ssl_cafile=[path_to_your_cafile])' to specify the path to your CA file if you know where it is.", '.'.join(utilities.PYTHON_VERSION[:2]))
         if self.on_navigate_fail is not None:
             self.on_navigate_fail(url, error, code)
 
@@ -1453,10 +1686,17 @@ Otherwise, use 'HtmlFrame(master, insecure_https=True)' to ignore website certif
                 if value == "auto": return value
                 extras = "\"auto\" or "
                 expected_type = float
+            elif expected_type == "prefetch":
+                if value in {"hover", "mousedown"} or value is False: return value
+                raise ValueError(f"expected False, \"hover\", or \"mousedown\", got {value!r} for {key}")
             elif expected_type == "nonestr":
                 if value is None: return value
                 extras = "None or "
                 expected_type = str
+            elif expected_type == "noneint":
+                if value is None: return value
+                extras = "None or "
+                expected_type = int
             elif expected_type == "callable":
                 if value is None or callable(value): 
                     return value
@@ -1489,17 +1729,20 @@ Otherwise, use 'HtmlFrame(master, insecure_https=True)' to ignore website certif
                     self._manage_vsb(value)
                 elif key == "horizontal_scrollbar":
                     self._manage_hsb(value)
+                elif key in {"bfcache_limit", "bfcache_memory_limit"}:
+                    self._bfcache_evict()
             elif key in self._tkinterweb_options:
                 settings = self._tkinterweb_options[key]
                 self._check_changeability(key, settings)
                 value = self._check_value(key, settings, kwargs.pop(key))
                 setattr(self._html, key, value)
+                self._html_options[0][key] = value
                 if key in {"find_match_highlight_color", "find_match_text_color", "find_current_highlight_color",
                            "find_current_text_color", "selected_text_highlight_color", "selected_text_color"}:
                     self._html.selection_manager.update_tags()
             elif key in self._tkhtml_options:
                 self._check_changeability(key, self._tkhtml_options[key])
-                self._html[key] = kwargs.pop(key)
+                self._html[key] = self._html_options[1][key] = kwargs.pop(key)
                 if key == "zoom":
                     self._handle_html_resize(force=True)
                     self._html.caret_manager.update()
@@ -1531,16 +1774,37 @@ Otherwise, use 'HtmlFrame(master, insecure_https=True)' to ignore website certif
     def bind(self, sequence, *args, **kwargs):
         "Add an event binding. For convenience, some bindings will be bound to this widget and others will be bound to its associated :class:`~tkinterweb.TkinterWeb` instance."
         if sequence in {"<Leave>", "<Enter>"}:
-            super().bind(sequence, *args, **kwargs)
-        else:
-            self._html.bind(sequence, *args, **kwargs)
-
-    def unbind(self, sequence, *args, **kwargs):
+            return super().bind(sequence, *args, **kwargs)
+        
+        funcid = self._html.bind(sequence, *args, **kwargs)
+        if args or kwargs.get("func"):
+            # Remember the binding so that it can be added to pages in the back/forward cache and the pages that replace them
+            # Each page gives the binding its own id, so these are kept to be able to remove it again
+            funcids = {self._html: funcid}
+            for html in self._bfcache_widgets():
+                funcids[html] = html.bind(sequence, *args, **kwargs)
+            self._bindings.append((sequence, args, kwargs, funcids))
+        return funcid
+
+    def unbind(self, sequence, funcid=None):
         "Remove an event binding."
         if sequence in {"<Leave>", "<Enter>"}:
-            super().unbind(sequence, *args, **kwargs)
-        else:
-            self._html.unbind(sequence, *args, **kwargs)
+            return super().unbind(sequence, funcid)
+        
+        if funcid is None:
+            self._bindings = [binding for binding in self._bindings if binding[0] != sequence]
+            for html in [self._html] + self._bfcache_widgets():
+                html.unbind(sequence)
+            return
+        
+        # The id may have come from any page the binding was made on, so it is removed from every page using that page's own id
+        for binding in self._bindings:
+            if binding[0] == sequence and funcid in binding[3].values():
+                self._bindings.remove(binding)
+                for html, html_funcid in binding[3].items():
+                    html.unbind(sequence, html_funcid)
+                return
+        self._html.unbind(sequence, funcid)
     
     def __getitem__(self, key):
         return self.cget(key)
@@ -1570,10 +1834,6 @@ class HtmlLabel(HtmlFrame):
         
         HtmlFrame.__init__(self, master, shrink=True, **kwargs)
 
-        tags = list(self._html.bindtags())
-        tags.remove("Html")
-        self._html.bindtags(tags)
-
         self._style = Style()
 
         if text: self.load_html(text)
@@ -1582,6 +1842,12 @@ class HtmlLabel(HtmlFrame):
             # A fellow in issue 145 mentioned layout issues when this was used
             # I can't seem to reproduce it though...?
             self.load_html("<body></body>", _relayout=False)
+
+    def _setup_html(self, html):
+        super()._setup_html(html)
+        tags = list(html.bindtags())
+        tags.remove("Html")
+        html.bindtags(tags)
     
     def load_html(self, *args, _relayout=True, **kwargs):
         ""
@@ -1681,13 +1947,21 @@ class HtmlText(HtmlFrame):
         self.configure(selectbackground=selectbackground, selectforeground=selectforeground, 
                        insertontime=insertontime, insertofftime=insertofftime, 
                        insertwidth=insertwidth, insertbackground=insertbackground)
-                
-        self._html.text_mode = True
 
         self.load_html("<body><div>\xa0</div></body>")
 
-        if state == "enabled":
-            self._html.bind("<Key>", self._on_key)
+    def _setup_html(self, html):
+        super()._setup_html(html)
+        html.text_mode = True
+        if html.caret_browsing_enabled:
+            html.bind("<Key>", self._on_key)
+
+        # Carry over the cursor settings from the page being replaced
+        previous = getattr(self, "_html", None)
+        if previous is not None:
+            html.caret_manager.blink_delays = list(previous.caret_manager.blink_delays)
+            html.caret_manager.caret_width = previous.caret_manager.caret_width
+            html.caret_manager.caret_color = previous.caret_manager.caret_color
 
     def load_html(self, *args, **kwargs):
         ""
@@ -2094,10 +2368,10 @@ class HtmlText(HtmlFrame):
                 self._foreground = kwargs.pop(key)
                 self.add_css(f"BODY {{ color: {self._foreground}; }}", "agent")
             if key == "selectbackground":
-                self._html.selected_text_highlight_color = kwargs.pop(key)
+                self._html.selected_text_highlight_color = self._html_options[0]["selected_text_highlight_color"] = kwargs.pop(key)
                 self._html.selection_manager.update_tags()
             if key == "selectforeground":
-                self._html.selected_text_color = kwargs.pop(key)
+                self._html.selected_text_color = self._html_options[0]["selected_text_color"] = kwargs.pop(key)
                 self._html.selection_manager.update_tags()
             if key == "insertontime":
                 value = self._check_value(key, self._option_types[key], kwargs.pop(key))
@@ -2112,14 +2386,16 @@ class HtmlText(HtmlFrame):
                 self._html.caret_manager.caret_color = kwargs.pop(key)
             if key == "state":
                 state = kwargs.pop(key)
-                if state == "enabled":
-                    self._html.bind("<Key>", self._on_key)
-                    self._html.caret_browsing_enabled = True
-                elif state == "disabled":
-                    self._html.unbind("<Key>")
-                    self._html.caret_browsing_enabled = False
-                else:
+                if state not in {"enabled", "disabled"}:
                     raise ValueError("state must be 'enabled' or 'disabled'")
+                self._html_options[0]["caret_browsing_enabled"] = state == "enabled"
+                # Hidden pages are changed too so that the state still applies once they are shown
+                for html in [self._html] + self._bfcache_widgets():
+                    if state == "enabled":
+                        html.bind("<Key>", self._on_key)
+                    else:
+                        html.unbind("<Key>")
+                    html.caret_browsing_enabled = state == "enabled"
 
         if kwargs: super().configure(**kwargs)
 
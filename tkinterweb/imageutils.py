@@ -16,6 +16,9 @@ from tkinter import PhotoImage as TkPhotoImage
 # Additionally, CairoSVG will only detect TkinterWeb-Tkhtml's Cairo binary after Tkhtml is loaded 
 rsvg_type = None
 
+# The process pool is only started if large images need to be processed
+process_pool = None
+
 
 def load_cairo():
     global rsvg_type
@@ -91,6 +94,45 @@ def invert_image(image, limit):
         return image
 
 
+def _invert_image_data(data, limit):
+    image = invert_image(data, limit)
+    return image.mode, image.size, image.tobytes()
+
+
+def invert_image_in_process(data, limit, log=None):
+    "Like invert_image, but the image is processed in a separate process."
+    from PIL import Image
+    mode, size, raw = run_in_process(_invert_image_data, data, limit, log=log)
+    return Image.frombytes(mode, size, raw)
+
+
+def run_in_process(func, *args, log=None):
+    """Call func in a worker process so that it does not compete with the Tk main thread for the GIL. 
+    The arguments and return value must be picklable. If the worker process fails, func is called in this process instead 
+    and, if given, log is called with a message template and its arguments explaining why."""
+    global process_pool
+    from concurrent.futures.process import BrokenProcessPool
+    from pickle import PicklingError
+
+    try:
+        if process_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+            # Forking a process that is running Tcl/Tk and other threads can copy held locks and deadlock the worker
+            # The pool is started from a loader thread, so always start fresh interpreters instead
+            process_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        return process_pool.submit(func, *args).result()
+    except BrokenProcessPool as error:
+        process_pool = None
+        if log is not None:
+            log("the image processing worker process failed ({}); processing the image in this process instead", str(error))
+    except (ImportError, OSError, PicklingError,) as error:
+        # The worker process may not be able to load the same libraries as this one
+        if log is not None:
+            log("the image could not be processed in a worker process ({}); processing it in this process instead", str(error))
+    return func(*args)
+
+
 def svg_to_png(data):
     load_cairo()
     if rsvg_type == 1 or rsvg_type == 3:
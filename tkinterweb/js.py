@@ -96,6 +96,7 @@ class JSEngine:
             try:
                 import pythonmonkey as pm
                 self.register("document", self.document)
+                self.register("performance", self.html.performance)
             except ModuleNotFoundError:
                 raise ModuleNotFoundError("PythonMonkey is required to run JavaScript files but is not installed.")
             
@@ -105,6 +106,7 @@ class JSEngine:
                 # Full built-ins may be intentionally exposed if execution is trusted.
                 "__builtins__": {} if self.sandbox else __builtins__,
                 "document": self.document,
+                "performance": self.html.performance,
             }
 
     def _on_script(self, attributes, tag_contents):
@@ -114,9 +116,9 @@ class JSEngine:
         except Exception as error:
             if self.backend == "python": error = format_exc()
             if "src" in attributes:
-                self.html.post_message(f"ERROR: the JavaScript interpreter encountered an error while running the script from {attributes['src']}: {error}")
+                self.html.log(utilities.ERROR, "ERROR: the JavaScript interpreter encountered an error while running the script from {}: {}", attributes['src'], error)
             else:
-                self.html.post_message(f"ERROR: the JavaScript interpreter encountered an error while running the script \n\"{utilities.shorten(tag_contents)}\":\n{error}")
+                self.html.log(utilities.ERROR, "ERROR: the JavaScript interpreter encountered an error while running the script \n\"{!u}\":\n{}", tag_contents, error)
 
     def _on_element_script(self, node_handle, attribute, attr_contents):
         try:
@@ -124,4 +126,4 @@ class JSEngine:
             self.eval(attr_contents, element)
         except Exception as error:
             if self.backend == "python": error = format_exc()
-            self.html.post_message(f"ERROR: the JavaScript interpreter encountered an error while running an {attribute} script: {error}")
+            self.html.log(utilities.ERROR, "ERROR: the JavaScript interpreter encountered an error while running an {} script: {}", attribute, error)
@@ -8,15 +8,27 @@ Some of the CSS code in this file is modified from the Tkhtml/Hv3 project. Tkhtm
 
 import os
 import platform
+import re
 import sys
 import threading
+import time
+import queue
+import string
+import json
+import weakref
+
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+import tkinter
+from tkinter import TclError
 
 from functools import wraps
-from collections import OrderedDict
+from contextlib import contextmanager
+from collections import OrderedDict, deque
 
-import ssl, gzip, zlib
+import ssl, gzip, zlib, socket
+import mmap, zipfile, mimetypes
 from urllib.request import Request, urlopen
-from urllib.parse import urlunparse, urlparse
+from urllib.parse import urlunparse, urlparse, unquote, uses_relative, uses_netloc
 
 try:
     import brotli
@@ -24,6 +36,12 @@ try:
 except ImportError:
     brotli_installed = False
 
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # Python 3.10 and older
+    import sre_parse
+
 
 # We need this information here so the built-in pages can access it
 __title__ = "TkinterWeb"
@@ -47,6 +65,9 @@ INSECURE_HTTPS = False
 SSL_CAFILE = None
 REQUEST_TIMEOUT = 15
 CACHE_MAXSIZE = 128
+CACHE_SHARDS = 8
+COLOR_CACHE_MAXSIZE = 1024
+DOWNLOAD_CHUNK_SIZE = 65536
 DEFAULT_PARSE_MODE = "xml"
 DEFAULT_ENGINE_MODE = "standards"
 BROKEN_IMAGE = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x19\x00\x00\x00\x1e\x08\x03\x00\x00\x00\xee2E\xe9\x00\x00\x03\x00PLTE\xc5\xd5\xf4\xcd\xdb\xf4\xdf\xe8\xfc\xd5\xdd\xf4\xa5\xa3\xa5\x85\x83\x85\xfc\xfe\xfc\xf4\xf6\xf9\x95\x93\x95S\xb39\x9d\x9f\x9d\xc5\xd3\xedo\xbbg\xd5\xe3\xf4\xd5\xdf\xfc\xd5\xe3\xfc\xb5\xcf\xd5\x9d\xc7\xb5\xc5\xdf\xe5S\xaf9\x8d\xc7\x8d\x15\x15\x15\x16\x16\x16\x17\x17\x17\x18\x18\x18\x19\x19\x19\x1a\x1a\x1a\x1b\x1b\x1b\x1c\x1c\x1c\x1d\x1d\x1d\x1e\x1e\x1e\x1f\x1f\x1f   !!!"""###$$$%%%&&&\'\'\'((()))***+++,,,---...///000111222333444555666777888999:::;;;<<<===>>>???@@@AAABBBCCCDDDEEEFFFGGGHHHIIIJJJKKKLLLMMMNNNOOOPPPQQQRRRSSSTTTUUUVVVWWWXXXYYYZZZ[[[\\\\\\]]]^^^___```aaabbbcccdddeeefffggghhhiiijjjkkklllmmmnnnooopppqqqrrrssstttuuuvvvwwwxxxyyyzzz{{{|||}}}~~~\x7f\x7f\x7f\x80\x80\x80\x81\x81\x81\x82\x82\x82\x83\x83\x83\x84\x84\x84\x85\x85\x85\x86\x86\x86\x87\x87\x87\x88\x88\x88\x89\x89\x89\x8a\x8a\x8a\x8b\x8b\x8b\x8c\x8c\x8c\x8d\x8d\x8d\x8e\x8e\x8e\x8f\x8f\x8f\x90\x90\x90\x91\x91\x91\x92\x92\x92\x93\x93\x93\x94\x94\x94\x95\x95\x95\x96\x96\x96\x97\x97\x97\x98\x98\x98\x99\x99\x99\x9a\x9a\x9a\x9b\x9b\x9b\x9c\x9c\x9c\x9d\x9d\x9d\x9e\x9e\x9e\x9f\x9f\x9f\xa0\xa0\xa0\xa1\xa1\xa1\xa2\xa2\xa2\xa3\xa3\xa3\xa4\xa4\xa4\xa5\xa5\xa5\xa6\xa6\xa6\xa7\xa7\xa7\xa8\xa8\xa8\xa9\xa9\xa9\xaa\xaa\xaa\xab\xab\xab\xac\xac\xac\xad\xad\xad\xae\xae\xae\xaf\xaf\xaf\xb0\xb0\xb0\xb1\xb1\xb1\xb2\xb2\xb2\xb3\xb3\xb3\xb4\xb4\xb4\xb5\xb5\xb5\xb6\xb6\xb6\xb7\xb7\xb7\xb8\xb8\xb8\xb9\xb9\xb9\xba\xba\xba\xbb\xbb\xbb\xbc\xbc\xbc\xbd\xbd\xbd\xbe\xbe\xbe\xbf\xbf\xbf\xc0\xc0\xc0\xc1\xc1\xc1\xc2\xc2\xc2\xc3\xc3\xc3\xc4\xc4\xc4\xc5\xc5\xc5\xc6\xc6\xc6\xc7\xc7\xc7\xc8\xc8\xc8\xc9\xc9\xc9\xca\xca\xca\xcb\xcb\xcb\xcc\xcc\xcc\xcd\xcd\xcd\xce\xce\xce\xcf\xcf\xcf\xd0\xd0\xd0\xd1\xd1\xd1\xd2\xd2\xd2\xd3\xd3\xd3\xd4\xd4\xd4\xd5\xd5\xd5\xd6\xd6\xd6\xd7\xd7\xd7\xd8\xd8\xd8\xd9\xd9\xd9\xda\xda\xda\xdb\xdb\xdb\xdc\xdc\xdc\xdd\xdd\xdd\xde\xde\xde\xdf\xdf\xdf\xe0\xe0\xe0\xe1\xe1\xe1\xe2\xe2\xe2\xe3\xe3\xe3\xe4\xe4\xe4\xe5\xe5\xe5\xe6\xe6\xe6\xe7\xe7\xe7\xe8\xe8\xe8\xe9\xe9\xe9\xea\xea\xea\xeb\xeb\xeb\xec\xec\xec\xed\xed\xed\xee\xee\xee\xef\xef\xef\xf0\xf0\xf0\xf1\xf1\xf1\xf2\xf2\xf2\xf3\xf3\xf3\xf4\xf4\xf4\xf5\xf5\xf5\xf6\xf6\xf6\xf7\xf7\xf7\xf8\xf8\xf8\xf9\xf9\xf9\xfa\xfa\xfa\xfb\xfb\xfb\xfc\xfc\xfc\xfd\xfd\xfd\xfe\xfe\xfe\xff\xff\xff\x01\xb3\x9a&\x00\x00\x01+IDATx\x9c\x9d\x91\xe9\x92\x84 \x0c\x84s (\x08A\xc6\xf7\x7f\xd6M8\x9c\x9d\xa9\xda?\xdb\x96W\x7f\xb6\xd5\x04\xf0\x7f\t\xdcT\x9c\xf7}\x0f\xf4I\x16U\x12\x16\t\x1f\xdaw\xe7\x16!\xcay\x9cL\xac\xc4\xfb\x18\x06\xc9\x81\x14\xd0\xd4o\xc2\x88\xa5X\x1e\x0b"\x1a\xf1\xd1\x05\x0f1f3\x06\xc9\x85\xb6Nb\x08\xe0\xa2d\x9cK\xd00\xefKF\x16\xf0E\ti?\xb2\x8aJ2\xf9\'\x83\xa8]Fy#\xa8\x1d\x00\x91\xa1\x01d\xad\x9e1h\x11m EM(\xa2vA\xe0\xc2,T,\xe3\x98$\xc1T\xd307 \xda6[)C\xea\x16\x1aK\x8c\rDv#BF\xd4\x03\xb4\x0b\xa4\x02,:\x83\xe8H i\xc2<\xec,%\xa2>\x1d\xc9)\x8dD\xad\xfd\x89a\xce\xad\x10\xdbw\xa0\xa0Z.\xa54v!\x8a@\x85\xeb:^\xaf\xe38\xcfZ\x19\xfc"E\xbf\xbf.\x03F\x1a\xf0 Q\xbbUM\xbc\xd5\xfd\xbeR\xa2\xda\x9d\xb3\x1f\xdd\x97\xbc\xf5Y\xf35\xc9\x93\xd0\x19\xe8\xdc\\k_\x7f\xf2g\xb6\x19\xc4\xf8\x90s\x91\x17\xe5\xbe\x0b\xf7\xf9\x99\xd0\x87\xfbV\xb2\xbd\xd5\xfd\xe7\xed?\xe4\x07\xca\xeb\x13o\x88}\xa9\x12\x00\x00\x00\x00IEND\xaeB`\x82'
@@ -461,6 +482,19 @@ INPUT[type="submit"],INPUT[type="button"], INPUT[type="reset"], BUTTON {
 
 TEXTWRAP_STYLE = "BODY { white-space: nowrap; }"
 
+DEFAULT_STYLE_DARK_THEME_REGEX = r"([^:;\s{]+)\s?:\s?([^;{!]+)(?=!|;|})"
+DEFAULT_GENERAL_DARK_THEME_REGEXES = (
+    r'(<[^>]+bgcolor=")([^"]*)',
+    r'(<[^>]+text=")([^"]*)',
+    r'(<[^>]+link=")([^"]*)'
+)
+DEFAULT_INLINE_DARK_THEME_REGEXES = (
+    r'(<[^>]+style=")([^"]*)',
+    r'([a-zA-Z-]+:)([^;]*)'
+)
+# The attributes rewritten by the dark theme and the kind of colour they hold
+DARK_THEME_ATTRIBUTES = {"style": None, "bgcolor": "background", "text": "color", "link": "color"}
+
 class BuiltinPageGenerator():
     """BUILTIN_PAGES used to be a dictionary of URIs and corresponding HTML code.
     Instead, we use this page generator class so that we can generate debugging information on demand."""
@@ -634,9 +668,25 @@ BUILTIN_ATTRIBUTES = {
     "vertical-align": "tkinterweb-full-page"
 }
 
+PRIORITY_HIGH = 0 # Parsing and stylesheets
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2 # Image decoding and load completion
+PRIORITY_IDLE = 3 # Debugging messages
+
+PERFORMANCE_BUFFER_SIZE = 1000
+TRACE_BUFFER_SIZE = 100000
+
+# Message levels, which match those used by the logging module
+DEBUG = 10 # Resource loading progress
+INFO = 20
+WARNING = 30
+ERROR = 40
+MESSAGE_LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
 DOWNLOADING_RESOURCE_EVENT = "<<DownloadingResource>>"
 DONE_LOADING_EVENT = "<<DoneLoading>>"
 DOM_CONTENT_LOADED_EVENT = "<<DOMContentLoaded>>"
+PARSE_PROGRESS_EVENT = "<<ParseProgress>>"
 URL_CHANGED_EVENT = "<<UrlChanged>>"
 ICON_CHANGED_EVENT = "<<IconChanged>>"
 TITLE_CHANGED_EVENT = "<<TitleChanged>>"
@@ -700,15 +750,45 @@ UNSET = unset()
 class StoppableThread(threading.Thread):
     "A thread that stores a state flag that can be set and used to check if the thread is supposed to be running"
 
+    # The number of threads that have been started and have not finished yet
+    # While there are any, the dispatcher keeps a fallback poll running in case they cannot wake the event loop
+    alive = 0
+    alive_lock = threading.Lock()
+
     def __init__(self, *args, **kwargs):
         threading.Thread.__init__(self, *args, **kwargs)
         self.daemon = True
         self.running = True
+        self.response = None
+        self.generation = None
 
         self.is_subthread = True
 
+    def start(self):
+        with StoppableThread.alive_lock:
+            StoppableThread.alive += 1
+        try:
+            threading.Thread.start(self)
+        except Exception:
+            self._finished()
+            raise
+        if threading.current_thread() is threading.main_thread():
+            Dispatcher.watch_all()
+
+    def run(self):
+        try:
+            threading.Thread.run(self)
+        finally:
+            self._finished()
+
+    def _finished(self):
+        with StoppableThread.alive_lock:
+            StoppableThread.alive -= 1
+
     def stop(self):
         self.running = False
+        # Interrupt the download if it is in progress
+        abort_response(self.response)
 
     def isrunning(self):
         return self.running
@@ -727,6 +807,287 @@ class PlaceholderThread:
     def isrunning(self):
         return True
 
+class RequestTask:
+    """Fake StoppableThread used when an asynchronous ``request_func`` fetches a resource.
+    No thread waits for the response. Instead, the loader callback is queued for the main thread once the response's :py:class:`~concurrent.futures.Future` completes, 
+    and the main thread runs it with :meth:`RequestTask.run` in a short-lived worker thread so that processing the response does not stall the app.
+    Stopping the task cancels the future if it has not completed yet."""
+
+    def __init__(self, url, future, request_args=()):
+        self.url = url
+        self.future = future
+        self.request_args = tuple(request_args)
+        self.running = True
+        self.generation = None
+        self.is_subthread = True
+
+    def stop(self):
+        self.running = False
+        self.future.cancel()
+
+    def isrunning(self):
+        return self.running
+    
+    def run(self, callback, *args, **kwargs):
+        self.is_subthread = threading.current_thread() is not threading.main_thread()
+        _local.task = self
+        try:
+            callback(*args, **kwargs)
+        finally:
+            _local.task = None
+
+
+class TaskQueue:
+    """A thread-safe queue that returns callbacks in order of priority. Callbacks with the same priority are returned in the order they were added.
+    A callback added as a barrier is only returned after every callback added before it, and before every callback added after it.
+    Callbacks added with a generation other than the queue's current generation are discarded instead of being returned."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.segments = deque([self._new_segment()])
+        self.generation = 0
+        # When tracing, the time and thread that queued the last callback returned
+        self.last_queued = None
+
+    def _new_segment(self):
+        return tuple(deque() for priority in range(PRIORITY_IDLE + 1))
+
+    def put(self, callback, priority=None, barrier=False, generation=None):
+        if priority is None: priority = PRIORITY_NORMAL
+        with self.lock:
+            if barrier:
+                self.segments.append(self._new_segment())
+                priority = PRIORITY_HIGH
+            queued = (time.perf_counter(), tracer._get_thread_id()) if tracer.enabled else None
+            self.segments[-1][priority].append((callback, generation, queued))
+
+    def get_nowait(self):
+        with self.lock:
+            while True:
+                for callbacks in self.segments[0]:
+                    while callbacks:
+                        callback, generation, queued = callbacks.popleft()
+                        if generation is None or generation == self.generation:
+                            self.last_queued = queued
+                            return callback
+                if len(self.segments) == 1:
+                    raise queue.Empty
+                self.segments.popleft()
+
+    def empty(self):
+        with self.lock:
+            return not any(callbacks for segment in self.segments for callbacks in segment)
+
+    def advance_generation(self):
+        "Start a new generation, so that callbacks added with an earlier one are discarded. Return the new generation."
+        with self.lock:
+            self.generation += 1
+            return self.generation
+
+    def clear(self):
+        "Remove every queued callback and return them."
+        with self.lock:
+            dropped = [item[0] for segment in self.segments for callbacks in segment for item in callbacks]
+            self.segments = deque([self._new_segment()])
+        return dropped
+
+
+class Dispatcher:
+    """Evaluate the callbacks queued by :class:`~tkinterweb.TkinterWeb` widgets on the main thread. 
+    All widgets in the same Tcl interpreter share one dispatcher, so there is only ever one wakeup or polling loop.
+
+    The event loop is woken whenever a callback is queued. Threads can only do this while the main thread is in ``mainloop()``, 
+    so until they are known to be able to, the queues are polled every :attr:`Dispatcher.delay` milliseconds instead.
+    After that, the queues are only polled every :attr:`Dispatcher.fallback_delay` milliseconds while worker threads or asynchronous requests are still running, 
+    in case the main thread leaves ``mainloop()`` before they finish. An idle app does not poll at all.
+    
+    Widgets take turns, one callback at a time, so that a busy widget does not hold up the others. 
+    After :attr:`Dispatcher.budget` milliseconds, Tk is given a chance to redraw and handle input before evaluation continues.
+    
+    New in version 4.26."""
+
+    delay = 50
+    fallback_delay = 1000
+    budget = 10
+
+    instances = weakref.WeakSet()
+
+    def __init__(self, root):
+        self.root = root
+        self.queues = {}
+        self.order = deque()
+        self.lock = threading.Lock()
+        self.wakeup = None
+        self.woken = False
+        self.probing = False
+        self.polls = 0
+        self.poll_after = None
+        Dispatcher.instances.add(self)
+
+    @classmethod
+    def watch_all(cls):
+        "Call :meth:`Dispatcher.watch` on every dispatcher."
+        # NOTE: this must run in the main thread
+        for dispatcher in tuple(cls.instances):
+            dispatcher.watch()
+
+    @classmethod
+    def get(cls, widget):
+        "Return the dispatcher for the widget's Tcl interpreter."
+        root = widget._root()
+        dispatcher = getattr(root, "_tkinterweb_dispatcher", None)
+        if dispatcher is None:
+            dispatcher = root._tkinterweb_dispatcher = cls(root)
+        return dispatcher
+
+    def register(self, widget, queue):
+        "Start evaluating the given queue."
+        with self.lock:
+            if widget not in self.queues:
+                self.order.append(widget)
+            self.queues[widget] = queue
+        if self.poll_after is None:
+            self.poll()
+
+    def unregister(self, widget):
+        "Stop evaluating the widget's queue. Anything still queued is dropped, and the futures of any submitted tasks are cancelled."
+        with self.lock:
+            tasks = self.queues.pop(widget, None)
+            if tasks is not None:
+                self.order.remove(widget)
+            stop_polling = not self.queues and self.poll_after
+            if stop_polling:
+                poll_after, self.poll_after = self.poll_after, None
+        if tasks is not None:
+            _cancel_queued(tasks)
+        if not stop_polling:
+            return
+        try:
+            self.root.after_cancel(poll_after)
+        except TclError:
+            pass
+
+    def evaluate(self):
+        "Evaluate queued callbacks until every queue is empty or the time budget is used up."
+        # NOTE: this must run in the main thread
+        self.woken = False
+        deadline = time.perf_counter() + self.budget / 1000
+        empty = 0
+        while True:
+            with self.lock:
+                if empty >= len(self.order):
+                    return
+                widget = self.order[0]
+                self.order.rotate(-1)
+                tasks = self.queues[widget]
+            try:
+                callback = tasks.get_nowait()
+            except queue.Empty:
+                empty += 1
+                continue
+            empty = 0
+
+            try:
+                if tracer.enabled:
+                    self._trace(widget, tasks, callback)
+                else:
+                    callback()
+            except Exception:
+                # Make sure the rest of the queue is not forgotten
+                self.woken = True
+                self.root.after(0, self.evaluate)
+                raise
+
+            if time.perf_counter() > deadline:
+                # Let Tk redraw and handle input before continuing
+                self.woken = True
+                self.root.after_idle(lambda: self.root.after(0, self.evaluate))
+                return
+
+    def _trace(self, widget, tasks, callback):
+        "Evaluate a callback, recording how long it waited in the queue and how long it took."
+        # NOTE: this must run in the main thread
+        performance = getattr(widget, "performance", None)
+        navigation = performance.navigationId if performance is not None else None
+        name = getattr(callback, "__qualname__", type(callback).__name__)
+        if tasks.last_queued is not None:
+            queued, thread_id = tasks.last_queued
+            tracer.add_async("queue wait", "queue", queued, time.perf_counter(), thread_id, callback=name, navigation=navigation)
+        with tracer.span(name, "callback", navigation=navigation):
+            callback()
+
+    def wake(self):
+        "Ask the event loop to evaluate the queues."
+        # NOTE: this may run in a thread
+        try:
+            if threading.current_thread() is threading.main_thread():
+                if not self.woken:
+                    self.woken = True
+                    self.root.after_idle(self.evaluate)
+                if self.wakeup is False and self.poll_after is None:
+                    self.poll()
+            elif self.wakeup and not self.woken:
+                self.woken = True
+                try:
+                    self.root.after(0, self.evaluate)
+                except RuntimeError:
+                    # The main thread has left the event loop
+                    # The fallback polling loop picks the queue up again and speeds up until threads can wake the event loop
+                    self.woken = False
+                    self.wakeup = False
+        except TclError:
+            # The interpreter doesn't exist anymore
+            pass
+
+    def watch(self):
+        "Start the fallback poll if it is not running. Call this after starting work that will queue callbacks from another thread."
+        # NOTE: this must run in the main thread
+        if self.queues and self.poll_after is None:
+            try:
+                self.poll_after = self.root.after(self.fallback_delay if self.wakeup is True else self.delay, self.poll)
+            except TclError:
+                pass
+
+    def busy(self):
+        "Return True if any worker thread or asynchronous request may still queue callbacks."
+        if StoppableThread.alive:
+            return True
+        with self.lock:
+            widgets = tuple(self.queues)
+        return any(getattr(widget, "active_threads", None) for widget in widgets)
+
+    def poll(self):
+        """Evaluate the queues every :attr:`Dispatcher.delay` milliseconds until threads are known to be able to wake the event loop. 
+        After that, evaluate them every :attr:`Dispatcher.fallback_delay` milliseconds while :meth:`Dispatcher.busy` is True, and stop polling once it is not."""
+        # NOTE: this must run in the main thread
+        self.evaluate()
+        if not self.queues:
+            self.poll_after = None
+            return
+        
+        if self.wakeup is True:
+            self.poll_after = self.root.after(self.fallback_delay, self.poll) if self.busy() else None
+            return
+
+        # Check every second or so whether threads can wake the event loop yet
+        if not self.probing and self.polls % 20 == 0:
+            self.probing = True
+            threading.Thread(target=self._probe, daemon=True).start()
+        self.polls += 1
+        self.poll_after = self.root.after(self.delay, self.poll)
+
+    def _probe(self):
+        # NOTE: this runs in a thread
+        try:
+            self.root.after(0, self.evaluate)
+            self.wakeup = True
+        except RuntimeError:
+            self.wakeup = False
+        except TclError:
+            pass
+        self.probing = False
+
+
 class Empty:
     __slots__ = ()
     def __init__(self, *args, **kwargs):
@@ -751,6 +1112,20 @@ class PlaceholderClass:
     def __getitem__(self, key):
         return empty
 
+class AtomicCounter:
+    "A counter that can safely be advanced from several threads at once. Like :py:func:`itertools.count`, ``next()`` returns the current value and then increments it."
+
+    def __init__(self, start=0):
+        self.value = start
+        self.lock = threading.Lock()
+
+    def __next__(self):
+        with self.lock:
+            value = self.value
+            self.value += 1
+        return value
+
+
 class BaseManager:
     def __init__(self, html):
         self.html = html
@@ -760,6 +1135,7 @@ class BaseManager:
         pass
 
 placebo = PlaceholderClass()
+_manager_lock = threading.RLock()
 
 def lazy_manager(setting):
     def decorator(func):
@@ -772,8 +1148,10 @@ def lazy_manager(setting):
                 return placebo
 
             if attr_name not in self.__dict__:
-                manager = func(self)
-                self.__dict__[attr_name] = manager
+                # Managers may be first used from several threads at once
+                with _manager_lock:
+                    if attr_name not in self.__dict__:
+                        self.__dict__[attr_name] = func(self)
 
             return self.__dict__[attr_name]
     
@@ -800,6 +1178,46 @@ def special_setting(default=None):
     return decorator
 
 
+class DownloadCancelled(Exception):
+    "Raised when a download is stopped before it finishes."
+
+
+def abort_response(response):
+    "Shut down the connection behind a response so that a read that is blocked in another thread returns immediately."
+    if response is None:
+        return
+    # The socket is not public, so fall back to closing the response if it cannot be found
+    sock = getattr(getattr(getattr(response, "fp", None), "raw", None), "_sock", None)
+    try:
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+        else:
+            response.close()
+    except Exception:
+        pass
+
+def _read_response(res, thread):
+    "Read a response in chunks, stopping early if the thread is stopped."
+    if thread is None:
+        return res.read()
+    
+    thread.response = res
+    chunks = []
+    try:
+        while thread.isrunning():
+            chunk = res.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                if thread.isrunning():
+                    return b"".join(chunks)
+                break
+            chunks.append(chunk)
+    except Exception:
+        if thread.isrunning():
+            raise
+    finally:
+        thread.response = None
+    raise DownloadCancelled(f"the download of {res.geturl()} was stopped")
+
 def download(url, data="", method="GET", decode=None, insecure=False, cafile=None, headers=(), timeout=15):
     "Fetch files. Note that headers should be converted from dict to tuple before calling download() as dicts aren't hashable."
     if insecure or cafile:
@@ -821,11 +1239,28 @@ def download(url, data="", method="GET", decode=None, insecure=False, cafile=Non
     else:
         req = Request(url, headers=dict(headers))
     
+    thread = get_current_thread()
+    if not isinstance(thread, (StoppableThread, _HedgeAttempt)):
+        thread = None
+
+    # Filled in if the download is being timed by Performance
+    timing = getattr(_local, "timing", None)
+    if timing is not None:
+        timing["requestStart"] = time.perf_counter()
+
     with urlopen(req, context=context, timeout=timeout) as res:
-        data = res.read()
+        # The thread cannot be interrupted while connecting, so check whether it was stopped in the meantime
+        if thread is not None and not thread.isrunning():
+            raise DownloadCancelled(f"the download of {url} was stopped")
+        if timing is not None:
+            timing["responseStart"] = time.perf_counter()
+        data = _read_response(res, thread)
         url = res.geturl()
         info = res.info()
         code = res.getcode()
+        if timing is not None:
+            timing["responseEnd"] = time.perf_counter()
+            timing["transferSize"] = len(data)
 
         if not url.startswith("file://") and not url.startswith("data:"):
             enc = res.getheader("Content-Encoding", "").lower()
@@ -838,6 +1273,8 @@ def download(url, data="", method="GET", decode=None, insecure=False, cafile=Non
                     data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
             elif enc == "br" and brotli_installed:
                 data = brotli.decompress(data)
+            if timing is not None and enc:
+                timing["decompressionEnd"] = time.perf_counter()
 
         try:
             maintype = info.get_content_maintype()
@@ -854,59 +1291,1150 @@ def download(url, data="", method="GET", decode=None, insecure=False, cafile=Non
         return url, data, filetype, code
 
 
+class MemoCache:
+    """A small thread-safe LRU mapping for values that are derived from downloaded files, such as processed stylesheets.
+
+    :param maxsize: The maximum number of values to store. If None, ``utilities.CACHE_MAXSIZE`` is used.
+    :type maxsize: int or None
+    :param maxbytes: The maximum total size of the stored values, or a function that returns it. If None, the size is not limited.
+    :type maxbytes: int, function, or None
+    
+    New in version 4.26."""
+
+    def __init__(self, maxsize=None, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.cache = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cache)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key][0]
+        return default
+
+    def set(self, key, value, size=0):
+        "Store a value. The size is counted against ``maxbytes``."
+        with self.lock:
+            if key in self.cache:
+                self.size -= self.cache[key][1]
+            self.cache[key] = value, size
+            self.cache.move_to_end(key)
+            self.size += size
+        self.trim()
+
+    def trim(self):
+        "Remove the least recently used values until the cache is within its limits."
+        maxsize = CACHE_MAXSIZE if self.maxsize is None else self.maxsize
+        maxbytes = self.maxbytes() if callable(self.maxbytes) else self.maxbytes
+        with self.lock:
+            while self.cache and (len(self.cache) > maxsize or (maxbytes is not None and self.size > maxbytes)):
+                self.size -= self.cache.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.size = 0
+
+
+class CacheShard:
+    """One part of the lookup table of an :class:`LRUCache`. Each shard has its own lock so that threads looking up or downloading different files don't wait for each other.
+    The order in which files are evicted is kept by the cache itself."""
+
+    __slots__ = ("lock", "cache", "pending")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.pending = {}
+
+
 class LRUCache:
     """Fetch files and add them to the LRU cache, or check if they're in the cache already.
     If a url redirects, store the final url.
-    This way, downloading the redirected url (eg. by saving the page or reloading) still points to the cached entry."""
+    This way, downloading the redirected url (eg. by saving the page or reloading) still points to the cached entry.
+
+    By default all widgets share the same cache, ``utilities.lru_cache``. 
+    Create a new instance and pass it to the ``cache_partition`` configuration option of one or more widgets to give them their own cache.
+
+    Lookups and in-progress downloads are spread over several shards by a hash of their url and download settings, so that threads rarely wait for each other. 
+    ``maxsize`` and ``maxbytes`` apply to the cache as a whole, and the least recently used file is always evicted first.
+    Processed stylesheets, kept in :attr:`LRUCache.stylesheets`, count towards ``maxbytes`` too.
+    
+    :param maxsize: The maximum number of files to store. If None, ``utilities.CACHE_MAXSIZE`` is used.
+    :type maxsize: int or None
+    :param maxbytes: The maximum total size of the stored files and processed stylesheets. If None, the size is not limited.
+    :type maxbytes: int or None
+    :param shards: The number of shards.
+    :type shards: int
+
+    New in version 4.26: the ``maxsize``, ``maxbytes``, and ``shards`` parameters."""
     
     # TODO: consider TTL, LFU, extension to write to disk, etc.
-    def __init__(self):
-        self.cache = OrderedDict()
+    def __init__(self, maxsize=None, maxbytes=None, shards=CACHE_SHARDS):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.shards = tuple(CacheShard() for i in range(shards))
+        # The eviction order, count, and total size are shared by all shards
+        self.lock = threading.Lock()
+        self.order = OrderedDict()
+        self.size = 0
         self.redirects = {}
-        self.lock = threading.RLock()
+        self.redirects_lock = threading.Lock()
+        # Processed stylesheets get whatever is left of the byte budget
+        self.stylesheets = MemoCache(maxsize, self._get_stylesheet_budget)
+
+    def __len__(self):
+        return len(self.order)
+
+    def _get_stylesheet_budget(self):
+        return None if self.maxbytes is None else max(0, self.maxbytes - self.size)
+
+    def _get_shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def _get_key(self, url, args):
+        with self.redirects_lock:
+            url = self.redirects.get(url, url)
+        key = (url, *args)
+        return url, key, self._get_shard(key)
 
     def check(self, url, *args):
+        url, key, shard = self._get_key(url, args)
+        with shard.lock:
+            return key in shard.cache
+
+    def fetch(self, url, *args, downloader=None):
+        url, key, shard = self._get_key(url, args)
+        with shard.lock:
+            entry = shard.cache.get(key)
+            # If the file is already being downloaded (i.e. by the preload scanner), wait for that download instead of starting another
+            event = shard.pending.get(key) if entry is None else None
+            if entry is None and event is None:
+                shard.pending[key] = threading.Event()
+        
+        if entry is not None:
+            with self.lock:
+                if key in self.order:
+                    self.order.move_to_end(key)
+            return entry
+
+        if event is not None:
+            event.wait()
+            # If the other download failed, try again
+            return self.fetch(url, *args, downloader=downloader)
+            
+        try:
+            newurl, data, filetype, code = (downloader or download)(url, *args)
+        except BaseException:
+            with shard.lock:
+                shard.pending.pop(key).set()
+            raise
+
+        maxsize = CACHE_MAXSIZE if self.maxsize is None else self.maxsize
+        maxbytes = self.maxbytes
+        entry = newurl, data, filetype, code
+
+        # The file is added to its shard before the eviction order, so that it can always be found and removed when it is evicted
+        with shard.lock:
+            shard.cache[key] = entry
+            shard.pending.pop(key).set()
+
+        evicted = []
         with self.lock:
-            url = self.redirects.get(url, url)
-            key = (url, *args)
+            previous = self.order.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self.order[key] = entry
+            self.size += len(data)
+            while self.order and (len(self.order) > maxsize or (maxbytes is not None and self.size > maxbytes)):
+                evicted.append(self.order.popitem(last=False))
+                self.size -= len(evicted[-1][1][1])
+
+        # Files take priority over the processed stylesheets, which only get what is left of the byte budget
+        if maxbytes is not None:
+            self.stylesheets.trim()
+
+        for evicted_key, evicted_entry in evicted:
+            evicted_shard = self._get_shard(evicted_key)
+            with evicted_shard.lock:
+                # The file may have been downloaded again in the meantime
+                if evicted_shard.cache.get(evicted_key) is evicted_entry:
+                    del evicted_shard.cache[evicted_key]
+
+        if newurl != url:
+            with self.redirects_lock:
+                self.redirects[newurl] = url
+                
+        return newurl, data, filetype, code
+            
+    def clear(self):
+        "Remove all files from the cache."
+        with self.lock:
+            self.order.clear()
+            self.size = 0
+        for shard in self.shards:
+            with shard.lock:
+                shard.cache.clear()
+        with self.redirects_lock:
+            self.redirects.clear()
+        self.stylesheets.clear()
 
-            if key in self.cache:
-                return True
+lru_cache = LRUCache()
+
+def cache_download(url, data="", method="GET", decode=None, insecure=False, cafile=None, headers=(), timeout=15, cache=None, downloader=None):
+    if cache is None: cache = lru_cache
+    return cache.fetch(url, data, method, decode, insecure, cafile, headers, timeout, downloader=downloader)
+
+def check_download(url, data="", method="GET", decode=None, insecure=False, cafile=None, headers=(), timeout=15, cache=None):
+    if cache is None: cache = lru_cache
+    return cache.check(url, data, method, decode, insecure, cafile, headers, timeout)
+
+
+class Tracer:
+    """Record what the loader threads and the main thread are doing as trace events. 
+    The events can be saved in the JSON trace event format, which can be opened in Perfetto (https://ui.perfetto.dev) or ``chrome://tracing``.
+
+    Tracing is disabled until :meth:`start` is called. Use the shared :data:`tracer` instance, which records downloads, preprocessing, Tkhtml parsing, stylesheets, 
+    image decoding, scripts, virtual events, callbacks evaluated by the :class:`Dispatcher`, and the time those callbacks spent waiting in the queue. 
+    Each event carries the id of the thread it ran in and, where known, the ``navigation`` id of the page it belongs to (see :attr:`Performance.navigationId`).
+
+    At most :data:`TRACE_BUFFER_SIZE` events are kept. The oldest events are discarded first.
+    
+    New in version 4.26."""
+
+    def __init__(self, maxlen=None):
+        self.enabled = False
+        self.events = deque(maxlen=TRACE_BUFFER_SIZE if maxlen is None else maxlen)
+        self.threads = {}
+        # Guards both the events and the thread names, which are recorded from every thread
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.ids = AtomicCounter()
+
+    def start(self):
+        "Discard any recorded events and start recording."
+        with self.lock:
+            self.events.clear()
+            self.threads.clear()
+        self.origin = time.perf_counter()
+        self.enabled = True
+
+    def stop(self):
+        "Stop recording. The recorded events are kept until :meth:`start` is called again."
+        self.enabled = False
+
+    def _to_us(self, timestamp):
+        return round((timestamp - self.origin) * 1000000, 3)
+
+    def _get_thread_id(self):
+        thread_id = threading.get_ident()
+        with self.lock:
+            if thread_id not in self.threads:
+                self.threads[thread_id] = threading.current_thread().name
+        return thread_id
+
+    def _record(self, *events):
+        with self.lock:
+            self.events.extend(events)
+
+    def add(self, name, category, start, end, **args):
+        "Record something that ran in the current thread between the given :func:`time.perf_counter` timestamps."
+        # NOTE: this method is thread-safe
+        self._record({"name": name, "cat": category, "ph": "X", "ts": self._to_us(start), "dur": round((end - start) * 1000000, 3), 
+                      "pid": self.pid, "tid": self._get_thread_id(), "args": args})
+
+    def add_async(self, name, category, start, end, thread_id=None, **args):
+        "Record something that started in the given thread and may have finished in another, such as a callback waiting in a queue. These are shown on their own track."
+        # NOTE: this method is thread-safe
+        event_id = next(self.ids)
+        if thread_id is None: thread_id = self._get_thread_id()
+        self._record({"name": name, "cat": category, "ph": "b", "id": event_id, "ts": self._to_us(start), "pid": self.pid, "tid": thread_id, "args": args},
+                     {"name": name, "cat": category, "ph": "e", "id": event_id, "ts": self._to_us(end), "pid": self.pid, "tid": thread_id})
+
+    def instant(self, name, category, **args):
+        "Record something that happened now in the current thread."
+        # NOTE: this method is thread-safe
+        self._record({"name": name, "cat": category, "ph": "i", "s": "t", "ts": self._to_us(time.perf_counter()), 
+                      "pid": self.pid, "tid": self._get_thread_id(), "args": args})
+
+    @contextmanager
+    def span(self, name, category, **args):
+        "Record the code run in this context."
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, time.perf_counter(), **args)
+
+    def get_events(self):
+        "Return the recorded events, preceded by the names of the threads they ran in."
+        with self.lock:
+            threads = tuple(self.threads.items())
+            events = list(self.events)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": thread_id, "args": {"name": name}} 
+                    for thread_id, name in threads]
+        return metadata + events
+
+    def save(self, path):
+        "Save the recorded events to the given file in the JSON trace event format."
+        with open(path, "w") as handle:
+            json.dump({"traceEvents": self.get_events(), "displayTimeUnit": "ms"}, handle)
+
+
+class _TclProxy:
+    "Stand in for a widget's Tcl interpreter and report each call and eval to a :class:`TclProfiler`."
+
+    def __init__(self, tk, profiler):
+        self.tk = tk
+        self.profiler = profiler
+
+    def call(self, *args):
+        return self.profiler._run(self.tk.call, args, self.profiler._get_command(args), sys._getframe(1))
+
+    def eval(self, script):
+        return self.profiler._run(self.tk.eval, (script,), "eval " + (script.split(None, 1) or [""])[0], sys._getframe(1))
+
+    def __getattr__(self, name):
+        return getattr(self.tk, name)
+
+
+class TclProfiler:
+    """Count and time the Tcl round trips made by a widget and its descendants, grouped by the TkinterWeb API that made them. 
+    This is useful for finding code that makes many small calls into Tkhtml, such as a loop that reads one node property at a time.
+
+    Call :meth:`attach` to start profiling a widget and :meth:`detach` to stop. Each ``tk.call`` and ``tk.eval`` is recorded against:
+
+    * the outermost public TkinterWeb function or method on the stack (eg. ``HtmlFrame.load_html`` or ``CSSStyleDeclaration.__getitem__``), 
+      or the TkinterWeb callback that Tcl invoked, or the calling function if the call came from outside TkinterWeb,
+    * the TkinterWeb function that made the call, and
+    * the Tcl command, with widget paths shown as ``$widget`` and Tkhtml node handles shown as ``$node``.
+
+    The total time of a call includes any Python callbacks it triggered. The own time excludes the Tcl calls made by those callbacks.
+
+    Profiling adds a small overhead to every call, so it is best used while debugging.
+
+    New in version 4.26."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.package_dir = os.path.dirname(os.path.abspath(__file__))
+        self.tkinter_dir = os.path.dirname(os.path.abspath(tkinter.__file__))
+        self._codes = {}
+        self._local = threading.local()
+
+    def attach(self, widget):
+        "Start profiling the given widget and its descendants, including widgets created later."
+        tk = widget.tk
+        if not isinstance(tk, _TclProxy):
+            self._replace(widget, tk, _TclProxy(tk, self))
+
+    def detach(self, widget):
+        "Stop profiling the given widget and its descendants. The recorded calls are kept until :meth:`reset` is called."
+        tk = widget.tk
+        if isinstance(tk, _TclProxy) and tk.profiler is self:
+            self._replace(widget, tk, tk.tk)
+
+    def _replace(self, widget, old, new):
+        if widget.__dict__.get("tk") is old:
+            widget.tk = new
+        for child in tuple(widget.children.values()):
+            self._replace(child, old, new)
+
+    def reset(self):
+        "Discard the recorded calls."
+        with self.lock:
+            self.stats.clear()
+
+    def _get_command(self, args):
+        if len(args) == 1 and isinstance(args[0], tuple):
+            args = args[0]
+        if not args:
+            return ""
+        command = str(args[0])
+        if command.startswith("."):
+            command = "$widget"
+        elif command.startswith("::tkhtml::node"):
+            command = "$node"
+        elif len(args) < 2 or not isinstance(args[1], str) or not args[1].isidentifier():
+            return command
+        if len(args) > 1:
+            command += " " + str(args[1])
+        return command
+
+    def _describe_code(self, frame):
+        code = frame.f_code
+        try:
+            return self._codes[code]
+        except KeyError:
+            pass
+        directory = os.path.dirname(os.path.abspath(code.co_filename))
+        if directory == self.package_dir:
+            kind = "package"
+        elif directory == self.tkinter_dir:
+            kind = "tkinter"
+        else:
+            kind = None
+        name = getattr(code, "co_qualname", None)
+        if name is None:
+            # Python 3.10 and older
+            instance = frame.f_locals.get("self")
+            name = f"{type(instance).__name__}.{code.co_name}" if instance is not None else code.co_name
+        if kind is None:
+            name = f"{os.path.basename(code.co_filename)}:{name}"
+        public = not code.co_name.startswith(("_", "<")) or (code.co_name.startswith("__") and code.co_name.endswith("__"))
+        self._codes[code] = description = (kind, name, public)
+        return description
+
+    def _get_callers(self, frame):
+        "Walk out from the frame that made the call and return the API it belongs to and the TkinterWeb function that made it."
+        api = caller = public_api = None
+        while frame is not None:
+            kind, name, public = self._describe_code(frame)
+            if kind == "package":
+                if caller is None:
+                    caller = name
+                api = name
+                if public:
+                    public_api = name
+            elif kind is None:
+                if caller is None:
+                    return name, name
+                break
+            frame = frame.f_back
+        return public_api or api, caller
+
+    def _run(self, function, args, command, frame):
+        api, caller = self._get_callers(frame)
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            key = (api, caller, command)
+            with self.lock:
+                record = self.stats.get(key)
+                if record is None:
+                    self.stats[key] = [1, elapsed, elapsed - nested]
+                else:
+                    record[0] += 1
+                    record[1] += elapsed
+                    record[2] += elapsed - nested
+
+    def get_stats(self):
+        "Return a list of dictionaries describing the recorded calls, most frequent first. Times are in milliseconds."
+        with self.lock:
+            items = [(key, tuple(record)) for key, record in self.stats.items()]
+        return [{"api": api, "caller": caller, "command": command, "calls": calls, "time": total * 1000, "own_time": own * 1000}
+                for (api, caller, command), (calls, total, own) in sorted(items, key=lambda item: -item[1][0])]
+
+    def report(self, sort="calls", limit=None):
+        """Return a text report of the recorded calls grouped by API.
+        
+        :param sort: Either "calls", "time", or "own_time".
+        :param limit: The maximum number of APIs to list, or None to list them all."""
+        apis = {}
+        for entry in self.get_stats():
+            summary = apis.setdefault(entry["api"], {"calls": 0, "time": 0, "own_time": 0, "entries": []})
+            summary["calls"] += entry["calls"]
+            summary["time"] += entry["time"]
+            summary["own_time"] += entry["own_time"]
+            summary["entries"].append(entry)
+
+        ordered = sorted(apis.items(), key=lambda item: -item[1][sort])
+        lines = ["{} Tcl calls in {:.1f} ms ({:.1f} ms own time) from {} APIs".format(
+                    sum(summary["calls"] for summary in apis.values()), sum(summary["time"] for summary in apis.values()), 
+                    sum(summary["own_time"] for summary in apis.values()), len(apis)),
+                 "", "{:>8} {:>10} {:>10}  {}".format("calls", "total ms", "own ms", "api / caller: command")]
+        for api, summary in ordered[:limit]:
+            lines.append("{calls:>8} {time:>10.2f} {own_time:>10.2f}  ".format(**summary) + api)
+            for entry in sorted(summary["entries"], key=lambda entry: -entry[sort]):
+                lines.append("{calls:>8} {time:>10.2f} {own_time:>10.2f}      {caller}: {command}".format(**entry))
+        return "\n".join(lines)
+
+    def save(self, path):
+        "Save the recorded calls to the given file as JSON."
+        with open(path, "w") as handle:
+            json.dump(self.get_stats(), handle, indent=2)
+
+
+class PerformanceEntry:
+    """A timing entry, modelled on the entries of the web Performance API. Times are in milliseconds since :attr:`Performance.timeOrigin`.
+    
+    :ivar name: The entry's name. For resources and navigations, this is the url.
+    :ivar entryType: One of ``navigation``, ``resource``, ``stage``, ``mark``, or ``measure``.
+    :ivar startTime: When the entry started.
+    :ivar duration: How long the entry lasted.
+    :ivar detail: A dictionary of additional timings and information.
+    
+    New in version 4.26."""
+
+    __slots__ = ("name", "entryType", "startTime", "duration", "detail")
+
+    def __init__(self, name, entryType, startTime, duration=0.0, detail=None):
+        self.name = name
+        self.entryType = entryType
+        self.startTime = startTime
+        self.duration = duration
+        self.detail = {} if detail is None else detail
+
+    def toJSON(self):
+        "Return the entry as a dictionary."
+        entry = {"name": self.name, "entryType": self.entryType, "startTime": self.startTime, "duration": self.duration}
+        entry.update(self.detail)
+        return entry
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.entryType} {shorten(self.name)!r} at {self.startTime:.1f}ms for {self.duration:.1f}ms>"
+
+
+class Performance:
+    """Record when each stage of loading a page happens, modelled on the web Performance API. 
+    Access this class via the :attr:`~tkinterweb.HtmlFrame.performance` property of the :class:`~tkinterweb.HtmlFrame` widget, or as ``performance`` from JavaScript.
+
+    The timeline is restarted whenever a new page is loaded. It holds:
+
+    * a ``navigation`` entry for the page itself, whose :attr:`PerformanceEntry.detail` contains the ``requestStart``, ``responseStart``, ``responseEnd``, ``decompressionEnd``, ``domContentLoaded``, and ``doneLoading`` milestones;
+    * a ``resource`` entry for each stylesheet, script, and image the page downloads, with the same request timings;
+    * ``stage`` entries for the work done on the main thread and in loader threads: ``preprocess``, ``parse``, ``css-parse``, ``image-decode``, and ``script``;
+    * any ``mark`` and ``measure`` entries added with :meth:`mark` and :meth:`measure`.
+
+    At most :data:`PERFORMANCE_BUFFER_SIZE` entries are kept per page. Later entries are dropped.
+
+    :ivar timeOrigin: When the page started loading, in milliseconds since the epoch.
+    :ivar navigationId: A number that identifies the page. Each page load is given a new id. This is also used to label the page's events when tracing with :data:`tracer`.
+    
+    New in version 4.26."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._start_navigation("")
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {shorten(self.navigation.name)!r} with {len(self.entries)} entries>"
+
+    def _start_navigation(self, url):
+        "Restart the timeline for a new page."
+        with self.lock:
+            self.timeOrigin = time.time() * 1000
+            self._origin = time.perf_counter()
+            self.navigationId = next(navigation_ids)
+            self.navigation = PerformanceEntry(url, "navigation", 0.0)
+            self.entries = [self.navigation]
+
+    def _to_ms(self, timestamp, origin=None):
+        return (timestamp - (self._origin if origin is None else origin)) * 1000
+
+    def _add(self, entry, origin=None):
+        with self.lock:
+            # Entries from a page that has since been left are discarded
+            if (origin is None or origin == self._origin) and len(self.entries) < PERFORMANCE_BUFFER_SIZE:
+                self.entries.append(entry)
+
+    def _milestone(self, name):
+        "Record when the page reached the given milestone."
+        with self.lock:
+            self.navigation.detail[name] = now = self.now()
+            self.navigation.duration = max(self.navigation.duration, now)
+
+    @contextmanager
+    def _stage(self, name, **detail):
+        "Time the code run in this context as a stage of loading the page."
+        origin = self._origin
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._add(PerformanceEntry(name, "stage", self._to_ms(start, origin), (end - start) * 1000, detail), origin)
+            if tracer.enabled:
+                tracer.add(name, "stage", start, end, navigation=self.navigationId, **detail)
+
+    @contextmanager
+    def _resource(self, url, initiatorType):
+        """Time the download run in this context. 
+        If the initiator type is ``navigation``, the timings are added to the navigation entry instead of a new resource entry."""
+        origin = self._origin
+        navigation = self.navigationId
+        previous = getattr(_local, "timing", None)
+        _local.timing = timing = {}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _local.timing = previous
+            if tracer.enabled:
+                tracer.add(f"download {initiatorType}", "network", start, end, navigation=navigation, url=url, fromCache="requestStart" not in timing)
+            detail = {key: (value if key == "transferSize" else self._to_ms(value, origin)) for key, value in timing.items()}
+            if initiatorType == "navigation":
+                with self.lock:
+                    if origin == self._origin:
+                        self.navigation.detail.update(detail)
             else:
-                return False
+                detail["initiatorType"] = initiatorType
+                detail["fromCache"] = "requestStart" not in timing
+                self._add(PerformanceEntry(url, "resource", self._to_ms(start, origin), (end - start) * 1000, detail), origin)
+
+    def now(self):
+        "Return the number of milliseconds since the page started loading."
+        return (time.perf_counter() - self._origin) * 1000
+
+    @property
+    def timing(self):
+        "The milestones reached by the page so far, in milliseconds since it started loading."
+        return dict(self.navigation.detail)
+
+    def mark(self, name, detail=None):
+        "Add a named timestamp to the timeline and return it."
+        entry = PerformanceEntry(name, "mark", self.now(), 0.0, detail)
+        self._add(entry)
+        return entry
+
+    def measure(self, name, startMark=None, endMark=None):
+        """Add an entry spanning the time between two marks and return it. 
+        If ``startMark`` is not given, the entry starts when the page started loading. If ``endMark`` is not given, the entry ends now."""
+        start = self._get_mark_time(startMark) if startMark is not None else 0.0
+        end = self._get_mark_time(endMark) if endMark is not None else self.now()
+        entry = PerformanceEntry(name, "measure", start, end - start)
+        self._add(entry)
+        return entry
+
+    def _get_mark_time(self, name):
+        marks = self.getEntriesByName(name, "mark")
+        if not marks:
+            if name in self.navigation.detail:
+                return self.navigation.detail[name]
+            raise ValueError(f"the mark {name} does not exist")
+        return marks[-1].startTime
+
+    def getEntries(self):
+        "Return all entries, ordered by start time."
+        with self.lock:
+            return sorted(self.entries, key=lambda entry: entry.startTime)
+
+    def getEntriesByType(self, entryType):
+        "Return the entries of the given type, ordered by start time."
+        return [entry for entry in self.getEntries() if entry.entryType == entryType]
 
-    def fetch(self, url, *args):
+    def getEntriesByName(self, name, entryType=None):
+        "Return the entries with the given name, and optionally of the given type, ordered by start time."
+        return [entry for entry in self.getEntries() if entry.name == name and (entryType is None or entry.entryType == entryType)]
+
+    def clearMarks(self, name=None):
+        "Remove all marks, or the marks with the given name."
+        self._clear("mark", name)
+
+    def clearMeasures(self, name=None):
+        "Remove all measures, or the measures with the given name."
+        self._clear("measure", name)
+
+    def _clear(self, entryType, name):
         with self.lock:
-            url = self.redirects.get(url, url)
-            key = (url, *args)
+            self.entries = [entry for entry in self.entries if entry.entryType != entryType or (name is not None and entry.name != name)]
+
+    def toJSON(self):
+        "Return the timeline as a dictionary that can be serialised, for example to send to a monitoring service."
+        return {"timeOrigin": self.timeOrigin, "entries": [entry.toJSON() for entry in self.getEntries()]}
+
+
+tracer = Tracer()
+navigation_ids = AtomicCounter()
 
-            if key in self.cache:
-                return self.cache[key]
-            
-        newurl, data, filetype, code = download(url, *args)
 
+class LatencyTracker:
+    "Remember how long recent downloads took so that slow requests can be recognised."
+
+    def __init__(self, samples=100, minimum=20):
+        self.samples = deque(maxlen=samples)
+        self.minimum = minimum
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
         with self.lock:
-            self.cache[key] = newurl, data, filetype, code
+            self.samples.append(seconds)
 
-            if len(self.cache) > CACHE_MAXSIZE:
-                self.cache.popitem(last=False)
+    def percentile(self, percentile):
+        "Return the given percentile of the recorded download times, or None if too few downloads have been recorded."
+        with self.lock:
+            if len(self.samples) < self.minimum:
+                return None
+            samples = sorted(self.samples)
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
 
-            if newurl != url:
-                self.redirects[newurl] = url
-                
-            return newurl, data, filetype, code
+
+class _HedgeAttempt:
+    """Stand in for a loader thread while it makes the first of two hedged requests. 
+    Stopping the attempt interrupts the request without stopping the thread. Stopping the thread also stops the attempt."""
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.cancelled = False
+        self.generation = thread.generation
+        self.is_subthread = thread.is_subthread
+
+    @property
+    def response(self):
+        return self.thread.response
+
+    @response.setter
+    def response(self, response):
+        # Store the response on the thread so that stopping the thread interrupts it
+        self.thread.response = response
+
+    def stop(self):
+        self.cancelled = True
+        abort_response(self.thread.response)
+
+    def isrunning(self):
+        return not self.cancelled and self.thread.isrunning()
+
+
+def hedge(func, delay, *args, **kwargs):
+    """Call func in the current thread. If it has not returned after the given number of seconds, call it again in a :class:`StoppableThread`.
+    Return the result of whichever call succeeds first and stop the other one. If both fail, the second call's error is raised.
+    The second call inherits the current thread's generation and :class:`Performance` timing.
+    
+    Only calls made from a :class:`StoppableThread` are hedged, since only they can be interrupted."""
+    caller = get_current_thread()
+    if not isinstance(caller, StoppableThread):
+        return func(*args, **kwargs)
+
+    timing = getattr(_local, "timing", None)
+    attempt = _HedgeAttempt(caller)
+    finished = threading.Event()
+    hedged = Future()
+    lock = threading.Lock()
+    winner = []
+
+    def run_hedge():
+        # NOTE: this runs in a thread
+        if finished.wait(delay) or not caller.isrunning():
+            return
+        hedged.set_running_or_notify_cancel()
+        _local.timing = {} if timing is not None else None
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as error:
+            hedged.set_exception(error)
+            return
+        with lock:
+            if winner:
+                return
+            winner.append(hedge_thread)
+        if timing is not None:
+            timing.update(_local.timing)
+        hedged.set_result(result)
+        # The request in the calling thread lost, so interrupt it
+        attempt.stop()
+
+    hedge_thread = StoppableThread(target=run_hedge)
+    hedge_thread.generation = caller.generation
+    hedge_thread.start()
+
+    previous = getattr(_local, "task", None)
+    _local.task = attempt
+    try:
+        result = func(*args, **kwargs)
+        with lock:
+            if not winner:
+                winner.append(attempt)
+        return result
+    except BaseException:
+        _local.task = previous
+        if hedged.running() or hedged.done():
+            # The second request was sent, so wait for it unless the thread has been stopped in the meantime
+            while caller.isrunning():
+                done, running = wait((hedged,), 0.1)
+                if done:
+                    return hedged.result()
+        raise
+    finally:
+        _local.task = previous
+        finished.set()
+        if not winner or winner[0] is not hedge_thread:
+            hedge_thread.stop()
+
+def hedged_download(tracker, percentile, url, data="", method="GET", *args, **kwargs):
+    """Download a file, re-issuing the request if it takes longer than the given percentile of recent downloads.
+    Only GET requests are hedged."""
+    delay = tracker.percentile(percentile) if method == "GET" else None
+    start = time.perf_counter()
+    if delay is None:
+        result = download(url, data, method, *args, **kwargs)
+    else:
+        result = hedge(download, delay, url, data, method, *args, **kwargs)
+    tracker.record(time.perf_counter() - start)
+    return result
+
+
+class ResourceBundle:
+    """Serve the files in a zip archive or directory tree. 
+    Zip archives are memory-mapped and their table of contents is indexed once, so reads never touch the filesystem again.
+    Directory trees are read directly, without walking the directory."""
+
+    def __init__(self, path, root=""):
+        self.path = os.path.abspath(path)
+        self.root = root.strip("/\\")
+
+        if os.path.isdir(self.path):
+            self.archive = None
+            self.index = None
+        else:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.archive = zipfile.ZipFile(self._file)
+            self.index = {info.filename: info for info in self.archive.infolist() if not info.is_dir()}
+            self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def _resolve(self, path):
+        path = unquote(path).replace("\\", "/").strip("/")
+        if self.root:
+            path = f"{self.root}/{path}" if path else self.root
+        return path
+
+    def read(self, path):
+        "Return the contents of the given file. Raise :py:exc:`FileNotFoundError` if the file does not exist."
+        path = self._resolve(path)
+
+        if self.archive is None:
+            fullpath = os.path.normpath(os.path.join(self.path, path))
+            if os.path.commonpath((self.path, fullpath)) != self.path:
+                raise FileNotFoundError(f"{path} is outside of {self.path}")
+            if os.path.isdir(fullpath):
+                fullpath = os.path.join(fullpath, "index.html")
+            with open(fullpath, "rb") as handle:
+                return handle.read()
             
-    def clear(self):
+        info = self.index.get(path) or self.index.get(f"{path}/index.html" if path else "index.html")
+        if info is None:
+            raise FileNotFoundError(f"{path} does not exist in {self.path}")
+
+        if info.compress_type in {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED}:
+            # Stored and deflated members are read straight out of the memory map
+            # The local header's filename and extra field lengths may differ from the central directory's
+            header = self._mmap[info.header_offset:info.header_offset + 30]
+            if header[:4] != b"PK\x03\x04":
+                raise zipfile.BadZipFile(f"bad local file header for {path} in {self.path}")
+            start = info.header_offset + 30 + int.from_bytes(header[26:28], "little") + int.from_bytes(header[28:30], "little")
+            data = self._mmap[start:start + info.compress_size]
+            if info.compress_type == zipfile.ZIP_DEFLATED:
+                data = zlib.decompress(data, -zlib.MAX_WBITS)
+            if zlib.crc32(data) != info.CRC:
+                raise zipfile.BadZipFile(f"bad CRC-32 for {path} in {self.path}")
+            return data
+        
+        # Other compression methods are rare; let zipfile handle them
         with self.lock:
-            self.cache.clear()
+            return self.archive.read(info)
+    
+    def fetch(self, url, decode=None):
+        "Fetch the file pointed to by the given url. Returns the url, data, filetype, and code, just like :py:func:`download`."
+        parsed = urlparse(url)
+        path = parsed.netloc + parsed.path
+        data = self.read(path)
+
+        filetype = mimetypes.guess_type(path if os.path.splitext(path)[1] else "index.html")[0] or "application/octet-stream"
+        if (not filetype.startswith("image")) or ("svg" in filetype):
+            data = data.decode(decode or "utf-8", errors="ignore")
+
+        return urlunparse(parsed._replace(query="", fragment="")), data, filetype, 200
+
+    def close(self):
+        "Close the archive. Only call this once no other thread can be reading from the bundle."
+        if self.archive is not None:
+            self.archive.close()
+            self._mmap.close()
+            self._file.close()
+
+
+url_schemes = {}
+
+def register_scheme(scheme, path, root=""):
+    """Serve the zip archive or directory at the given path from urls using the given scheme. 
+    For example, after calling ``register_scheme("app", "bundle.zip")``, loading ``app:///index.html`` will load the file index.html from bundle.zip.
+    Relative urls in bundled documents are resolved as usual.
+
+    New in version 4.26."""
+    scheme = scheme.lower().rstrip(":/")
+    if scheme in {"http", "https", "file", "data", "about", "view-source"}:
+        raise ValueError(f"the {scheme} scheme cannot be overridden")
+    
+    # The previous bundle is not closed because loader threads may still be reading from it
+    # Its memory map is released once the last reference to it is dropped
+    bundle = ResourceBundle(path, root)
+    url_schemes[scheme] = bundle
+
+    # urllib.parse.urljoin only resolves relative urls for schemes it knows about
+    for schemes in (uses_relative, uses_netloc):
+        if scheme not in schemes:
+            schemes.append(scheme)
+
+    return bundle
+
+def unregister_scheme(scheme):
+    """Stop serving files from the given scheme.
+
+    New in version 4.26."""
+    # As in register_scheme, the bundle is not closed in case loader threads are still reading from it
+    url_schemes.pop(scheme.lower().rstrip(":/"), None)
+
+def get_resource_bundle(url):
+    "Return the :class:`ResourceBundle` serving the given url, or None if the url's scheme is not registered."
+    if url_schemes:
+        scheme, sep, _ = url.partition(":")
+        if sep:
+            return url_schemes.get(scheme.lower())
+    return None
+
+
+async def _await(awaitable):
+    return await awaitable
+
+def as_future(result, loop=None):
+    """Return the result of a ``request_func`` call as a :py:class:`concurrent.futures.Future`. 
+    Awaitables are scheduled on the given asyncio event loop. 
+    Return None if the result is neither a future nor an awaitable that can be scheduled."""
+    if isinstance(result, Future):
+        return result
+    if loop is not None and hasattr(result, "__await__"):
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(_await(result), loop)
+    return None
+
+def resolve_response(result):
+    "Wait for the result of a ``request_func`` call if needed."
+    if isinstance(result, Future):
+        return result.result()
+    if hasattr(result, "__await__"):
+        import asyncio
+        return asyncio.run(_await(result))
+    return result
+
+
+PRELOAD_TAG_REGEX = re.compile(r"<(link|script|img|base)\s([^>]*)>", re.IGNORECASE)
+PRELOAD_ATTRIBUTE_REGEX = re.compile(r"""([a-zA-Z-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+def scan_subresources(html):
+    """Quickly find the stylesheets, scripts, and images referenced by an HTML document without parsing it.
+    Yields the resource type ("stylesheet", "script", "image", or "base") and its url as written in the document."""
+    for match in PRELOAD_TAG_REGEX.finditer(html):
+        tag = match.group(1).lower()
+        attributes = {name.lower(): "".join(values) for name, *values in PRELOAD_ATTRIBUTE_REGEX.findall(match.group(2))}
+        if tag == "link":
+            if "stylesheet" in attributes.get("rel", "").lower() and attributes.get("media", "all").lower() in {"screen", "print", "all"}:
+                url, kind = attributes.get("href"), "stylesheet"
+            else:
+                continue
+        elif tag == "script":
+            url, kind = attributes.get("src"), "script"
+        elif tag == "img":
+            url, kind = attributes.get("src"), "image"
+        else:
+            url, kind = attributes.get("href"), "base"
+        if url and not url.startswith("data:"):
+            yield kind, url.strip()
+
+
+ASTRAL_CHARACTER_REGEX = re.compile("[\U00010000-\U0010FFFF]")
+
+def strip_astral_characters(text):
+    "Remove characters outside of the Basic Multilingual Plane, which Tcl/Tk 8 cannot handle."
+    if text.isascii():
+        return text
+    return ASTRAL_CHARACTER_REGEX.sub("", text)
 
-lru_cache = LRUCache()
 
-def cache_download(url, data="", method="GET", decode=None, insecure=False, cafile=None, headers=(), timeout=15):
-    return lru_cache.fetch(url, data, method, decode, insecure, cafile, headers, timeout)
+class Preprocessor:
+    """Apply several regular expression substitutions to text in a single pass.
+    
+    The patterns are compiled once and combined into one pattern, so the text is only scanned once however many substitutions are added. 
+    Where more than one pattern matches at the same place, the one that was added first is used. 
+    The text that one substitution matched and produced is not passed to the others. 
+    Patterns must not contain backreferences.
+
+    :param stages: Optionally, a list of (pattern, replacement, flags) tuples to add.
+    :type stages: list
+    
+    New in version 4.26."""
 
-def check_download(url, data="", method="GET", decode=None, insecure=False, cafile=None, headers=(), timeout=15):
-    return lru_cache.check(url, data, method, decode, insecure, cafile, headers, timeout)
+    def __init__(self, stages=()):
+        self.stages = []
+        self.pattern = None
+        for stage in stages:
+            self.add(*stage)
+
+    def __bool__(self):
+        return bool(self.stages)
+
+    def add(self, pattern, replacement, flags=0):
+        """Add a substitution.
+
+        :param pattern: The regular expression to find.
+        :type pattern: str or :py:class:`re.Pattern`
+        :param replacement: A replacement string, which may refer to the pattern's groups, or a function that is passed a match object and returns the replacement string.
+        :type replacement: str or function
+        :param flags: Flags to compile the pattern with.
+        :type flags: int"""
+        self.stages.append((re.compile(pattern, flags), replacement))
+        self.pattern = None
+
+    def compile(self):
+        if len(self.stages) == 1:
+            self.pattern = self.stages[0][0]
+        else:
+            # Each pattern is put in a named group so that the matching substitution can be found, and keeps its own flags
+            alternatives = []
+            first_characters = set()
+            for index, (pattern, replacement) in enumerate(self.stages):
+                flags = "".join(letter for flag, letter in ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x")) if pattern.flags & flag)
+                alternatives.append(f"(?P<_{index}>(?{flags}:{pattern.pattern}))" if flags else f"(?P<_{index}>{pattern.pattern})")
+                if first_characters is not None:
+                    characters = self._get_first_characters(pattern)
+                    first_characters = None if characters is None else first_characters | characters
+            pattern = "|".join(alternatives)
+            if first_characters:
+                # Checking one character before trying every pattern makes the single pass faster than separate passes
+                pattern = f"(?=[{''.join(re.escape(character) for character in sorted(first_characters))}])(?:{pattern})"
+            self.pattern = re.compile(pattern)
+
+    def _get_first_characters(self, pattern):
+        "Return the characters that a match of the pattern can start with, or None if they can't easily be found."
+        try:
+            opcode, value = sre_parse.parse(pattern.pattern, pattern.flags)[0]
+            if opcode == sre_parse.LITERAL:
+                characters = {chr(value)}
+            elif opcode == sre_parse.IN and all(item[0] == sre_parse.LITERAL for item in value):
+                characters = {chr(item[1]) for item in value}
+            else:
+                return None
+        except Exception:
+            return None
+        if pattern.flags & re.IGNORECASE:
+            characters |= {character.swapcase() for character in characters}
+        return characters
+
+    def _replace(self, match):
+        if len(self.stages) == 1:
+            pattern, replacement = self.stages[0]
+        else:
+            pattern, replacement = self.stages[int(match.lastgroup[1:])]
+            # Match the pattern on its own so that its group numbers are the ones the replacement expects
+            match = pattern.match(match.string, match.start())
+        if isinstance(replacement, str):
+            return match.expand(replacement)
+        return replacement(match)
+
+    def __call__(self, text):
+        "Apply the substitutions to the given text and return the result."
+        if not self.stages:
+            return text
+        if self.pattern is None:
+            self.compile()
+        return self.pattern.sub(self._replace, text)
+
+
+TAG_NAME_REGEX = re.compile(r"<[a-zA-Z][^\s/>]*")
+# A missing closing quote makes the value run to the end of the document, like in browsers, so that no text is scanned twice
+ATTRIBUTE_REGEX = re.compile(r"""[\s/]*([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"?|'([^']*)'?|([^\s"'>]*)))?""")
+
+def rewrite_attributes(html, names, callback):
+    """Rewrite the values of the given attributes in an HTML document without parsing it.
+    The document is tokenized in a single pass, so the time taken grows linearly with its length however malformed it is.
+
+    :param html: The HTML code to rewrite.
+    :type html: str
+    :param names: The lowercase names of the attributes to rewrite.
+    :type names: set or dict
+    :param callback: A function that is passed the attribute's lowercase name and value and returns the new value, or None to leave the value unchanged.
+    :type callback: function
+    :rtype: str
+    
+    New in version 4.26."""
+    parts = []
+    last = 0
+    position = html.find("<")
+    while position != -1:
+        match = TAG_NAME_REGEX.match(html, position)
+        if match is None:
+            position = html.find("<", position + 1)
+            continue
+
+        position = match.end()
+        while True:
+            attribute = ATTRIBUTE_REGEX.match(html, position)
+            if attribute is None:
+                break
+            position = attribute.end()
+            name = attribute.group(1).lower()
+            if name in names:
+                for group in (2, 3, 4):
+                    value = attribute.group(group)
+                    if value is not None:
+                        value = callback(name, value)
+                        if value is not None:
+                            start, end = attribute.span(group)
+                            parts.append(html[last:start])
+                            parts.append(value)
+                            last = end
+                        break
+
+        position = html.find("<", position)
+
+    if not parts:
+        return html
+    parts.append(html[last:])
+    return "".join(parts)
+
+
+def split_html(html, size):
+    """Split HTML code into chunks of roughly the given number of characters.
+    Chunks never end inside a tag. They end just after the last tag before the limit, or after the last space in text that has no tags. 
+    A tag that is longer than the limit is kept whole.
+    
+    New in version 4.26."""
+    chunks = []
+    start = 0
+    length = len(html)
+    while start < length:
+        end = start + size
+        if end < length:
+            tag_start = html.rfind("<", start, end)
+            tag_end = html.rfind(">", start, end)
+            if tag_start > tag_end:
+                # The limit falls inside a tag, so cut before it, or after it if the tag starts the chunk
+                if tag_start > start:
+                    end = tag_start
+                else:
+                    tag_end = html.find(">", end)
+                    end = length if tag_end == -1 else tag_end + 1
+            elif tag_end != -1:
+                end = tag_end + 1
+            else:
+                space = max(html.rfind(char, start, end) for char in " \t\n\r")
+                if space != -1:
+                    end = space + 1
+        chunks.append(html[start:end])
+        start = end
+    return chunks
 
 
 def shorten(string):
@@ -916,8 +2444,14 @@ def shorten(string):
     return string
 
 
+_local = threading.local()
+
 def get_current_thread():
     "Return the currently running thread"
+    task = getattr(_local, "task", None)
+    if task is not None:
+        return task
+    
     thread = threading.current_thread()
     # Py 3.4+: Use is threading.main_thread()
     if thread.name == "MainThread":
@@ -942,6 +2476,240 @@ def invert_color(rgb, match, limit):
         return rgb_to_hex(*rgb)
 
 
+# The CSS named colours, so that the dark theme does not need to ask Tk for them
+NAMED_COLORS = {
+    "aliceblue": "#f0f8ff", "antiquewhite": "#faebd7", "aqua": "#00ffff", "aquamarine": "#7fffd4", "azure": "#f0ffff",
+    "beige": "#f5f5dc", "bisque": "#ffe4c4", "black": "#000000", "blanchedalmond": "#ffebcd", "blue": "#0000ff",
+    "blueviolet": "#8a2be2", "brown": "#a52a2a", "burlywood": "#deb887", "cadetblue": "#5f9ea0", "chartreuse": "#7fff00",
+    "chocolate": "#d2691e", "coral": "#ff7f50", "cornflowerblue": "#6495ed", "cornsilk": "#fff8dc", "crimson": "#dc143c",
+    "cyan": "#00ffff", "darkblue": "#00008b", "darkcyan": "#008b8b", "darkgoldenrod": "#b8860b", "darkgray": "#a9a9a9",
+    "darkgreen": "#006400", "darkgrey": "#a9a9a9", "darkkhaki": "#bdb76b", "darkmagenta": "#8b008b", "darkolivegreen": "#556b2f",
+    "darkorange": "#ff8c00", "darkorchid": "#9932cc", "darkred": "#8b0000", "darksalmon": "#e9967a", "darkseagreen": "#8fbc8f",
+    "darkslateblue": "#483d8b", "darkslategray": "#2f4f4f", "darkslategrey": "#2f4f4f", "darkturquoise": "#00ced1",
+    "darkviolet": "#9400d3", "deeppink": "#ff1493", "deepskyblue": "#00bfff", "dimgray": "#696969", "dimgrey": "#696969",
+    "dodgerblue": "#1e90ff", "firebrick": "#b22222", "floralwhite": "#fffaf0", "forestgreen": "#228b22", "fuchsia": "#ff00ff",
+    "gainsboro": "#dcdcdc", "ghostwhite": "#f8f8ff", "gold": "#ffd700", "goldenrod": "#daa520", "gray": "#808080",
+    "green": "#008000", "greenyellow": "#adff2f", "grey": "#808080", "honeydew": "#f0fff0", "hotpink": "#ff69b4",
+    "indianred": "#cd5c5c", "indigo": "#4b0082", "ivory": "#fffff0", "khaki": "#f0e68c", "lavender": "#e6e6fa",
+    "lavenderblush": "#fff0f5", "lawngreen": "#7cfc00", "lemonchiffon": "#fffacd", "lightblue": "#add8e6",
+    "lightcoral": "#f08080", "lightcyan": "#e0ffff", "lightgoldenrodyellow": "#fafad2", "lightgray": "#d3d3d3",
+    "lightgreen": "#90ee90", "lightgrey": "#d3d3d3", "lightpink": "#ffb6c1", "lightsalmon": "#ffa07a",
+    "lightseagreen": "#20b2aa", "lightskyblue": "#87cefa", "lightslategray": "#778899", "lightslategrey": "#778899",
+    "lightsteelblue": "#b0c4de", "lightyellow": "#ffffe0", "lime": "#00ff00", "limegreen": "#32cd32", "linen": "#faf0e6",
+    "magenta": "#ff00ff", "maroon": "#800000", "mediumaquamarine": "#66cdaa", "mediumblue": "#0000cd", "mediumorchid": "#ba55d3",
+    "mediumpurple": "#9370db", "mediumseagreen": "#3cb371", "mediumslateblue": "#7b68ee", "mediumspringgreen": "#00fa9a",
+    "mediumturquoise": "#48d1cc", "mediumvioletred": "#c71585", "midnightblue": "#191970", "mintcream": "#f5fffa",
+    "mistyrose": "#ffe4e1", "moccasin": "#ffe4b5", "navajowhite": "#ffdead", "navy": "#000080", "oldlace": "#fdf5e6",
+    "olive": "#808000", "olivedrab": "#6b8e23", "orange": "#ffa500", "orangered": "#ff4500", "orchid": "#da70d6",
+    "palegoldenrod": "#eee8aa", "palegreen": "#98fb98", "paleturquoise": "#afeeee", "palevioletred": "#db7093",
+    "papayawhip": "#ffefd5", "peachpuff": "#ffdab9", "peru": "#cd853f", "pink": "#ffc0cb", "plum": "#dda0dd",
+    "powderblue": "#b0e0e6", "purple": "#800080", "rebeccapurple": "#663399", "red": "#ff0000", "rosybrown": "#bc8f8f",
+    "royalblue": "#4169e1", "saddlebrown": "#8b4513", "salmon": "#fa8072", "sandybrown": "#f4a460", "seagreen": "#2e8b57",
+    "seashell": "#fff5ee", "sienna": "#a0522d", "silver": "#c0c0c0", "skyblue": "#87ceeb", "slateblue": "#6a5acd",
+    "slategray": "#708090", "slategrey": "#708090", "snow": "#fffafa", "springgreen": "#00ff7f", "steelblue": "#4682b4",
+    "tan": "#d2b48c", "teal": "#008080", "thistle": "#d8bfd8", "tomato": "#ff6347", "turquoise": "#40e0d0", "violet": "#ee82ee",
+    "wheat": "#f5deb3", "white": "#ffffff", "whitesmoke": "#f5f5f5", "yellow": "#ffff00", "yellowgreen": "#9acd32",
+}
+
+COLOR_SPLIT_REGEX = re.compile(r"\s(?![^()]*\))")
+RGB_COLOR_REGEX = re.compile(r"rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)$", re.IGNORECASE)
+
+def parse_color(color, lookup=None):
+    """Return the red, green, and blue values (0-255) of a CSS colour, or None if it isn't a colour that can be inverted.
+    If given, ``lookup`` is called with colour names that aren't CSS named colours, such as Tk's X11 names, and should return 16-bit values like :meth:`tkinter.Misc.winfo_rgb`."""
+    if color.startswith("#"):
+        color = color[1:]
+        if len(color) in {3, 4}:
+            color = "".join(digit * 2 for digit in color[:3])
+        elif len(color) in {6, 8}:
+            color = color[:6]
+        else:
+            return None
+        try:
+            return tuple(int(color[i:i + 2], 16) for i in range(0, 6, 2))
+        except ValueError:
+            return None
+    elif color[:3].lower() == "rgb":
+        match = RGB_COLOR_REGEX.match(color)
+        return tuple(min(255, int(value)) for value in match.groups()) if match else None
+    
+    name = color.lower()
+    if name in NAMED_COLORS:
+        return parse_color(NAMED_COLORS[name])
+    elif lookup is not None and name.isalnum():
+        try:
+            # Tk returns 16-bit values
+            return tuple(value // 257 for value in lookup(color))
+        except TclError:
+            return None
+    return None
+
+
+class ColorInverter:
+    """Invert CSS colours for the dark theme and remember the results. 
+    Pages tend to use the same few colours many times, so most colours only need to be parsed once.
+
+    :param lookup: A function used to look up colour names that aren't CSS named colours, such as :meth:`tkinter.Misc.winfo_rgb`.
+    :type lookup: function, optional
+    :param maxsize: The maximum number of colours to remember.
+    :type maxsize: int
+    
+    New in version 4.26."""
+
+    def __init__(self, lookup=None, maxsize=COLOR_CACHE_MAXSIZE):
+        self.lookup = lookup
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _get_cached(self, key, func, *args):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        result = func(*args)
+
+        with self.lock:
+            self.cache[key] = result
+            if len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        return result
+
+    def _get_kind(self, match):
+        # Only the kind of property affects the result, so group properties together
+        match = match.lower()
+        if "background" in match:
+            return "background"
+        elif match == "color":
+            return "color"
+        return ""
+
+    def _invert(self, color, kind, limit):
+        rgb = parse_color(color, self.lookup)
+        return None if rgb is None else invert_color(list(rgb), kind, limit)
+
+    def _invert_value(self, value, kind, limit):
+        colors = COLOR_SPLIT_REGEX.split(value.replace("\n", ""))
+        changed = False
+        for count, color in enumerate(colors):
+            inverted = self._get_cached((color, kind, limit), self._invert, color, kind, limit)
+            if inverted is not None:
+                colors[count] = inverted
+                changed = True
+        return " ".join(colors) if changed else None
+
+    def invert(self, color, match, limit):
+        """Return the inverted form of the given colour as a hex code, or None if it is not a colour. 
+        ``match`` is the property or attribute the colour belongs to and ``limit`` is the dark theme limit. See :func:`invert_color`."""
+        kind = self._get_kind(match)
+        return self._get_cached((color, kind, limit), self._invert, color, kind, limit)
+
+    def invert_value(self, value, match, limit):
+        """Invert every colour in a property value, such as ``1px solid red``. 
+        Return the new value, or None if the value does not contain any colours."""
+        kind = self._get_kind(match)
+        # Whole values are remembered too, since pages tend to repeat the same declarations
+        return self._get_cached((value, kind, limit, True), self._invert_value, value, kind, limit)
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+class MessageFormatter(string.Formatter):
+    "Format debugging messages. The ``!u`` conversion shortens long urls."
+
+    def convert_field(self, value, conversion):
+        if conversion == "u":
+            return shorten(str(value))
+        return super().convert_field(value, conversion)
+
+
+message_formatter = MessageFormatter()
+
+
+class MessageRecord:
+    """A debugging message. The message is only formatted when it is first read, so that messages nobody reads cost almost nothing.
+    
+    :param level: The message level, such as :data:`DEBUG` or :data:`ERROR`.
+    :param template: The message, with ``{}`` placeholders for the arguments.
+    :param args: The values to insert into the message.
+    :param embedded: True if the message comes from an embedded document.
+    
+    New in version 4.26."""
+
+    __slots__ = ("level", "template", "args", "time", "embedded", "_message")
+
+    def __init__(self, level, template, args=(), embedded=False):
+        self.level = level
+        self.template = template
+        self.args = args
+        self.time = time.time()
+        self.embedded = embedded
+        self._message = None
+
+    @property
+    def levelname(self):
+        return MESSAGE_LEVEL_NAMES.get(self.level, str(self.level))
+
+    @property
+    def message(self):
+        "The formatted message."
+        if self._message is None:
+            message = message_formatter.format(self.template, *self.args) if self.args else self.template
+            if self.embedded:
+                message = "[EMBEDDED DOCUMENT] " + message
+            self._message = message
+        return self._message
+
+    def _detach(self):
+        "Replace arguments that may hold on to other objects, such as exceptions and their tracebacks, with their text."
+        self.args = tuple(arg if isinstance(arg, (str, int, float, type(None))) else str(arg) for arg in self.args)
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.levelname}: {shorten(self.message)!r}>"
+
+
+class MessageLog:
+    """A bounded in-memory record of recent debugging messages. Once full, the oldest messages are discarded.
+    
+    :param maxlen: The number of messages to keep.
+    
+    New in version 4.26."""
+
+    def __init__(self, maxlen):
+        self.records = deque(maxlen=maxlen)
+
+    @property
+    def maxlen(self):
+        return self.records.maxlen
+
+    def append(self, record):
+        # Appending to a deque is thread-safe, so no lock is needed here
+        self.records.append(record)
+
+    def get(self, level=DEBUG):
+        "Return the kept messages at or above the given level, oldest first."
+        return [record for record in tuple(self.records) if record.level >= level]
+
+    def resize(self, maxlen):
+        "Change the number of messages to keep, keeping the most recent ones."
+        self.records = deque(self.records, maxlen=maxlen)
+
+    def clear(self):
+        self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(tuple(self.records))
+
+
 def notifier(text):
     "Notifications printer"
     try:
@@ -981,16 +2749,70 @@ def TclOpt(options):
 
 def safe_tk_eval(html, expr):
     """Always evaluate the given expression on the main thread."""
-    if threading.current_thread() is threading.main_thread():
-        return html.tk.eval(expr)
-    else:
-        result = [None]
-        event = threading.Event()
+    return submit(html, html.tk.eval, expr).result()
+
+
+def _run_tasks(tasks):
+    for future, func, args, kwargs in tasks:
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
 
-        def wrapper():
-            result[0] = html.tk.eval(expr)
-            event.set()
+class _SubmittedTasks:
+    "Queued tasks whose futures are cancelled if the queue is dropped before they run."
+    __slots__ = ("tasks",)
 
-        html.after(0, wrapper)
-        event.wait()
-        return result[0]
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    def __call__(self):
+        _run_tasks(self.tasks)
+
+    def cancel(self):
+        for future, func, args, kwargs in self.tasks:
+            future.cancel()
+
+def _cancel_queued(tasks):
+    for callback in tasks.clear():
+        if isinstance(callback, _SubmittedTasks):
+            callback.cancel()
+
+def _run_on_main_thread(html, callback):
+    if threading.current_thread() is threading.main_thread():
+        callback()
+        return
+    
+    tasks = html.queue
+    if not tasks:
+        html.after(0, callback)
+        return
+    
+    # The caller may be waiting for the result, so the callback is not tagged with a generation and is never discarded when the page changes
+    tasks.put(callback, PRIORITY_HIGH)
+    html.dispatcher.wake()
+    if html.dispatcher.queues.get(html) is not tasks:
+        # The queue was unregistered in the meantime and will never be evaluated
+        _cancel_queued(tasks)
+
+def submit(html, func, *args, **kwargs):
+    """Call the given function on the main thread and return a :py:class:`concurrent.futures.Future` for its result. 
+    If called from the main thread, the function is called immediately. 
+    If the widget stops evaluating its queue before the function is called, the future is cancelled."""
+    future = Future()
+    _run_on_main_thread(html, _SubmittedTasks(((future, func, args, kwargs),)))
+    return future
+
+def submit_batch(html, tasks):
+    """Evaluate each callable or Tcl expression in tasks on the main thread in one go. 
+    Return a list of :py:class:`concurrent.futures.Future` objects, one for each task."""
+    jobs = []
+    for task in tasks:
+        if isinstance(task, str):
+            jobs.append((Future(), html.tk.eval, (task,), {}))
+        else:
+            jobs.append((Future(), task, (), {}))
+    _run_on_main_thread(html, _SubmittedTasks(jobs))
+    return [job[0] for job in jobs]
@@ -0,0 +1,217 @@
+"""
+Page load benchmark for TkinterWeb
+
+Loads each page in a corpus into an HtmlFrame through the local network simulator (see netsim.py) and reports
+time to <<DOMContentLoaded>>, time to the last <<DoneLoading>>, bytes transferred, thread counts and peak RSS.
+
+Pages are loaded with an empty shared cache unless --warm is passed, so that download(), LRUCache and _thread_check are all exercised.
+Peak RSS is measured for the whole process, so run one corpus at a time when comparing memory use across releases.
+
+On a headless machine, run this under Xvfb (eg. xvfb-run python tools/benchmark.py ...) or pass --xvfb to start it automatically.
+
+Usage:
+    python tools/benchmark.py CORPUS_DIR [PAGE ...] [--runs 3] [--latency 100] [--bandwidth 256] [--json results.json] [--trace trace.json] [--tcl-report]
+
+Copyright (c) 2021-2026 Andrew Clarke
+"""
+
+import os, sys, time, json
+import argparse, threading, statistics
+import shutil, subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import netsim
+
+
+def peak_rss():
+    "Return the peak resident set size of this process in bytes, or None if unavailable."
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def start_xvfb(display=":99"):
+    "Start a virtual X server if no display is available."
+    if os.environ.get("DISPLAY") or os.name == "nt" or sys.platform == "darwin":
+        return None
+    if not shutil.which("Xvfb"):
+        sys.exit("No display is available and Xvfb could not be found.")
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(0.5)
+    return process
+
+
+def find_pages(root):
+    pages = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith((".html", ".htm")):
+                pages.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(pages)
+
+
+class PageLoad:
+    "Load one page into an HtmlFrame and record when its events fire."
+
+    def __init__(self, root, frame, url, settle, timeout):
+        self.root = root
+        self.frame = frame
+        self.url = url
+        self.settle = settle
+        self.timeout = timeout
+        self.start = None
+        self.dom_loaded = None
+        self.done_loading = None
+        self.done_count = 0
+        self.peak_threads = 0
+        self.peak_loader_threads = 0
+        self.timed_out = False
+
+    def run(self):
+        # Bind to the TkinterWeb widget directly so that the bindings can be removed afterwards
+        html = self.frame._html
+        dom_binding = html.bind("<<DOMContentLoaded>>", self.on_dom_loaded, True)
+        done_binding = html.bind("<<DoneLoading>>", self.on_done_loading, True)
+        try:
+            self.start = time.perf_counter()
+            self.frame.load_url(self.url, force=True)
+            self.sample()
+            self.root.mainloop()
+        finally:
+            html.unbind("<<DOMContentLoaded>>", dom_binding)
+            html.unbind("<<DoneLoading>>", done_binding)
+        return self
+
+    def on_dom_loaded(self, event):
+        if self.dom_loaded is None:
+            self.dom_loaded = time.perf_counter() - self.start
+
+    def on_done_loading(self, event):
+        self.done_loading = time.perf_counter() - self.start
+        self.done_count += 1
+
+    def sample(self):
+        "Track thread usage and stop once the page has been idle for the settle period."
+        html = self.frame._html
+        loader_threads = len(html.active_threads) + len(html.pending_threads)
+        self.peak_threads = max(self.peak_threads, threading.active_count())
+        self.peak_loader_threads = max(self.peak_loader_threads, loader_threads)
+
+        now = time.perf_counter() - self.start
+        if now > self.timeout:
+            self.timed_out = True
+            self.root.quit()
+        elif self.done_loading is not None and not loader_threads and now - self.done_loading > self.settle:
+            self.root.quit()
+        else:
+            self.root.after(5, self.sample)
+
+    def result(self):
+        return {
+            "dom_content_loaded": self.dom_loaded,
+            "done_loading": self.done_loading,
+            "done_loading_events": self.done_count,
+            "peak_threads": self.peak_threads,
+            "peak_loader_threads": self.peak_loader_threads,
+            "timed_out": self.timed_out,
+        }
+
+
+def summarise(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {"min": min(values), "median": statistics.median(values), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TkinterWeb page loads under simulated network conditions.")
+    parser.add_argument("corpus", help="directory containing the pages and their resources")
+    parser.add_argument("pages", nargs="*", help="pages to load, relative to the corpus (default: every html file)")
+    parser.add_argument("--runs", type=int, default=3, help="number of times to load each page")
+    parser.add_argument("--warm", action="store_true", help="keep the cache between runs")
+    parser.add_argument("--no-threading", action="store_true", help="disable threading in the widget")
+    parser.add_argument("--settle", type=float, default=0.25, help="seconds without activity before a load is considered finished")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for each load")
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb if no display is available")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--trace", help="record a trace of every load and write it to this file (open it in https://ui.perfetto.dev)")
+    parser.add_argument("--tcl-report", action="store_true", help="count the Tcl calls made during the loads and print them grouped by API")
+    netsim.add_arguments(parser)
+    args = parser.parse_args()
+
+    xvfb = start_xvfb() if args.xvfb else None
+
+    import tkinter as tk
+    from tkinterweb import HtmlFrame, utilities
+
+    pages = args.pages or find_pages(args.corpus)
+    if not pages:
+        sys.exit(f"No pages found in {args.corpus}")
+
+    simulator = netsim.simulator_from_args(args, args.corpus).start()
+    root = tk.Tk()
+    root.geometry("1024x768")
+    frame = HtmlFrame(root, messages_enabled=False, threading_enabled=not args.no_threading)
+    frame.pack(expand=True, fill="both")
+    root.update()
+
+    results = {"conditions": {key: value for key, value in vars(args).items() if key not in {"corpus", "pages", "json", "trace", "tcl_report"}}, "pages": {}}
+    if args.trace:
+        utilities.tracer.start()
+    profiler = utilities.TclProfiler() if args.tcl_report else None
+    if profiler:
+        profiler.attach(frame)
+    try:
+        for page in pages:
+            runs = []
+            for run in range(args.runs):
+                if not args.warm:
+                    utilities.lru_cache.clear()
+                simulator.stats.reset()
+                load = PageLoad(root, frame, simulator.base_url + page, args.settle, args.timeout).run()
+                result = load.result()
+                result.update(simulator.stats.snapshot())
+                result["peak_rss"] = peak_rss()
+                runs.append(result)
+
+            summary = {key: summarise([run[key] for run in runs]) for key in ("dom_content_loaded", "done_loading", "bytes_sent", "requests", "peak_loader_threads", "peak_threads")}
+            results["pages"][page] = {"runs": runs, "summary": summary}
+
+            dom, done = summary["dom_content_loaded"], summary["done_loading"]
+            print("{:<40} DOMContentLoaded {:>8} DoneLoading {:>8} bytes {:>10} requests {:>4} loader threads {:>3} RSS {:>6} MiB".format(
+                page,
+                f"{dom['median'] * 1000:.0f}ms" if dom else "-",
+                f"{done['median'] * 1000:.0f}ms" if done else "-",
+                int(summary["bytes_sent"]["median"]),
+                int(summary["requests"]["median"]),
+                summary["peak_loader_threads"]["max"],
+                round((runs[-1]["peak_rss"] or 0) / 1048576),
+            ))
+    finally:
+        if args.trace:
+            utilities.tracer.stop()
+            utilities.tracer.save(args.trace)
+        if profiler:
+            profiler.detach(frame)
+            print()
+            print(profiler.report(limit=25))
+        root.destroy()
+        simulator.stop()
+        if xvfb:
+            xvfb.terminate()
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Checks for the TkinterWeb back/forward cache
+
+Loads a few local pages into widgets with the back/forward cache enabled and checks that:
+pages are stored, restored and evicted, and discarded pages lose the class bindings that would keep them alive;
+bindings made with HtmlFrame.bind follow the pages and HtmlFrame.unbind removes only the given binding from each of them;
+HtmlLabel and HtmlText keep their changes to the html widget after it has been swapped.
+
+Each failed check is printed and the script exits with status 1 if any failed.
+
+A display is needed to create the widgets. On a headless machine, pass --xvfb or run this under xvfb-run.
+
+Usage:
+    python tools/bfcache.py [--xvfb]
+
+Copyright (c) 2021-2026 Andrew Clarke
+"""
+
+import os, sys
+import argparse, tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import benchmark
+
+
+class Checker:
+    def __init__(self):
+        self.failures = 0
+        self.count = 0
+
+    def __call__(self, name, passed):
+        self.count += 1
+        if not passed:
+            self.failures += 1
+            print(f"FAILED: {name}")
+
+
+def make_pages(directory, names):
+    "Write a small page for each name and return their urls."
+    urls = {}
+    for name in names:
+        path = os.path.join(directory, f"{name}.html")
+        with open(path, "w") as handle:
+            handle.write(f"<html><head><title>{name}</title></head><body><p id='{name}'>Page {name}</p></body></html>")
+        urls[name] = "file:///" + path.replace(os.sep, "/").lstrip("/")
+    return urls
+
+
+def class_bindings(html):
+    "Return the class bindings left on the tags that belong to the given html widget."
+    return [sequence for tag in (html.scrollable_node_tag, html.tkinterweb_tag) for sequence in html.bind_class(tag)]
+
+
+def bound(html, sequence):
+    "Return the Tcl script bound to the sequence on the given html widget."
+    return html.bind(sequence) if html.winfo_exists() else ""
+
+
+def check_store_restore_evict(root, urls, check):
+    from tkinterweb import HtmlFrame
+
+    frame = HtmlFrame(root, messages_enabled=False, bfcache_limit=1)
+    frame.load_url(urls["a"])
+    page_a = frame.html
+    frame.load_url(urls["b"])
+    page_b = frame.html
+    check("a finished page is stored when navigating away", page_a is not page_b and urls["a"] in frame._bfcache)
+
+    frame.load_url(urls["a"], from_history=True)
+    check("a cached page is restored by history navigation", frame.html is page_a and frame.current_url == urls["a"])
+    check("the page restored from is cached in its place", urls["b"] in frame._bfcache and urls["a"] not in frame._bfcache)
+
+    frame.load_url(urls["c"])
+    check("the cache is kept within bfcache_limit", list(frame._bfcache) == [urls["a"]])
+    check("an evicted page is kept as the spare page", frame._bfcache_spare is page_b and page_b.winfo_exists())
+
+    frame.load_url(urls["a"])
+    check("other navigation discards the cached copy", urls["a"] not in frame._bfcache)
+    check("a discarded page is destroyed when there already is a spare page", not page_a.winfo_exists())
+    check("a discarded page has no class bindings left", not class_bindings(page_a))
+    check("the spare page is reused", frame.html is page_b and frame._bfcache_spare is None)
+    frame.destroy()
+
+
+def check_bindings(root, urls, check):
+    from tkinterweb import HtmlFrame
+
+    frame = HtmlFrame(root, messages_enabled=False, bfcache_limit=2)
+    frame.load_url(urls["a"])
+    first = frame.bind("<<Check>>", lambda event: None, True)
+    second = frame.bind("<<Check>>", lambda event: None, True)
+    frame.load_url(urls["b"])
+    frame.load_url(urls["c"])
+
+    pages = [frame.html] + [entry[0] for entry in frame._bfcache.values()]
+    check("bindings are added to the pages that replace the first one", all(bound(page, "<<Check>>").count("if {") == 2 for page in pages))
+
+    frame.unbind("<<Check>>", first)
+    check("unbinding by id keeps the other binding on every page", all(bound(page, "<<Check>>").count("if {") == 1 for page in pages))
+    check("unbinding by id keeps the other binding for new pages", len(frame._bindings) == 1)
+    frame.load_url(urls["a"], from_history=True)
+    check("the kept binding is on the restored page", bound(frame.html, "<<Check>>").count("if {") == 1)
+
+    frame.unbind("<<Check>>", second)
+    check("unbinding the last binding removes it from every page", not any(bound(page, "<<Check>>") for page in pages + [frame.html]) and not frame._bindings)
+    frame.destroy()
+
+
+def check_subclasses(root, urls, check):
+    from tkinterweb import HtmlLabel, HtmlText
+
+    label = HtmlLabel(root, messages_enabled=False, bfcache_limit=1)
+    label.load_url(urls["a"])
+    label.load_url(urls["b"])
+    check("HtmlLabel removes the Html bindtag from new pages", "Html" not in label.html.bindtags())
+    label.destroy()
+
+    text = HtmlText(root, messages_enabled=False, bfcache_limit=1)
+    text.configure(insertwidth=3)
+    text.load_url(urls["a"])
+    text.load_url(urls["b"])
+    check("HtmlText binds <Key> on new pages", bool(text.html.bind("<Key>")))
+    check("HtmlText puts new pages in text mode", text.html.text_mode)
+    check("HtmlText keeps its cursor settings on new pages", text.html.caret_manager.caret_width == 3)
+    text.configure(state="disabled")
+    text.load_url(urls["c"])
+    check("HtmlText does not bind <Key> on new pages when disabled", not text.html.bind("<Key>"))
+    text.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check TkinterWeb's back/forward cache.")
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb if no display is available")
+    args = parser.parse_args()
+
+    xvfb = benchmark.start_xvfb() if args.xvfb else None
+
+    import tkinter as tk
+
+    check = Checker()
+    root = tk.Tk()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            urls = make_pages(directory, "abc")
+            check_store_restore_evict(root, urls, check)
+            check_bindings(root, urls, check)
+            check_subclasses(root, urls, check)
+    finally:
+        root.destroy()
+        if xvfb:
+            xvfb.terminate()
+
+    print(f"Back/forward cache: {check.count - check.failures}/{check.count} checks passed")
+    if check.failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
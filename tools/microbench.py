@@ -0,0 +1,190 @@
+"""
+Microbenchmarks for the TkinterWeb HTML and CSS preprocessing
+
+Times TkinterWeb._preprocess, which applies crash prevention and the dark theme to code before it is parsed, on multi-megabyte documents.
+Documents are generated unless files are given. Each configuration is also run through the pre-4.26 substitution passes to check that the output is unchanged and to show the speedup.
+Before timing anything, a set of tricky snippets is run through the Tkhtml 3.0 crash prevention workarounds and compared with the pre-4.26 output, whichever Tkhtml version is loaded.
+Both use the widget's colour inverter, which is cleared before each run so that every colour is parsed at least once.
+The dark theme now picks the kind of colour from the attribute name, so its HTML output is expected to differ from 4.25 and is not compared.
+
+The worst-case benchmarks time malformed documents of increasing size. The time taken should grow in proportion to the size.
+
+A display is needed to create the widget. On a headless machine, pass --xvfb or run this under xvfb-run.
+
+Usage:
+    python tools/microbench.py [FILE ...] [--size 8] [--repeat 5] [--worst-case-size 0.005] [--xvfb]
+
+Copyright (c) 2021-2026 Andrew Clarke
+"""
+
+import os, sys, re, time
+import argparse, statistics
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import benchmark
+
+
+HTML_CHUNK = """<div class="row" style=" color: #222; background-color: rgb(250, 250, 250)">
+  <p>Plain paragraph text with an emoji \U0001F600 and some accented characters: caf\u00e9, na\u00efve.</p>
+  <table bgcolor="white" text="black"><tr><td style="font-family: 'Noto Color Emoji', sans-serif; color: red">a &lt; b</td></tr></table>
+  <a href="/page" link="#00f">Link</a>
+</div>
+"""
+
+CSS_CHUNK = """.row { color: #222; background: rgb(250, 250, 250); font-family: 'Noto Color Emoji', sans-serif; }
+.row a:hover { color: blue !important; border: 1px solid #ccc }
+"""
+
+# Snippets where the crash prevention substitutions can overlap, so applying them in one combined pass would change the output
+CRASH_PREVENTION_CASES = (
+    "p{font-family: Arial}\nq{color: rgb( 1,2,3); background: white}",
+    "<p style=\"font-family: x\">a</p><b style=\" color: rgb( 4,5,6)\">b</b>",
+    "<i style='font-family: Noto Color Emoji'>c</i><u style=' x'>d</u>",
+    "a { background: RGB(a, b); font-family: 'Noto Color Emoji' }",
+    "rgb( style=\"  x) font-family:;",
+)
+
+# Inputs that make backtracking regexes take quadratic time, repeated to the requested size
+WORST_CASES = (
+    ("unclosed angle brackets", "<"),
+    ("unclosed style attributes", '<a style="x'),
+    ("long attribute-free tags", "<a b "),
+    ("long style values", '<p style="' + "a" * 4096 + '">'),
+)
+
+CONFIGURATIONS = (
+    # name, crash prevention, dark theme
+    ("crash prevention", True, False),
+    ("crash prevention + dark theme", True, True),
+    ("none", False, False),
+)
+
+
+def generate(chunk, size):
+    "Repeat a chunk of code until it is about the given number of megabytes long."
+    return chunk * max(1, int(size * 1048576 / len(chunk)))
+
+
+def reference_preprocess(html, data, css=False):
+    "The substitutions made by TkinterWeb 4.25, which ran one full pass over the code for each step. Colours are inverted with the current code."
+    if html.crash_prevention_enabled:
+        data = "".join(c for c in data if c <= "\uFFFF")
+        if html.using_tkhtml30:
+            data = re.sub("font-family:[^;']*(;)?", html._remove_noto_emoji, data, flags=re.IGNORECASE)
+            data = re.sub(r"rgb\([^0-9](.*?)\)", "inherit", data, flags=re.IGNORECASE)
+            data = re.sub(r'style=(["\'])\s+', r'style=\1', data, flags=re.IGNORECASE)
+    if html.dark_theme_enabled:
+        if css:
+            data = re.sub(html.style_dark_theme_regex, lambda match: html._generate_altered_colour(match, 0), data)
+        else:
+            data = re.sub(html.inline_dark_theme_regexes[0], lambda match: match.group(1) + re.sub(html.inline_dark_theme_regexes[1], html._generate_altered_colour, match.group(2)), data)
+            for regex in html.general_dark_theme_regexes:
+                data = re.sub(regex, html._generate_altered_colour, data, flags=re.IGNORECASE)
+    return data
+
+
+def check_crash_prevention(html):
+    "Compare the Tkhtml 3.0 crash prevention workarounds with the pre-4.26 passes. Return the number of snippets whose output differs."
+    using_tkhtml30, html.using_tkhtml30 = html.using_tkhtml30, True
+    html.crash_prevention_enabled = True
+    html.dark_theme_enabled = False
+    html._preprocessors.clear()
+    failures = 0
+    try:
+        for case in CRASH_PREVENTION_CASES:
+            for css in (False, True):
+                result, expected = html._preprocess(case, css), reference_preprocess(html, case, css)
+                if result != expected:
+                    failures += 1
+                    print(f"Crash prevention output differs for {case!r}:\n    got      {result!r}\n    expected {expected!r}")
+    finally:
+        html.using_tkhtml30 = using_tkhtml30
+        html._preprocessors.clear()
+    print(f"Crash prevention: {len(CRASH_PREVENTION_CASES) * 2 - failures}/{len(CRASH_PREVENTION_CASES) * 2} snippets match the pre-4.26 output")
+    return failures
+
+
+def measure(func, repeat):
+    "Return the result of the function and the median time it took."
+    timings = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def benchmark_documents(html, documents, args):
+    for name, data, css in documents:
+        print(f"{name}: {len(data) / 1048576:.1f} MiB")
+        for configuration, crash_prevention, dark_theme in CONFIGURATIONS:
+            html.crash_prevention_enabled = crash_prevention
+            html.dark_theme_enabled = dark_theme
+
+            result, timing = measure(lambda: html.color_inverter.clear() or html._preprocess(data, css), args.repeat)
+            line = f"    {configuration:<32} {timing * 1000:>9.1f}ms {len(data) / 1048576 / timing:>8.1f} MiB/s"
+            if not args.no_reference:
+                reference, reference_timing = measure(lambda: html.color_inverter.clear() or reference_preprocess(html, data, css), args.repeat)
+                line += f"    4.25: {reference_timing * 1000:>9.1f}ms ({reference_timing / timing:.1f}x)"
+                if reference != result and (css or not dark_theme):
+                    line += "    OUTPUT DIFFERS"
+            print(line)
+
+
+def benchmark_worst_cases(html, args):
+    html.crash_prevention_enabled = True
+    html.dark_theme_enabled = True
+    print("Worst cases (dark theme enabled):")
+    for name, chunk in WORST_CASES:
+        for multiplier in (1, 2, 4):
+            data = generate(chunk, args.worst_case_size * multiplier)
+            result, timing = measure(lambda: html._preprocess(data), args.repeat)
+            line = f"    {name:<28} {len(data) / 1024:>7.0f} KiB {timing * 1000:>9.1f}ms"
+            if not args.no_reference:
+                # The old regexes take quadratic time here, so only time them once
+                reference, reference_timing = measure(lambda: reference_preprocess(html, data), 1)
+                line += f"    4.25: {reference_timing * 1000:>9.1f}ms"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TkinterWeb's HTML and CSS preprocessing.")
+    parser.add_argument("files", nargs="*", help="HTML files to use instead of generated documents")
+    parser.add_argument("--size", type=float, default=8, help="size of the generated documents in megabytes")
+    parser.add_argument("--repeat", type=int, default=5, help="number of times to time each configuration")
+    parser.add_argument("--worst-case-size", type=float, default=0.005, help="starting size of the worst-case documents in megabytes (0 to skip them)")
+    parser.add_argument("--no-reference", action="store_true", help="don't run the pre-4.26 implementation")
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb if no display is available")
+    args = parser.parse_args()
+
+    xvfb = benchmark.start_xvfb() if args.xvfb else None
+
+    import tkinter as tk
+    from tkinterweb import HtmlFrame
+
+    documents = []
+    for name in args.files:
+        with open(name, encoding="utf-8", errors="replace") as handle:
+            documents.append((os.path.basename(name), handle.read(), False))
+    if not documents:
+        documents = [("generated.html", generate(HTML_CHUNK, args.size), False), ("generated.css", generate(CSS_CHUNK, args.size), True)]
+
+    root = tk.Tk()
+    html = HtmlFrame(root, messages_enabled=False)._html
+    try:
+        failures = check_crash_prevention(html)
+        benchmark_documents(html, documents, args)
+        if args.worst_case_size:
+            benchmark_worst_cases(html, args)
+    finally:
+        root.destroy()
+        if xvfb:
+            xvfb.terminate()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Local network simulator for benchmarking the TkinterWeb resource loader
+
+Serves a directory over HTTP with configurable latency, bandwidth, error rates, compression and cache headers.
+Run it on its own to browse a corpus under simulated conditions, or import NetworkSimulator to use it from another script (see benchmark.py).
+
+Usage:
+    python tools/netsim.py CORPUS_DIR [--port 8000] [--latency 100] [--jitter 20] [--bandwidth 256]
+                                      [--error-rate 0.05] [--compression gzip] [--cache-control "max-age=60"]
+
+Copyright (c) 2021-2026 Andrew Clarke
+"""
+
+import os, sys, time, random
+import argparse, threading, mimetypes
+import gzip, zlib
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from email.utils import formatdate
+
+
+CHUNK_SIZE = 4096
+
+
+class NetworkStats:
+    "Thread-safe counters describing the traffic served by the simulator."
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.not_modified = 0
+            self.bytes_sent = 0
+            self.active = 0
+            self.peak_active = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "not_modified": self.not_modified,
+                "bytes_sent": self.bytes_sent,
+                "peak_concurrent_requests": self.peak_active,
+            }
+
+
+class SimulatedRequestHandler(SimpleHTTPRequestHandler):
+    "Serve files from the corpus directory, applying the simulator's network conditions."
+
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.simulator.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        sim = self.server.simulator
+        stats = sim.stats
+        with stats.lock:
+            stats.requests += 1
+            stats.active += 1
+            stats.peak_active = max(stats.peak_active, stats.active)
+        try:
+            sim.sleep_latency()
+
+            if sim.error_rate and random.random() < sim.error_rate:
+                with stats.lock:
+                    stats.errors += 1
+                self.send_error(random.choice(sim.error_codes))
+                return
+
+            path = self.translate_path(self.path)
+            if os.path.isdir(path):
+                path = os.path.join(path, "index.html")
+            if not os.path.isfile(path):
+                self.send_error(404)
+                return
+
+            stat = os.stat(path)
+            etag = '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+            if sim.cache_control and self.headers.get("If-None-Match") == etag:
+                with stats.lock:
+                    stats.not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            with open(path, "rb") as handle:
+                body = handle.read()
+
+            encoding = sim.compression
+            accepted = self.headers.get("Accept-Encoding", "").lower()
+            if encoding and (sim.force_compression or encoding in accepted):
+                if encoding == "gzip":
+                    body = gzip.compress(body)
+                else:
+                    body = zlib.compress(body)
+            else:
+                encoding = None
+
+            self.send_response(200)
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            if sim.cache_control:
+                self.send_header("Cache-Control", sim.cache_control)
+                self.send_header("ETag", etag)
+            self.end_headers()
+
+            if send_body:
+                self.send_throttled(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with stats.lock:
+                stats.active -= 1
+
+    def send_throttled(self, body):
+        "Write the body in chunks, sleeping between them to honour the bandwidth limit."
+        sim = self.server.simulator
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            with sim.stats.lock:
+                sim.stats.bytes_sent += len(chunk)
+            if sim.bandwidth:
+                time.sleep(len(chunk) / sim.bandwidth)
+
+
+class NetworkSimulator:
+    """A local HTTP server with controllable network conditions.
+
+    :param root: The directory to serve.
+    :param port: The port to listen on. Use 0 to pick a free port.
+    :param latency: The delay, in milliseconds, before each response is sent.
+    :param jitter: The maximum random variation, in milliseconds, added to or removed from the latency.
+    :param bandwidth: The per-connection bandwidth in KiB per second. Use 0 for unlimited bandwidth.
+    :param error_rate: The fraction of requests, from 0 to 1, that fail with a random server error.
+    :param compression: Either None, "gzip", or "deflate".
+    :param force_compression: If True, compress responses even if the client did not ask for it.
+    :param cache_control: The value of the Cache-Control header. If set, ETags are sent and conditional requests are honoured."""
+
+    def __init__(self, root, port=0, host="127.0.0.1", latency=0, jitter=0, bandwidth=0, error_rate=0,
+                 error_codes=(500, 502, 503), compression=None, force_compression=False, cache_control=None, verbose=False):
+        self.root = os.path.abspath(root)
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.bandwidth = bandwidth * 1024
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.compression = compression
+        self.force_compression = force_compression
+        self.cache_control = cache_control
+        self.verbose = verbose
+        self.stats = NetworkStats()
+
+        handler = lambda *args, **kwargs: SimulatedRequestHandler(*args, directory=self.root, **kwargs)
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def sleep_latency(self):
+        delay = self.latency
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self):
+        "Start serving in a background thread."
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def add_arguments(parser):
+    "Add the network condition arguments to an argparse parser."
+    parser.add_argument("--latency", type=float, default=0, help="response delay in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0, help="random latency variation in milliseconds")
+    parser.add_argument("--bandwidth", type=float, default=0, help="per-connection bandwidth in KiB/s (0 for unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests that fail with a server error")
+    parser.add_argument("--compression", choices=("gzip", "deflate"), default=None, help="compress responses")
+    parser.add_argument("--force-compression", action="store_true", help="compress even if the client did not ask for it")
+    parser.add_argument("--cache-control", default=None, help="Cache-Control header value, eg. 'max-age=60'")
+
+
+def simulator_from_args(args, root, port=0, verbose=False):
+    return NetworkSimulator(root, port=port, latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth,
+                            error_rate=args.error_rate, compression=args.compression, force_compression=args.force_compression,
+                            cache_control=args.cache_control, verbose=verbose)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a directory under simulated network conditions.")
+    parser.add_argument("root", help="directory to serve")
+    parser.add_argument("--port", type=int, default=8000)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    simulator = simulator_from_args(args, args.root, args.port, verbose=True)
+    print(f"Serving {simulator.root} at {simulator.base_url}", file=sys.stderr)
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(simulator.stats.snapshot(), file=sys.stderr)
+        simulator.server.server_close()
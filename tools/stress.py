@@ -0,0 +1,117 @@
+"""
+Concurrency stress test for the TkinterWeb download cache
+
+Fetches the files of a corpus through LRUCache from an increasing number of threads, served by the local network simulator (see netsim.py).
+Every thread requests every file, so the cache must download each file exactly once however many threads ask for it at the same time.
+The script reports throughput, scaling relative to one thread, and any duplicate downloads or errors.
+
+Run it under both a normal and a free-threaded build of Python (eg. python3.13t) to compare lock contention. Does not need a display.
+
+Usage:
+    python tools/stress.py CORPUS_DIR [--threads 1 2 4 8 16] [--rounds 5] [--shards 8] [--latency 5]
+
+Copyright (c) 2021-2026 Andrew Clarke
+"""
+
+import os, sys, time
+import argparse, threading, collections
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import netsim
+
+
+def find_files(root):
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(files)
+
+
+def gil_status():
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    if is_gil_enabled is None:
+        return "enabled (not a free-threaded build)"
+    return "enabled" if is_gil_enabled() else "disabled"
+
+
+def run(utilities, urls, threads, rounds, shards):
+    "Fetch every url from every thread, starting with an empty cache each round."
+    downloads = collections.Counter()
+    downloads_lock = threading.Lock()
+    errors = []
+
+    def downloader(url, *args):
+        with downloads_lock:
+            downloads[url] += 1
+        return utilities.download(url, *args)
+
+    def worker(cache, barrier, offset):
+        barrier.wait()
+        # Start each thread at a different file so that both contended and uncontended fetches are exercised
+        for url in urls[offset:] + urls[:offset]:
+            try:
+                utilities.cache_download(url, cache=cache, downloader=downloader)
+            except Exception as error:
+                errors.append((url, error))
+
+    elapsed = 0
+    for round in range(rounds):
+        cache = utilities.LRUCache(maxsize=len(urls), shards=shards)
+        barrier = threading.Barrier(threads + 1)
+        workers = [threading.Thread(target=worker, args=(cache, barrier, (index * len(urls)) // threads)) for index in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed += time.perf_counter() - start
+
+    duplicates = sum(count - rounds for count in downloads.values() if count > rounds)
+    return {
+        "threads": threads,
+        "fetches_per_second": threads * len(urls) * rounds / elapsed,
+        "duplicate_downloads": duplicates,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the TkinterWeb download cache from many threads.")
+    parser.add_argument("corpus", help="directory containing the files to fetch")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="thread counts to test")
+    parser.add_argument("--rounds", type=int, default=5, help="number of times to repeat each test")
+    parser.add_argument("--shards", type=int, default=None, help="number of cache shards (default: utilities.CACHE_SHARDS)")
+    netsim.add_arguments(parser)
+    args = parser.parse_args()
+
+    from tkinterweb import utilities
+
+    files = find_files(args.corpus)
+    if not files:
+        sys.exit(f"No files found in {args.corpus}")
+    shards = args.shards or utilities.CACHE_SHARDS
+
+    print(f"Python {sys.version.split()[0]}, GIL {gil_status()}, {len(files)} files, {shards} shards")
+
+    with netsim.simulator_from_args(args, args.corpus) as simulator:
+        urls = [simulator.base_url + name for name in files]
+        baseline = None
+        failed = False
+        for threads in args.threads:
+            result = run(utilities, urls, threads, args.rounds, shards)
+            baseline = baseline or result["fetches_per_second"]
+            failed = failed or result["duplicate_downloads"] or result["errors"]
+            print("{:>3} threads {:>10.0f} fetches/s scaling {:>5.2f}x duplicate downloads {:>4} errors {:>4}".format(
+                threads, result["fetches_per_second"], result["fetches_per_second"] / baseline, result["duplicate_downloads"], result["errors"],
+            ))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()